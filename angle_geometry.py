@@ -0,0 +1,157 @@
+import numpy as np
+
+#radius of the arcs and side length of the squares marking angles
+ANGLE_RADIUS = 0.3
+#how close an angle has to be to a right angle to be marked as one
+RIGHT_ANGLE_TOLERANCE = 0.01
+#how close an angle has to be to a half turn to be treated as a straight line
+STRAIGHT_ANGLE_TOLERANCE = 0.01
+#number of anchors along each marker, matching the default for an Arc
+MARKER_ANCHORS = 9
+#number of points describing each marker - one cubic curve between each
+#pair of consecutive anchors
+MARKER_POINTS = 4 * (MARKER_ANCHORS - 1)
+
+#columns of the vertex index array of an AngleBatch
+EDGE1_START, EDGE1_END, EDGE2_START, EDGE2_END, CENTRE = range(5)
+
+
+class AngleBatch():
+    def __init__(self, vertex_indices, choices=None):
+        """ A batch holds the geometry of many angles so that it can be
+        computed for all of them together with NumPy rather than one angle at
+        a time. Each angle is described by a row of the vertex index array
+        passed in, which gives the positions (as indices into a position
+        array) of the start and end of both edges the angle is between and
+        of the vertex the angle is centred about - in the column order given
+        by the constants above. The edges follow the convention of
+        AngledGraph.generate_angle_arc, so the first edge is measured from
+        its end to its start and the second from its start to its end.
+        The optional choices give the value each angle was added to the graph
+        with, where 1 shows the reflex angle between the edges rather than
+        the non-reflex one.
+        The endpoint arrays, the computed geometry and the marker points are
+        allocated once here and overwritten by every call to update. """
+
+        self.vertex_indices = np.asarray(vertex_indices, dtype=np.intp).reshape(-1, 5)
+        count = len(self.vertex_indices)
+        if choices is None:
+            self.choices = np.zeros(count, dtype=bool)
+        else:
+            self.choices = np.asarray(choices).astype(bool).reshape(count)
+
+        #endpoints of the edges and the centres of the angles
+        self.endpoints = np.zeros((count, 5, 3))
+
+        #the geometry of each angle
+        self.edge1_angles = np.zeros(count)
+        self.edge2_angles = np.zeros(count)
+        self.starts = np.zeros(count)
+        self.magnitudes = np.zeros(count)
+        self.reflex = np.zeros(count, dtype=bool)
+        self.right = np.zeros(count, dtype=bool)
+
+        #the points of the marker (arc or square) showing each angle
+        self.points = np.zeros((count, MARKER_POINTS, 3))
+
+    def __len__(self):
+        return len(self.vertex_indices)
+
+    def update(self, positions):
+        # Recomputes the geometry and marker points of every angle in the
+        # batch from the given array of vertex positions.
+
+        np.take(positions, self.vertex_indices, axis=0, out=self.endpoints)
+        self.compute_angles()
+        self.compute_points()
+
+    def compute_angles(self):
+        # Computes the start angle, magnitude and classification of every
+        # angle from the endpoints, in the same way as generate_angle_arc.
+
+        edge1_vectors = self.endpoints[:, EDGE1_START] - self.endpoints[:, EDGE1_END]
+        edge2_vectors = self.endpoints[:, EDGE2_END] - self.endpoints[:, EDGE2_START]
+        np.arctan2(edge1_vectors[:, 1], edge1_vectors[:, 0], out=self.edge1_angles)
+        np.arctan2(edge2_vectors[:, 1], edge2_vectors[:, 0], out=self.edge2_angles)
+
+        np.minimum(self.edge1_angles, self.edge2_angles, out=self.starts)
+        np.maximum(self.edge1_angles, self.edge2_angles, out=self.magnitudes)
+        self.magnitudes -= self.starts
+
+        #reflex angles are converted to the corresponding non-reflex angle
+        np.greater(self.magnitudes, np.pi, out=self.reflex)
+        self.magnitudes[self.reflex] -= 2 * np.pi
+
+        np.less(
+            np.abs(np.abs(self.magnitudes) - np.pi / 2),
+            RIGHT_ANGLE_TOLERANCE,
+            out=self.right
+        )
+
+        #the angles chosen to be shown as reflex go round the opposite way
+        #and are never marked as right angles
+        if self.choices.any():
+            flipped = self.magnitudes[self.choices]
+            self.magnitudes[self.choices] = np.where(flipped >= 0, flipped - 2 * np.pi, flipped + 2 * np.pi)
+            self.right[self.choices] = False
+
+    def compute_points(self):
+        # Computes the points of the marker for every angle - an arc for most
+        # angles and a square for right angles. Both are made up of the same
+        # number of cubic curves so that the markers share one buffer.
+
+        centres = self.endpoints[:, CENTRE]
+        alphas = np.linspace(0, 1, MARKER_ANCHORS)
+
+        #arcs - the anchors lie on a circle about the centre and the handles
+        #are placed along the tangents at the anchors
+        thetas = self.starts[:, None] + self.magnitudes[:, None] * alphas
+        unit = np.zeros(thetas.shape + (3,))
+        unit[..., 0] = np.cos(thetas)
+        unit[..., 1] = np.sin(thetas)
+        tangents = np.zeros_like(unit)
+        tangents[..., 0] = -unit[..., 1]
+        tangents[..., 1] = unit[..., 0]
+        factors = 4 / 3 * np.tan(self.magnitudes / (MARKER_ANCHORS - 1) / 4)
+        factors = factors[:, None, None]
+        arcs = np.stack(
+            (
+                unit[:, :-1],
+                unit[:, :-1] + factors * tangents[:, :-1],
+                unit[:, 1:] - factors * tangents[:, 1:],
+                unit[:, 1:],
+            ),
+            axis=2
+        ) * ANGLE_RADIUS
+
+        #squares - the corners are the centre, a step along each edge and a
+        #step along both, with each side split into two straight curves
+        to_start = np.zeros((len(self), 3))
+        to_start[:, 0] = np.cos(self.edge1_angles)
+        to_start[:, 1] = np.sin(self.edge1_angles)
+        to_end = np.zeros((len(self), 3))
+        to_end[:, 0] = np.cos(self.edge2_angles)
+        to_end[:, 1] = np.sin(self.edge2_angles)
+        corners = np.stack(
+            (np.zeros_like(to_start), to_start, to_start + to_end, to_end, np.zeros_like(to_start)),
+            axis=1
+        ) * ANGLE_RADIUS
+        anchors = np.zeros((len(self), MARKER_ANCHORS, 3))
+        anchors[:, 0::2] = corners
+        anchors[:, 1::2] = (corners[:, :-1] + corners[:, 1:]) / 2
+        squares = np.stack(
+            (
+                anchors[:, :-1],
+                (2 * anchors[:, :-1] + anchors[:, 1:]) / 3,
+                (anchors[:, :-1] + 2 * anchors[:, 1:]) / 3,
+                anchors[:, 1:],
+            ),
+            axis=2
+        )
+
+        markers = np.where(self.right[:, None, None, None], squares, arcs)
+        np.add(
+            markers.reshape(len(self), MARKER_POINTS, 3),
+            centres[:, None, :],
+            out=self.points
+        )
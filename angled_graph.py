@@ -1,47 +1,961 @@
 from manim import *
+from manim.animation.animation import DEFAULT_ANIMATION_RUN_TIME
+
+from angle_geometry import ANGLE_RADIUS, STRAIGHT_ANGLE_TOLERANCE, AngleBatch
+from constraints import AngleSolver
+from frame_cache import FrameCache, bake_positions, sample_rate
+from graph_core import GraphCore
+from labels import (GlyphCache, angle_degrees, angle_label_anchors, edge_label_anchors, 
+    format_degrees, vertex_label_anchors)
+from layout import ForceLayout
+from graph_io import (DEFAULT_CHUNK_SIZE, build_core, build_core_from_positions, chunks, 
+    load_positions, load_snapshot, read_edges, read_vertices, save_snapshot)
+from profiling import UpdateStats
+from spatial_index import SpatialGrid, segments_in_box
+
+class ImageUpdateFromAlphaFunc(UpdateFromAlphaFunc):
+    # An UpdateFromAlphaFunc driving one of the images of an AngledGraph, 
+    # which is already in the scene. The update functions only ever read the 
+    # core, so the image is not copied when the animation begins as it would 
+    # otherwise be - for a large graph the copy would cost more than the 
+    # movement.
+
+    def create_starting_mobject(self):
+        return self.mobject
 
 class AngledGraph():
-    def __init__(self, vertices_input, edges_input):
+    #interpolation factors of the points along a straight line, cached by the 
+    #number of points so that in place edge updates do not allocate them
+    line_alphas = {}
+    #points of a dot centred on the origin, shared by every vertex of a graph 
+    #drawn in the batched render mode
+    dot_template = None
+
+    def __init__(self, vertices_input, edges_input, track_dependencies=False, 
+        edge_update="become", angle_update="become", materialize=True, 
+        render_mode="separate", bake=False, cull=False, bake_processes=1, 
+        glyph_cache_size=256):
         """ The constructor assigns the vertices and edges of the angled graph so 
-        that it is ready to be added to a scene. The vertices and edges are 
-        stored as MObjects.The vertices are created by the 
-        label(string)-coordinates(float, float) dictionary passed in by the 
-        user. Internally, these will be stored as a dictionary of the form 
-        label(string)-vertex(MObject). The edges are designated by the user 
-        with a list of pairs of labels. The labels correspond to the vertexes 
-        that the edge joins. Internally, this is stored as a 
-        labelpair(String, String)-line(MObject) dictionary.
-        For convenience the edges and vertices are grouped together with 
-        an instance variable. """
+        that it is ready to be added to a scene. The vertices are created by 
+        the label(string)-coordinates(float, float) dictionary passed in by the 
+        user. The edges are designated by the user with a list of pairs of 
+        labels. The labels correspond to the vertexes that the edge joins. 
+        The structure and positions of the graph are held in a GraphCore, 
+        which interns the labels to indices into an array of positions and 
+        stores the edges as an array of pairs of vertex indices. 
+        The vertices and edges are shown with MObjects, which are a view of 
+        the core kept in sync with it. These are stored as dictionaries of the 
+        form label(string)-vertex(MObject) and 
+        labelpair(String, String)-line(MObject). For convenience the edges and 
+        vertices are grouped together with an instance variable. If 
+        materialize is not set, no MObjects are created until they are needed, 
+        so large graphs can be built and queried without them. The 
+        render_mode argument selects whether each vertex and edge has its own 
+        MObject ("separate") or all the vertices and all the edges are each 
+        packed into one MObject made up of many subpaths ("batched"), which 
+        are rewritten in bulk from the core. 
+        If track_dependencies is set, moving vertices only updates the angles 
+        that depend on the moved vertices rather than every angle. 
+        The edge_update argument selects how edges follow moving vertices - 
+        "become" regenerates each edge every frame whereas "inplace" rewrites 
+        the points of the existing edge. Similarly, angle_update selects 
+        whether each angle is regenerated on its own ("become") or all angles 
+        are recomputed together in one vectorised pass ("batch"). 
+        If bake is set, moving vertices samples the geometry of every frame of 
+        the movement up front and replays it, keeping the samples in a frame 
+        cache so the same movement of the same graph is only sampled once. 
+        With bake_processes above one, the frames of baked movements (and of 
+        timelines) are split into chunks sampled by that many processes 
+        sharing the arrays through shared memory, with the same result as 
+        sampling them in this process. 
+        If cull is set, only the vertices, edges and angles inside the 
+        viewport (the camera frame unless set_viewport is called) have 
+        MObjects. They are created when they come into view and dropped when 
+        they leave it, which is worked out from a spatial index of the core 
+        rather than by checking every MObject. Culling needs the separate 
+        render mode, and with it nothing is materialized up front. 
+        Vertices, edges and angles can be labelled, the angles with readouts 
+        of their size in degrees. The text of the labels is typeset through 
+        a GlyphCache keeping up to glyph_cache_size strings, so a readout 
+        changing while animating reuses the glyphs of values it has already 
+        shown. """
 
+        self.core = GraphCore()
         self.image = VGroup()
         self.vertices = {}
         self.edges = {}
         #group of all angles that are displayed on screen
         self.angleImage = VGroup()
-        #mappings of angles from the edges they are about
+        #mappings of angles from the edges they are about, and the keys of 
+        #the angles whose markers are currently shown as right angles - 
+        #become keeps the class of the marker it changes, so the class of a 
+        #marker does not say which it is
         self.angles = {}
+        self.right_angles = set()
+        #whether angle updaters are only attached to angles that depend on 
+        #the moved vertices, and how many were skipped by the last move
+        self.track_dependencies = track_dependencies
+        self.skipped_angle_updaters = 0
+        #how edges are updated when the vertices they join are moved
+        if edge_update not in ("become", "inplace"):
+            raise ValueError("edge_update must be 'become' or 'inplace'")
+        self.edge_update = edge_update
+        #how angles are updated when the vertices they depend on are moved
+        if angle_update not in ("become", "batch"):
+            raise ValueError("angle_update must be 'become' or 'batch'")
+        self.angle_update = angle_update
+        #how the vertices and edges are drawn
+        if render_mode not in ("separate", "batched"):
+            raise ValueError("render_mode must be 'separate' or 'batched'")
+        self.render_mode = render_mode
+        #whether movements are baked up front, how many processes bake them 
+        #and the cache they are kept in
+        self.bake = bake
+        if bake_processes < 1:
+            raise ValueError("bake_processes must be at least 1")
+        self.bake_processes = bake_processes
+        self.frame_cache = FrameCache(processes=bake_processes)
+        #instrumentation of the updaters, which is off unless enabled
+        self.stats = None
+        #whether MObjects outside the viewport are culled, the viewport as a 
+        #centre, width and height (None for the camera frame), and the 
+        #spatial index of the core, which is built when it is first needed
+        if cull and render_mode != "separate":
+            raise ValueError("cull needs the 'separate' render_mode")
+        self.cull = cull
+        self.viewport = None
+        self.spatial_index = None
+        #labels of the vertices and edges and readouts of the angles, keyed 
+        #in the same way as their images, along with the group they are all 
+        #shown in, the value each readout shows and the cache text is typeset 
+        #through
+        self.labelImage = VGroup()
+        self.vertex_texts = {}
+        self.edge_texts = {}
+        self.angle_readouts = {}
+        self.readout_values = {}
+        self.readout_decimals = 0
+        self.glyph_cache = GlyphCache(Text, glyph_cache_size)
+        if render_mode == "batched":
+            self.vertexImage = VMobject(fill_color=WHITE, fill_opacity=1, stroke_width=0)
+            self.edgeImage = VMobject()
+            self.image += self.vertexImage
+            self.image += self.edgeImage
+            #the points of the combined images are views of buffers with room 
+            #to grow, so vertices and edges can be added without copying them
+            self.vertexBuffer = np.zeros((0, 3))
+            self.edgeBuffer = np.zeros((0, 3))
+
+        self.core.add_vertices(
+            vertices_input.keys(), 
+            [coordinates[:2] for coordinates in vertices_input.values()]
+        )
+        self.core.add_edges(edges_input)
+
+        #whether every vertex and edge has an image, in which case vertices 
+        #and edges added later are given one as well
+        self.materialized = False
+        if materialize and not cull:
+            self.materialize()
+
+    @classmethod
+    def from_iter(cls, vertices, edges, chunk_size=DEFAULT_CHUNK_SIZE, 
+        materialize=False, **options):
+        # Builds an angled graph from an iterable of (label, coordinates) 
+        # vertices and an iterable of label pair edges, such as generators 
+        # reading them from files. They are consumed a chunk at a time, so 
+        # the whole graph is never held as Python objects at once. No 
+        # MObjects are created unless materialize is set. The other options 
+        # are passed on to the constructor.
+
+        graph = cls({}, [], materialize=False, **options)
+        graph.core = build_core(vertices, edges, chunk_size)
+        if materialize:
+            graph.materialize()
+        return graph
+
+    @classmethod
+    def from_file(cls, edges_path, vertices_path=None, positions_path=None, 
+        chunk_size=DEFAULT_CHUNK_SIZE, materialize=False, header=None, **options):
+        # Builds an angled graph from an edge list file (CSV, .jsonl or 
+        # .json, see graph_io.read_edges) and either a CSV file of labelled 
+        # vertex coordinates or a NumPy .npy file of positions. With a .npy 
+        # file the vertices are labelled by their row, the edge list must use 
+        # those integer labels, and the positions are memory mapped rather 
+        # than read into memory. Whether a CSV edge list starts with a header 
+        # is given by header, or worked out from whether its first row joins 
+        # two vertices if header is None. The other options are as for 
+        # from_iter.
+
+        if (vertices_path is None) == (positions_path is None):
+            raise ValueError("exactly one of vertices_path and positions_path must be given")
+
+        if positions_path is not None:
+            positions = load_positions(positions_path)
+            graph = cls({}, [], materialize=False, **options)
+            graph.core = build_core_from_positions(
+                positions, 
+                read_edges(edges_path, int, header, range(len(positions))), 
+                chunk_size=chunk_size
+            )
+            if materialize:
+                graph.materialize()
+            return graph
+
+        #the vertices are read first, so the edges can be checked against 
+        #their labels
+        graph = cls.from_iter(
+            read_vertices(vertices_path), 
+            (), 
+            chunk_size=chunk_size, 
+            materialize=False, 
+            **options
+        )
+        for chunk in chunks(read_edges(edges_path, str, header, graph.core.label_index), chunk_size):
+            graph.core.add_edges(chunk)
+        if materialize:
+            graph.materialize()
+        return graph
 
-        for (vertex_label, coordinates) in vertices_input.items():
-            right_sf = coordinates[0]
-            up_sf = coordinates[1]
-            new_dot = Dot(RIGHT*right_sf+UP*up_sf)
+    def save(self, path):
+        # Writes the labels, positions, edges and angles of the graph to a 
+        # binary snapshot at the given path (see graph_io.save_snapshot). 
+        # The MObjects are not saved, as they are rebuilt from the core.
+
+        save_snapshot(self.core, path)
+
+    @classmethod
+    def load(cls, path, materialize=False, verify=True, **options):
+        # Builds an angled graph from a snapshot written by save. The arrays 
+        # of the core are memory mapped from the file rather than read, and 
+        # the MObjects of the vertices, edges and angles are only created 
+        # when they are needed (or straight away if materialize is set). 
+        # Unless verify is turned off the snapshot's checksum is checked. The 
+        # other options are passed on to the constructor.
+
+        graph = cls({}, [], materialize=False, **options)
+        graph.core = load_snapshot(path, verify)
+        if materialize:
+            graph.materialize()
+        return graph
+
+    def materialize(self, vertex_labels=None, edge_keys=None):
+        # Creates the MObjects for the vertices with the given labels and the 
+        # edges with the given keys, or for the whole graph (angles included) 
+        # if neither is given. MObjects that already exist are left as they are. In the 
+        # batched render mode the combined images are rebuilt instead.
+
+        if vertex_labels is None and edge_keys is None:
+            self.materialized = True
+            for angle_key in self.core.angle_keys:
+                self.angle_mobject(angle_key)
+            if self.render_mode == "batched":
+                self.refresh_batched_image()
+                return
+            vertex_labels = self.core.labels
+            edge_keys = self.core.edge_keys
+
+        for vertex_label in vertex_labels or ():
+            self.vertex_mobject(vertex_label)
+        for edge_key in edge_keys or ():
+            self.edge_mobject(edge_key)
+
+    def vertex_mobject(self, vertex_label):
+        # Returns the dot showing the vertex with the given label, creating it 
+        # at the vertex's position if it does not exist yet.
+
+        if vertex_label not in self.vertices:
+            new_dot = Dot(self.core.get_position(vertex_label))
             self.vertices[vertex_label] = new_dot
             self.image += new_dot
+        return self.vertices[vertex_label]
 
-        for (vertex1_label, vertex2_label) in edges_input:
-            new_line = Line (
-                self.vertices[vertex1_label].get_center(), 
-                self.vertices[vertex2_label].get_center()
-            )
-            self.edges[(vertex1_label, vertex2_label)] = new_line
+    def edge_mobject(self, edge_key):
+        # Returns the line showing the edge with the given key, creating it 
+        # between its vertices' positions if it does not exist yet.
+
+        if edge_key not in self.edges:
+            (start, end) = self.core.get_edge_endpoints(edge_key)
+            new_line = Line(start, end)
+            self.edges[edge_key] = new_line
             self.image += new_line
+        return self.edges[edge_key]
+
+    def angle_mobject(self, angle_key):
+        # Returns the marker showing the angle with the given key, creating 
+        # it from the core if it does not exist yet.
+
+        if angle_key not in self.angles:
+            self.regenerate_angle(angle_key)
+        return self.angles[angle_key]
+
+    def regenerate_angle(self, angle_key):
+        # Rebuilds the marker showing the angle with the given key from the 
+        # core, creating it if it does not exist yet, and records whether it 
+        # is now shown as a right angle. Returns the marker.
+
+        new_angle = self.generate_angle(angle_key)
+        if isinstance(new_angle, Polygon):
+            self.right_angles.add(angle_key)
+        else:
+            self.right_angles.discard(angle_key)
+        if angle_key in self.angles:
+            return self.angles[angle_key].become(new_angle)
+        self.angles[angle_key] = new_angle
+        self.angleImage += new_angle
+        return new_angle
+
+    def get_spatial_index(self):
+        # Returns the SpatialGrid indexing the core, building it if it does 
+        # not exist. Once built it is kept up to date as the graph is moved 
+        # and changed.
+
+        if self.spatial_index is None:
+            self.spatial_index = SpatialGrid(self.core)
+        return self.spatial_index
+
+    def nearest_vertex(self, point):
+        # Returns the label of the vertex nearest to the given point, or None 
+        # if the graph has no vertices.
+
+        index = self.get_spatial_index().nearest_vertex(point[0], point[1])
+        return None if index is None else self.core.labels[index]
+
+    def vertices_in_box(self, corner1, corner2):
+        # Returns the labels of the vertices inside the box with the given 
+        # opposite corners.
+
+        (x_min, x_max) = sorted((corner1[0], corner2[0]))
+        (y_min, y_max) = sorted((corner1[1], corner2[1]))
+        indices = self.get_spatial_index().vertices_in_box(x_min, y_min, x_max, y_max)
+        return [self.core.labels[index] for index in indices.tolist()]
+
+    def edges_in_box(self, corner1, corner2):
+        # Returns the keys of the edges that cross or lie inside the box with 
+        # the given opposite corners.
+
+        (x_min, x_max) = sorted((corner1[0], corner2[0]))
+        (y_min, y_max) = sorted((corner1[1], corner2[1]))
+        rows = self.get_spatial_index().edges_in_box(x_min, y_min, x_max, y_max)
+        return [self.core.edge_keys[row] for row in rows.tolist()]
+
+    def edges_crossing(self, edge_key):
+        # Returns the keys of the edges that intersect the edge with the 
+        # given key, other than those sharing one of its vertices.
+
+        rows = self.get_spatial_index().edges_crossing(self.core.edge_index[tuple(edge_key)])
+        return [self.core.edge_keys[row] for row in rows.tolist()]
+
+    def set_viewport(self, center, width, height):
+        # Sets the region of the plane that is shown, for scenes whose camera 
+        # frame has been moved or zoomed, and culls the graph to it.
+
+        self.viewport = (np.array(center, dtype=float), width, height)
+        self.update_culling()
+
+    def viewport_box(self):
+        # Returns the bounds (x_min, y_min, x_max, y_max) of the viewport, 
+        # widened by the size of an angle marker so that anything partly in 
+        # view is kept.
+
+        if self.viewport is None:
+            (center, width, height) = (ORIGIN, config.frame_width, config.frame_height)
+        else:
+            (center, width, height) = self.viewport
+        return (
+            center[0] - width / 2 - ANGLE_RADIUS, 
+            center[1] - height / 2 - ANGLE_RADIUS, 
+            center[0] + width / 2 + ANGLE_RADIUS, 
+            center[1] + height / 2 + ANGLE_RADIUS
+        )
+
+    def update_culling(self):
+        # Makes the MObjects of the graph those of the vertices, edges and 
+        # angles (by their centre) inside the viewport, creating the ones 
+        # that have come into view and dropping the ones that have left it. 
+        # Nothing is done unless culling is on.
+
+        if not self.cull:
+            return
+        box = self.viewport_box()
+        grid = self.get_spatial_index()
+        vertex_indices = grid.vertices_in_box(*box).tolist()
+        vertex_labels = {self.core.labels[index] for index in vertex_indices}
+        edge_keys = {self.core.edge_keys[row] for row in grid.edges_in_box(*box).tolist()}
+        angle_keys = set()
+        for index in vertex_indices:
+            for row in self.core.vertex_angles[index]:
+                if self.core.angle_array[row][2] == index:
+                    angle_keys.add(self.core.angle_keys[row])
+
+        hidden = [
+            self.vertices.pop(vertex_label) for vertex_label in 
+            [vertex_label for vertex_label in self.vertices if vertex_label not in vertex_labels]
+        ]
+        hidden += [
+            self.edges.pop(edge_key) for edge_key in 
+            [edge_key for edge_key in self.edges if edge_key not in edge_keys]
+        ]
+        if hidden:
+            self.image.remove(*hidden)
+        hidden = [
+            self.angles.pop(angle_key) for angle_key in 
+            [angle_key for angle_key in self.angles if angle_key not in angle_keys]
+        ]
+        if hidden:
+            self.angleImage.remove(*hidden)
+        self.right_angles &= angle_keys
+
+        self.materialize(vertex_labels, edge_keys)
+        for angle_key in angle_keys:
+            self.angle_mobject(angle_key)
+
+    def reveal_motion(self, vertex_indices, vertex_positions):
+        # Creates the MObjects of the vertices, edges and angles that come 
+        # into view at some point during a movement, so that they are 
+        # animated along with the rest of the graph. The movement is given by 
+        # the positions of the moved vertices with the given indices at some 
+        # frames of it (at least its start and end) as a 
+        # (frames x moved vertices x 3) array, and everything whose bounding 
+        # box over those frames overlaps the viewport is revealed. Nothing is 
+        # done unless culling is on.
+
+        vertex_indices = np.asarray(vertex_indices, dtype=np.intp)
+        if not self.cull or len(vertex_indices) == 0:
+            return
+        (x_min, y_min, x_max, y_max) = self.viewport_box()
+        order = np.argsort(vertex_indices)
+        moved = vertex_indices[order]
+        moved_lows = vertex_positions.min(axis=0)[order, :2]
+        moved_highs = vertex_positions.max(axis=0)[order, :2]
+
+        def bounds(indices):
+            # Returns the corners of the boxes the vertices with the given 
+            # indices stay within during the movement.
+            lows = self.core.positions[indices][..., :2]
+            highs = lows.copy()
+            places = np.minimum(np.searchsorted(moved, indices), len(moved) - 1)
+            is_moved = (moved[places] == indices)[..., None]
+            return (
+                np.where(is_moved, moved_lows[places], lows), 
+                np.where(is_moved, moved_highs[places], highs)
+            )
+
+        def in_view(lows, highs):
+            return (
+                (lows[:, 0] <= x_max) & (highs[:, 0] >= x_min) & 
+                (lows[:, 1] <= y_max) & (highs[:, 1] >= y_min)
+            )
+
+        edge_rows = set()
+        angle_rows = set()
+        for index in vertex_indices:
+            edge_rows |= self.core.vertex_edges[index]
+            angle_rows |= self.core.vertex_angles[index]
+        edge_rows = np.fromiter(edge_rows, dtype=np.intp, count=len(edge_rows))
+        angle_rows = np.fromiter(angle_rows, dtype=np.intp, count=len(angle_rows))
+
+        (lows, highs) = bounds(vertex_indices)
+        vertex_labels = [self.core.labels[index] for index in vertex_indices[in_view(lows, highs)]]
+        (lows, highs) = bounds(self.core.edge_array[edge_rows])
+        edge_keys = [self.core.edge_keys[row] for row in edge_rows[in_view(lows.min(axis=1), highs.max(axis=1))]]
+        (lows, highs) = bounds(self.core.angle_array[angle_rows, 2])
+        for row in angle_rows[in_view(lows, highs)]:
+            self.angle_mobject(self.core.angle_keys[row])
+        self.materialize(vertex_labels, edge_keys)
+
+    def finish_motion(self, vertex_indices):
+        # Brings the spatial index up to date with the vertices with the 
+        # given indices once they have been moved, and culls the graph to 
+        # the viewport again.
+
+        if self.spatial_index is not None:
+            self.spatial_index.move_vertices(vertex_indices)
+        self.update_culling()
+
+    def incident_edges(self, vertex_labels):
+        # Returns the set of keys of the edges incident to any of the given 
+        # vertices. This costs time proportional to the degree of the 
+        # vertices rather than the number of edges in the graph.
+
+        return self.core.incident_edges(vertex_labels)
+
+    def incident_angles(self, vertex_labels):
+        # Returns the set of keys of the angles that depend on any of the 
+        # given vertices.
+
+        return self.core.incident_angles(vertex_labels)
+
+    def get_vertex_position(self, vertex_label):
+        # Returns the position of the vertex with the given label.
+        return self.core.get_position(vertex_label)
+
+    def get_edge_endpoints(self, edge_key):
+        # Returns the start and end of the edge with the given key.
+        return self.core.get_edge_endpoints(edge_key)
+
+    def get_edge_angle(self, edge_key):
+        # Returns the angle of the edge with the given key from its start to 
+        # its end.
+        return self.core.get_edge_angle(edge_key)
+
+    def sync_vertices(self, vertex_labels):
+        # Moves the dots of the vertices with the given labels to the 
+        # positions held for them by the core.
+
+        for vertex_label in vertex_labels:
+            vertex = self.vertices.get(vertex_label)
+            if vertex is not None:
+                vertex.move_to(self.core.get_position(vertex_label))
+
+    @staticmethod
+    def batched_dot_points():
+        # Returns the points of a dot centred on the origin, which every 
+        # vertex is a copy of in the batched render mode.
+
+        if AngledGraph.dot_template is None:
+            AngledGraph.dot_template = Dot(ORIGIN).points.copy()
+        return AngledGraph.dot_template
+
+    @staticmethod
+    def remove_batched_row(image, row, last, size):
+        # Removes a vertex or edge from a combined image of the batched 
+        # render mode in the same way as the core removes it - the points of 
+        # the last one (of the given number of points each) are moved into the 
+        # row being removed and the image is shortened.
+
+        points = image.points
+        points[row * size:(row + 1) * size] = points[last * size:(last + 1) * size]
+        #shortened by taking a view rather than a copy, as set_points would
+        image.points = points[:last * size]
+
+    @staticmethod
+    def resize_batched_image(image, buffer, length):
+        # Makes the points of a combined image of the batched render mode the 
+        # first given number of points of the given buffer, growing the buffer 
+        # as GraphCore.grow does for the arrays of the core when it is too 
+        # small, so that adding to the image costs time proportional to what 
+        # is added. The points already in the image are kept. Returns the 
+        # buffer.
+
+        points = image.points
+        if points.base is not buffer:
+            #the points were replaced by something else, so the buffer starts 
+            #again from them
+            buffer = points.copy()
+        buffer = GraphCore.grow(buffer, length)
+        image.points = buffer[:length]
+        return buffer
+
+    def refresh_batched_image(self, vertex_indices=None, edge_rows=None):
+        # Rewrites the points of the combined vertex and edge images of the 
+        # batched render mode from the positions held by the core. Each vertex 
+        # is a copy of a dot's subpath moved to its position and each edge is 
+        # a straight subpath between its vertices. If indices and rows are 
+        # given only those vertices and edges are rewritten in place, 
+        # otherwise both images are rebuilt for the whole graph.
+
+        dot_points = AngledGraph.batched_dot_points()
+        alphas = AngledGraph.line_alphas.get(4)
+        if alphas is None:
+            alphas = np.linspace(0, 1, 4).reshape(-1, 1)
+            AngledGraph.line_alphas[4] = alphas
+
+        positions = self.core.positions
+        edge_array = self.core.edge_array
+        if vertex_indices is None:
+            vertex_indices = slice(0, self.core.vertex_count())
+            edge_rows = slice(0, self.core.edge_count())
+            self.vertexBuffer = AngledGraph.resize_batched_image(
+                self.vertexImage, self.vertexBuffer, self.core.vertex_count() * len(dot_points)
+            )
+            self.edgeBuffer = AngledGraph.resize_batched_image(
+                self.edgeImage, self.edgeBuffer, self.core.edge_count() * 4
+            )
+
+        vertex_points = self.vertexImage.points.reshape(-1, len(dot_points), 3)
+        vertex_points[vertex_indices] = positions[vertex_indices][:, None, :] + dot_points
+
+        edge_points = self.edgeImage.points.reshape(-1, 4, 3)
+        starts = positions[edge_array[edge_rows, 0]][:, None, :]
+        ends = positions[edge_array[edge_rows, 1]][:, None, :]
+        edge_points[edge_rows] = starts + alphas * (ends - starts)
+
+    def vertex_animation(self, movements):
+        # Returns the animation moving the vertices in the given 
+        # label-coordinates dictionary from where they are to the given 
+        # coordinates. The positions in the core are interpolated and the 
+        # dots of the vertices are then moved to them, so the core is always 
+        # up to date for the edges and angles that follow the vertices. In 
+        # the batched render mode the moved vertices and their incident 
+        # edges are instead rewritten in the combined images. The animation 
+        # is of the image of the graph, which is already in the scene, so 
+        # that playing it neither adds anything to the scene nor splits the 
+        # image up.
+
+        vertex_labels = list(movements.keys())
+        indices = self.core.indices(vertex_labels)
+        starts = self.core.positions[indices].copy()
+        targets = starts.copy()
+        for (i, new_coordinates) in enumerate(movements.values()):
+            #final coordinates
+            targets[i, 0] = new_coordinates[0]
+            targets[i, 1] = new_coordinates[1]
+
+        #the rows of the edges rewritten along with the vertices when batched 
+        #- set either way, as manim reads the variables of the update 
+        #function when it hashes the animation
+        edge_rows = None
+        if self.render_mode == "batched":
+            #the combined images are animated in place, so they have to hold 
+            #every vertex and edge
+            if not self.materialized:
+                self.materialize()
+            edge_rows = set()
+            for index in indices:
+                edge_rows |= self.core.vertex_edges[index]
+            edge_rows = np.fromiter(edge_rows, dtype=np.intp, count=len(edge_rows))
+
+        def update(vertex_image, alpha):
+            self.core.positions[indices] = starts + alpha * (targets - starts)
+            if self.render_mode == "batched":
+                self.refresh_batched_image(indices, edge_rows)
+            else:
+                self.sync_vertices(vertex_labels)
+            return vertex_image
+
+        return ImageUpdateFromAlphaFunc(
+            mobject = self.image,
+            update_function = self.profiled("vertex_updates", update, count=len(vertex_labels))
+        )
+
+    def add_vertex(self, vertex_label, coordinates):
+        # Adds a new vertex with the given label at the given 
+        # coordinates(float, float) to the graph. It is given an image if the 
+        # rest of the graph has one.
+
+        index = self.core.add_vertex(vertex_label, coordinates[:2])
+        if self.spatial_index is not None:
+            self.spatial_index.add_vertex(index)
+        if self.cull:
+            (x_min, y_min, x_max, y_max) = self.viewport_box()
+            if x_min <= coordinates[0] <= x_max and y_min <= coordinates[1] <= y_max:
+                self.vertex_mobject(vertex_label)
+            return
+        if not self.materialized:
+            return
+        if self.render_mode == "batched":
+            self.vertexBuffer = AngledGraph.resize_batched_image(
+                self.vertexImage, 
+                self.vertexBuffer, 
+                self.core.vertex_count() * len(AngledGraph.batched_dot_points())
+            )
+            self.refresh_batched_image([index], [])
+        else:
+            self.vertex_mobject(vertex_label)
+
+    def remove_vertex(self, vertex_label):
+        # Removes the vertex with the given label from the graph along with 
+        # the edges incident to it. Vertices which angles depend on cannot be 
+        # removed - the angles have to be removed first.
+
+        if self.core.incident_angles([vertex_label]):
+            raise ValueError("vertex %r has angles depending on it" % (vertex_label,))
+        for edge_key in self.core.incident_edges([vertex_label]):
+            self.remove_edge(edge_key)
+
+        index = self.core.label_index[vertex_label]
+        last = self.core.vertex_count() - 1
+        self.core.remove_vertex(vertex_label)
+        if self.spatial_index is not None:
+            self.spatial_index.remove_vertex(index, last)
+        if self.render_mode == "batched":
+            if self.materialized:
+                AngledGraph.remove_batched_row(
+                    self.vertexImage, index, last, len(AngledGraph.batched_dot_points())
+                )
+        elif vertex_label in self.vertices:
+            self.image.remove(self.vertices.pop(vertex_label))
+        if vertex_label in self.vertex_texts:
+            self.labelImage.remove(self.vertex_texts.pop(vertex_label))
+
+    def add_edge(self, edge_key):
+        # Adds a new edge joining the vertices with the pair of labels given 
+        # to the graph. It is given an image if the rest of the graph has one.
+
+        edge_key = tuple(edge_key)
+        row = self.core.add_edge(edge_key)
+        if self.spatial_index is not None:
+            self.spatial_index.add_edge(row)
+        if self.cull:
+            (start, end) = self.core.get_edge_endpoints(edge_key)
+            if segments_in_box(start[None], end[None], *self.viewport_box())[0]:
+                self.edge_mobject(edge_key)
+            return
+        if not self.materialized:
+            return
+        if self.render_mode == "batched":
+            self.edgeBuffer = AngledGraph.resize_batched_image(
+                self.edgeImage, self.edgeBuffer, self.core.edge_count() * 4
+            )
+            self.refresh_batched_image([], [row])
+        else:
+            self.edge_mobject(edge_key)
+
+    def remove_edge(self, edge_key):
+        # Removes the edge joining the vertices with the pair of labels given 
+        # from the graph. Edges which angles are between cannot be removed - 
+        # the angles have to be removed first.
+
+        edge_key = tuple(edge_key)
+        row = self.core.edge_index[edge_key]
+        last = self.core.edge_count() - 1
+        self.core.remove_edge(edge_key)
+        if self.spatial_index is not None:
+            self.spatial_index.remove_edge(row, last)
+        if self.render_mode == "batched":
+            if self.materialized:
+                AngledGraph.remove_batched_row(self.edgeImage, row, last, 4)
+        elif edge_key in self.edges:
+            self.image.remove(self.edges.pop(edge_key))
+        if edge_key in self.edge_texts:
+            self.labelImage.remove(self.edge_texts.pop(edge_key))
+
+    def label_vertices(self, input_scene, texts=None):
+        # Method to label vertices in the given scene. The labels are given 
+        # with a label-text dictionary, or every vertex is labelled with its 
+        # own label if none are given. Labels replace any the vertices already 
+        # have.
+
+        if texts is None:
+            texts = {vertex_label : str(vertex_label) for vertex_label in self.core.labels}
+        anchors = vertex_label_anchors(self.core.positions, self.core.indices(texts.keys()))
+        for ((vertex_label, text), anchor) in zip(texts.items(), anchors):
+            if vertex_label in self.vertex_texts:
+                self.labelImage.remove(self.vertex_texts[vertex_label])
+            glyph = self.glyph_cache.get(str(text)).move_to(anchor)
+            self.vertex_texts[vertex_label] = glyph
+            self.labelImage += glyph
+        self.show_labels(input_scene)
+
+    def label_edges(self, input_scene, texts):
+        # Method to label edges in the given scene. The labels are given with 
+        # a dictionary mapping the pair of vertex labels of each edge to its 
+        # text. Labels replace any the edges already have.
+
+        texts = {tuple(edge_key) : text for (edge_key, text) in texts.items()}
+        rows = np.array([self.core.edge_index[edge_key] for edge_key in texts], dtype=np.intp)
+        anchors = edge_label_anchors(self.core.positions, self.core.edge_array[rows])
+        for ((edge_key, text), anchor) in zip(texts.items(), anchors):
+            if edge_key in self.edge_texts:
+                self.labelImage.remove(self.edge_texts[edge_key])
+            glyph = self.glyph_cache.get(str(text)).move_to(anchor)
+            self.edge_texts[edge_key] = glyph
+            self.labelImage += glyph
+        self.show_labels(input_scene)
+
+    def show_angle_values(self, input_scene, angle_keys=None, decimals=0):
+        # Method to show a readout of the size in degrees of the angles with 
+        # the given keys (every angle of the graph if none are given) in the 
+        # given scene, rounded to the given number of decimal places, which 
+        # applies to every readout. The readouts follow the angles as they 
+        # change while the vertices are moved.
+
+        if angle_keys is None:
+            angle_keys = list(self.core.angle_keys)
+        for angle_key in angle_keys:
+            if angle_key not in self.core.angle_index:
+                raise KeyError(angle_key)
+            if angle_key not in self.angle_readouts:
+                #each readout is a group holding the glyph of its value, so 
+                #the glyph can be swapped as the value changes
+                readout = VGroup()
+                self.angle_readouts[angle_key] = readout
+                self.readout_values[angle_key] = np.nan
+                self.labelImage += readout
+        if decimals != self.readout_decimals:
+            self.readout_decimals = decimals
+            for angle_key in self.readout_values:
+                self.readout_values[angle_key] = np.nan
+        self.place_labels()
+        self.show_labels(input_scene)
+
+    def show_labels(self, input_scene):
+        # Adds the group of labels to the given scene if it is not already 
+        # in it.
+
+        if self.labelImage not in input_scene.mobjects:
+            input_scene.add(self.labelImage)
+
+    def remove_labels(self, input_scene):
+        # Method to remove every label and readout from the given scene.
+
+        input_scene.remove(self.labelImage)
+        self.labelImage = VGroup()
+        self.vertex_texts = {}
+        self.edge_texts = {}
+        self.angle_readouts = {}
+        self.readout_values = {}
+
+    def label_updater(self, placed=True):
+        # Update function for the group of labels. Rather than each label 
+        # following what it labels with an updater of its own, the anchors 
+        # of every label are worked out together from the positions held by 
+        # the core, with the readouts measured by one AngleBatch. Only the 
+        # labels whose anchor has moved since the last frame are moved, and 
+        # only the readouts whose rounded value has changed have their glyph 
+        # swapped for one from the glyph cache. The labels are taken to be 
+        # at their anchors to begin with unless placed is turned off, in 
+        # which case the first call moves every label.
+
+        vertex_indices = self.core.indices(self.vertex_texts.keys())
+        edge_rows = np.array([self.core.edge_index[edge_key] for edge_key in self.edge_texts], dtype=np.intp)
+        angle_keys = list(self.angle_readouts)
+        readouts = [self.angle_readouts[angle_key] for angle_key in angle_keys]
+        angle_rows = [self.core.angle_index[angle_key] for angle_key in angle_keys]
+        batch = AngleBatch(
+            self.core.angle_vertex_indices(angle_rows), 
+            self.core.angle_choices[angle_rows]
+        )
+        shown = np.array([self.readout_values[angle_key] for angle_key in angle_keys], dtype=float)
+        glyphs = list(self.vertex_texts.values()) + list(self.edge_texts.values()) + readouts
+        decimals = self.readout_decimals
+        anchors = np.full((len(glyphs), 3), np.nan)
+
+        def positions_of_labels():
+            positions = self.core.positions
+            batch.update(positions)
+            return np.concatenate((
+                vertex_label_anchors(positions, vertex_indices), 
+                edge_label_anchors(positions, self.core.edge_array[edge_rows]), 
+                angle_label_anchors(batch)
+            ))
+
+        if placed:
+            anchors[:] = positions_of_labels()
+
+        def update(label_image):
+            new_anchors = positions_of_labels()
+            moved = np.any(new_anchors != anchors, axis=1)
+
+            #readouts whose value has changed are given the glyph of the new 
+            #value, which is then moved into place
+            values = np.round(angle_degrees(batch), decimals)
+            changed = np.flatnonzero(values != shown)
+            for (i, text) in zip(changed, format_degrees(values[changed], decimals)):
+                readouts[i].remove(*readouts[i].submobjects)
+                readouts[i].add(self.glyph_cache.get(text))
+                self.readout_values[angle_keys[i]] = values[i]
+            shown[changed] = values[changed]
+            moved[len(glyphs) - len(readouts) + changed] = True
+
+            for i in np.flatnonzero(moved):
+                glyphs[i].move_to(new_anchors[i])
+            anchors[:] = new_anchors
+            return label_image
+
+        return update
+
+    def place_labels(self):
+        # Moves every label to where it belongs for the current positions of 
+        # the vertices, bringing the readouts up to date - non-animated.
+
+        self.label_updater(placed=False)(self.labelImage)
+
+    def label_animations(self):
+        # Returns the animations keeping the labels with what they label 
+        # while the vertices are moved - one animation updating them all 
+        # together, or none if nothing is labelled. It has to be played after 
+        # the animations moving the vertices so that it sees their new 
+        # positions each frame.
+
+        if len(self.labelImage) == 0:
+            return []
+        return [
+            UpdateFromFunc(
+                mobject = self.labelImage,
+                update_function = self.profiled(
+                    "label_updates", self.label_updater(), count=len(self.labelImage)
+                )
+            )
+        ]
+
+    def enable_profiling(self, callback=None):
+        # Starts recording how much work the updaters of the animations set 
+        # up from now on do each frame, returning the UpdateStats they are 
+        # recorded in. The optional callback is called at the end of every 
+        # frame with the work done during it.
+
+        self.stats = UpdateStats(callback)
+        return self.stats
+
+    def disable_profiling(self):
+        # Stops recording the work done by the updaters of animations set up 
+        # from now on.
+
+        self.stats = None
+
+    def profiled(self, name, update_function, count=1, allocations=0):
+        # Returns the given update function counted and timed under the given 
+        # name if profiling is enabled, or unchanged otherwise.
+
+        if self.stats is None:
+            return update_function
+        return self.stats.timed(name, update_function, count, allocations)
+
+    def profile_frames(self, animations):
+        # Marks the end of each frame for profiling by having the last of the 
+        # given animations, which is updated last in each frame, end the frame 
+        # after it has updated. Manim also updates every animation once as 
+        # they begin and once as they finish without rendering either, so the 
+        # work done then is recorded apart from the frames, ending once the 
+        # last animation has begun or finished.
+
+        if self.stats is None or len(animations) == 0:
+            return
+        stats = self.stats
+        last = animations[-1]
+        update_function = last.update_function
+        outside_frames = False
+
+        def update_and_end_frame(*args):
+            result = update_function(*args)
+            if not outside_frames:
+                stats.end_frame()
+            return result
+
+        def unrendered(method):
+            def method_outside_frames():
+                nonlocal outside_frames
+                outside_frames = True
+                try:
+                    method()
+                finally:
+                    outside_frames = False
+                stats.end_frame(rendered=False)
+            return method_outside_frames
+
+        last.update_function = update_and_end_frame
+        last.begin = unrendered(last.begin)
+        last.finish = unrendered(last.finish)
 
     def add(self, input_scene):
         # This method takes the given scene and writes all the vertices and 
         # edges to it - non-animated.
 
+        if self.cull:
+            self.update_culling()
+        else:
+            self.materialize()
         input_scene.add(self.image)
+        #angles loaded with the graph are shown along with it. The angles and 
+        #labels are always (re)added after the image so that they are drawn 
+        #above it, which makes manim redraw them whenever the image is 
+        #animated
+        if self.core.angle_keys or self.angleImage in input_scene.mobjects:
+            input_scene.add(self.angleImage)
+        if len(self.labelImage) > 0:
+            input_scene.add(self.labelImage)
 
     def remove(self, input_scene):
         # This method takes the given scene and removes the overall image of all 
@@ -54,14 +968,12 @@ class AngledGraph():
         new_start = edge.start if vertex1 is None else vertex1.get_center()
         new_end = edge.end if vertex2 is None else vertex2.get_center()
         
-        new_line = Line(
+        #the line keeps its ends as its start and end attributes
+        return Line(
             new_start,
             new_end
         )
 
-        new_line.set_start_and_end_attrs(new_start,new_end)
-        return new_line
-
     def update_with_vertex_end(self, vertex):
         #Update function for a line based on a vertex. Updates the end of the 
         #line based on the vertex.
@@ -99,11 +1011,100 @@ class AngledGraph():
         #     #the second element updates its end.
         #     return self.update_with_vertices_both(vertices[0],vertices[1])
             
-        return lambda line : line.become(AngledGraph.generate_edge(line,vertices[0],vertices[1]))
+        def update(line):
+            new_line = AngledGraph.generate_edge(line,vertices[0],vertices[1])
+            line.become(new_line)
+            #become only takes the points of the new line, so its ends are 
+            #taken as well for the updates that read them
+            line.start = new_line.start
+            line.end = new_line.end
+            return line
+
+        return update
+
+    def update_with_vertices_inplace(self, vertices):
+        # Update function for a line based on a pair of vertices, in the same 
+        # form as update_with_vertices. Rather than generating a new line 
+        # every frame, the points of the existing line are rewritten in place 
+        # so no mobjects are allocated while animating. A vertex of None 
+        # leaves the corresponding end of the line where it is.
+
+        def update(line):
+            points = line.points
+            alphas = AngledGraph.line_alphas.get(len(points))
+            if alphas is None:
+                alphas = np.linspace(0, 1, len(points)).reshape(-1, 1)
+                AngledGraph.line_alphas[len(points)] = alphas
+
+            start = np.array(points[0] if vertices[0] is None else vertices[0].get_center())
+            end = np.array(points[-1] if vertices[1] is None else vertices[1].get_center())
+
+            #points along the line are interpolated between its two ends
+            np.multiply(alphas, end - start, out=points)
+            points += start
+            line.start = start
+            line.end = end
+            return line
 
-    def update_for_angle(self, edge1, edge2, intersection_vertex):
+        return update
+
+    def update_for_angle(self, angle_key):
         #returns a function to update an angle based on the given parameters
-        return lambda angle : angle.become(AngledGraph.generate_angle_arc(edge1, edge2, intersection_vertex))
+        if self.stats is None:
+            return lambda angle : self.regenerate_angle(angle_key)
+
+        #when profiling, the kind of image generated for the angle is counted
+        stats = self.stats
+        def update(angle):
+            angle = self.regenerate_angle(angle_key)
+            stats.count("right_angles" if angle_key in self.right_angles else "arcs")
+            return angle
+
+        return stats.timed("angle_regenerations", update, allocations=1)
+
+    def update_angles_batch(self, angle_keys):
+        # Update function for a group of angles. Rather than each angle being 
+        # regenerated on its own, the angles are recomputed together with an 
+        # AngleBatch straight from the positions held by the core. The points 
+        # of each angle are a view into the points of the batch, so they are 
+        # rewritten in place.
+
+        angle_keys = list(angle_keys)
+        markers = [self.angles[angle_key] for angle_key in angle_keys]
+        rows = [self.core.angle_index[angle_key] for angle_key in angle_keys]
+        batch = AngleBatch(
+            self.core.angle_vertex_indices(rows), 
+            self.core.angle_choices[rows]
+        )
+        #which angles are currently shown as right angles
+        right = np.array([angle_key in self.right_angles for angle_key in angle_keys], dtype=bool)
+        stats = self.stats
+
+        def update(angle_image):
+            batch.update(self.core.positions)
+            if stats is not None:
+                right_count = np.count_nonzero(batch.right)
+                stats.count("right_angles", right_count)
+                stats.count("arcs", len(batch) - right_count)
+
+            #only the markers that changed between an arc and a right angle 
+            #need their style changing
+            for i in np.flatnonzero(batch.right != right):
+                if batch.right[i]:
+                    markers[i].set_color(BLUE).set_z_index(-1)
+                    self.right_angles.add(angle_keys[i])
+                else:
+                    markers[i].set_color(WHITE).set_z_index(0)
+                    self.right_angles.discard(angle_keys[i])
+            right[:] = batch.right
+            return angle_image
+
+        #share the points of the batch with the markers
+        update(self.angleImage)
+        for i, marker in enumerate(markers):
+            marker.points = batch.points[i]
+
+        return self.profiled("angle_regenerations", update, count=len(markers))
 
     def move_vertex(self, input_scene, vertex_label, new_coordinates):
         # This method takes the given scene (first argument) and moves 
@@ -111,74 +1112,260 @@ class AngledGraph():
         # new coordinates (third arguments). The coordinates are specified 
         # in the form of a tuple of numbers (int/float/..).
 
-        #final coordinates
-        right_sf = new_coordinates[0]
-        up_sf = new_coordinates[1]
-
-        #identify MObject corresponding to the vertex that is going to be 
-        #moved
-        vertex = self.vertices[vertex_label]
+        index = self.core.label_index[vertex_label]
+        self.reveal_motion([index], np.array([
+            [self.core.positions[index]], 
+            [tuple(new_coordinates[:2]) + (0,)]
+        ]))
 
         #generate the animations required to move the vertex - this includes
         #the animations for the vertex and edges
         animations = []
-        animations.append(vertex.animate.move_to(np.array([right_sf,up_sf,0])))
+        animations.append(self.vertex_animation({vertex_label : new_coordinates}))
 
-        for labels, line in self.edges.items():
+        for labels in self.incident_edges([vertex_label]):
+            line = self.edges.get(labels)
+            if line is None:
+                #edges without an MObject are only moved in the core
+                continue
+            #identify MObject corresponding to the vertex that is going to be 
+            #moved
+            vertex = self.vertex_mobject(vertex_label)
             if labels[0] == vertex_label:
                 animations.append(
                     UpdateFromFunc(
                         mobject = line,
-                        update_function = lambda line : line.put_start_and_end_on(vertex.get_center(), line.end)
+                        update_function = self.profiled(
+                            "edge_updates", 
+                            lambda line : line.put_start_and_end_on(vertex.get_center(), line.end)
+                        )
                     )
                 )
             elif labels[1] == vertex_label:
                 animations.append(
                     UpdateFromFunc(
                         mobject = line,
-                        update_function = lambda line : line.put_start_and_end_on(line.start, vertex.get_center())
+                        update_function = self.profiled(
+                            "edge_updates", 
+                            lambda line : line.put_start_and_end_on(line.start, vertex.get_center())
+                        )
                     )
                 )
 
+        #the labels follow once the vertex has moved each frame
+        animations += self.label_animations()
+
         #finally perform
+        self.profile_frames(animations)
         input_scene.play(
             *animations
         )
+        self.finish_motion([index])
+
+    def baked_animation(self, movements, run_time=DEFAULT_ANIMATION_RUN_TIME, rate_func=smooth):
+        # Returns the animation moving the vertices in the given 
+        # label-coordinates dictionary to the given coordinates by replaying 
+        # a baked motion from the frame cache. Every frame of the movement, 
+        # including the edges and angles that depend on the moved vertices, is 
+        # sampled before the animation starts, so each frame only copies the 
+        # sampled geometry into the images.
+
+        frame_count = int(np.ceil(run_time * config.frame_rate)) + 1
+        motion = self.frame_cache.get(self.core, movements, frame_count, rate_func)
+        return self.replay_animation(motion, run_time)
+
+    def timeline_animation(self, timeline, default_easing=smooth):
+        # Returns one animation playing every keyframe of the given Timeline. 
+        # The positions of the moved vertices are sampled for every frame of 
+        # the whole timeline at once, and the edges and angles depending on 
+        # them are found once and computed over the whole time range before 
+        # the animation is replayed. Vertices without an easing of their own 
+        # are eased with the given rate function.
+
+        run_time = timeline.duration()
+        frame_count = int(np.ceil(run_time * config.frame_rate)) + 1
+        times = np.linspace(0, run_time, frame_count)
+        (vertex_indices, vertex_positions) = timeline.sample(self.core, times, default_easing)
+        motion = bake_positions(self.core, vertex_indices, vertex_positions, processes=self.bake_processes)
+        return self.replay_animation(motion, run_time)
+
+    def play_timeline(self, input_scene, timeline, default_easing=smooth):
+        # This method takes the given scene and plays every keyframe of the 
+        # given Timeline in it with a single animation.
+
+        animations = [self.timeline_animation(timeline, default_easing)] + self.label_animations()
+        self.profile_frames(animations)
+        input_scene.play(*animations)
+        self.finish_motion(self.core.indices(timeline.vertex_labels()))
+
+    def move_vertices_preserving(self, input_scene, angle_keys=None, 
+        run_time=DEFAULT_ANIMATION_RUN_TIME, rate_func=smooth, positions=None, **movements):
+        # This method takes the given scene and moves the given vertices to 
+        # the given coordinates (as for move_vertices) while keeping angles 
+        # the same size, by moving the other vertices of those angles as 
+        # little as possible. The angles kept are those with the given keys, 
+        # or every right angle if none are given. The positions are solved 
+        # for every frame up front by an AngleSolver, each frame starting 
+        # from the last, and the movement is then replayed as a baked motion.
+
+        movements = dict(positions or {}, **movements)
+        indices = self.core.indices(movements.keys())
+        angle_rows = None
+        if angle_keys is not None:
+            angle_rows = [self.core.angle_index[angle_key] for angle_key in angle_keys]
+        solver = AngleSolver(self.core, indices, angle_rows)
+
+        starts = self.core.positions[indices]
+        targets = starts.copy()
+        for (i, new_coordinates) in enumerate(movements.values()):
+            targets[i, :2] = new_coordinates[:2]
+        frame_count = int(np.ceil(run_time * config.frame_rate)) + 1
+        alphas = sample_rate(rate_func, frame_count)
+        vertex_positions = solver.solve_frames(starts + alphas[:, None, None] * (targets - starts))
 
-    def move_vertices(self, input_scene, **movements):
+        motion = bake_positions(
+            self.core, solver.vertex_indices, vertex_positions, processes=self.bake_processes
+        )
+        animations = [self.replay_animation(motion, run_time)] + self.label_animations()
+        self.profile_frames(animations)
+        input_scene.play(*animations)
+        self.finish_motion(solver.vertex_indices)
+
+    def apply_layout(self, input_scene, kind="force", iterations=100, keyframes=1, 
+        run_time=DEFAULT_ANIMATION_RUN_TIME, **options):
+        # This method takes the given scene and lays the graph out with a 
+        # ForceLayout of the given kind, run for the given number of steps 
+        # (the other options are passed on to the layout). The vertices are 
+        # moved to the layout over the given run time - straight there with 
+        # one keyframe, or through the intermediate steps of the layout with 
+        # several, which are played as one Timeline.
+
+        layout = ForceLayout(self.core, kind, **options)
+        timeline = layout.timeline(
+            iterations, keyframes, run_time, smooth if keyframes == 1 else linear
+        )
+        self.play_timeline(input_scene, timeline)
+
+    def replay_animation(self, motion, run_time):
+        # Returns the animation replaying the given baked motion over the 
+        # given run time. Each frame only copies the sampled geometry of the 
+        # frame into the images. The animation is of the image of the graph, 
+        # which is already in the scene, so every dot and line in it is 
+        # redrawn each frame, as are the angle markers, which are drawn above 
+        # it. Frames are marked for profiling by whoever plays the animation, 
+        # once it is known which animation is updated last.
+
+        self.reveal_motion(motion.vertex_indices, motion.vertex_positions)
+        if self.render_mode == "batched" and not self.materialized:
+            self.materialize()
+        vertex_labels = [self.core.labels[index] for index in motion.vertex_indices]
+        lines = [self.edges.get(self.core.edge_keys[row]) for row in motion.edge_rows]
+        angle_keys = [self.core.angle_keys[row] for row in motion.angle_rows]
+        markers = [self.angles.get(angle_key) for angle_key in angle_keys]
+        #which angles are currently shown as right angles
+        right = np.array([angle_key in self.right_angles for angle_key in angle_keys], dtype=bool)
+
+        def update(vertex_image, alpha):
+            frame = motion.frame(alpha)
+            self.core.positions[motion.vertex_indices] = motion.vertex_positions[frame]
+
+            if self.render_mode == "batched":
+                dot_points = AngledGraph.batched_dot_points()
+                vertex_points = self.vertexImage.points.reshape(-1, len(dot_points), 3)
+                vertex_points[motion.vertex_indices] = (
+                    motion.vertex_positions[frame][:, None, :] + dot_points
+                )
+                edge_points = self.edgeImage.points.reshape(-1, 4, 3)
+                edge_points[motion.edge_rows] = motion.edge_points[frame]
+            else:
+                self.sync_vertices(vertex_labels)
+                for (line, points) in zip(lines, motion.edge_points[frame]):
+                    if line is not None:
+                        line.points = points
+
+            for (marker, points) in zip(markers, motion.angle_points[frame]):
+                if marker is not None:
+                    marker.points = points
+            for i in np.flatnonzero(motion.angle_right[frame] != right):
+                if markers[i] is None:
+                    continue
+                if motion.angle_right[frame][i]:
+                    markers[i].set_color(BLUE).set_z_index(-1)
+                    self.right_angles.add(angle_keys[i])
+                else:
+                    markers[i].set_color(WHITE).set_z_index(0)
+                    self.right_angles.discard(angle_keys[i])
+            right[:] = motion.angle_right[frame]
+
+            #the images share the sampled points while animating, so they are 
+            #given their own copies once the movement is finished
+            if frame == motion.frame_count() - 1:
+                for line in lines:
+                    if line is not None:
+                        line.points = line.points.copy()
+                        line.start = line.points[0].copy()
+                        line.end = line.points[-1].copy()
+                for marker in markers:
+                    if marker is not None:
+                        marker.points = marker.points.copy()
+            return vertex_image
+
+        return ImageUpdateFromAlphaFunc(
+            mobject = self.image,
+            update_function = self.profiled("baked_frames", update),
+            run_time = run_time,
+            rate_func = linear
+        )
+
+    def move_vertices(self, input_scene, positions=None, **movements):
         # This functions takes the given scene (first argument) and moves some 
         # given vertices to the given coordinates. The vertices and their 
-        # corresponding coordinates to be moved to are passed in as keyword 
-        # arguments which map vertex labels to coordinates.
+        # corresponding coordinates to be moved to are passed in as a 
+        # label-coordinates dictionary or as keyword arguments which map 
+        # vertex labels to coordinates - the dictionary is needed for labels 
+        # that are not strings, such as the row labels of a graph loaded from 
+        # a .npy file.
         
-        #List of animations to move the vertices - this consists of 
-        #vertex and edge animations.
-        animations = []
+        movements = dict(positions or {}, **movements)
+        indices = self.core.indices(movements.keys())
 
-        edge_mappings = {} 
+        #baked movements are replayed by a single animation
+        if self.bake:
+            animations = [self.baked_animation(movements)] + self.label_animations()
+            self.profile_frames(animations)
+            input_scene.play(*animations)
+            self.finish_motion(indices)
+            return
 
-        #consider each vertex and the corresponding coordinates that it should 
-        #be moved to
-        for (vertex_label, new_coordinates) in movements.items():
-            #final coordinates
-            right_sf = new_coordinates[0]
-            up_sf = new_coordinates[1]
+        #vertices move in a straight line, so they stay within the box 
+        #between where they start and end
+        self.reveal_motion(indices, np.stack((
+            self.core.positions[indices], 
+            [tuple(coordinates[:2]) + (0,) for coordinates in movements.values()]
+        )))
 
-            #Identify VMObject corresponding to the vertex that is going to 
-            #be moved
-            vertex = self.vertices[vertex_label]
+        #List of animations to move the vertices - this consists of 
+        #vertex and edge animations. All the vertices are moved together by 
+        #one animation which keeps the core up to date.
+        animations = [self.vertex_animation(movements)]
 
-            #consider vertex animation
-            animations.append(
-                vertex.animate.move_to(np.array([right_sf,up_sf,0]))
-            )
+        edge_mappings = {} 
 
+        #consider each vertex and the edges attached to it
+        for vertex_label in movements.keys():
             #Dictionary that maps edges to the pair of vertices they are 
             #updated with. The first vertex corresponds to the start of the 
             # edge and the second vertex corresponds to the end of the edge.
 
             #consider attached edge animations
-            for labels,line in self.edges.items():
+            for labels in self.incident_edges([vertex_label]):
+                line = self.edges.get(labels)
+                if line is None:
+                    #edges without an MObject are only moved in the core
+                    continue
+                #Identify VMObject corresponding to the vertex that is 
+                #being moved
+                vertex = self.vertex_mobject(vertex_label)
                 if labels[0] == vertex_label:
                     if line in edge_mappings.keys():
                         #already updated based on one vertex - preserve this
@@ -186,7 +1373,7 @@ class AngledGraph():
                         edge_mappings[line] = (vertex,prev)
                     else:
                         #otherwise
-                        edge_mappings[line] = (vertex,self.vertices[labels[1]])
+                        edge_mappings[line] = (vertex,self.vertex_mobject(labels[1]))
                 elif labels[1] == vertex_label:
                     if line in edge_mappings.keys():
                         #already updated based on one vertex - preserve this
@@ -194,15 +1381,24 @@ class AngledGraph():
                         edge_mappings[line] = (prev,vertex)
                     else:
                         #otherwise
-                        edge_mappings[line] = (self.vertices[labels[0]],vertex)
+                        edge_mappings[line] = (self.vertex_mobject(labels[0]),vertex)
         
         #consider how each edge should be updated based on how many and which 
         #vertices it is related to
+        if self.edge_update == "inplace":
+            edge_updater = self.update_with_vertices_inplace
+            #in place updates do not allocate a new line each frame
+            edge_allocations = 0
+        else:
+            edge_updater = self.update_with_vertices
+            edge_allocations = 1
         for line,vertices in edge_mappings.items():
             animations.append(
                 UpdateFromFunc(
                     mobject = line,
-                    update_function = self.update_with_vertices(vertices)
+                    update_function = self.profiled(
+                        "edge_updates", edge_updater(vertices), allocations=edge_allocations
+                    )
                 )
             )    
 
@@ -217,24 +1413,58 @@ class AngledGraph():
         # )
         ##
 
-        for (edge1,edge2,intersection_vertex),angle in self.angles.items():
+        #consider the angles that need to be updated - with dependency 
+        #tracking these are only the angles depending on a moved vertex
+        if self.track_dependencies:
+            #angles without an MObject are only moved in the core
+            angle_keys = [
+                angle_key for angle_key in self.incident_angles(movements.keys())
+                if angle_key in self.angles
+            ]
+        else:
+            angle_keys = self.angles.keys()
+        self.skipped_angle_updaters = len(self.angles) - len(angle_keys)
+
+        if self.angle_update == "batch":
+            if len(angle_keys) > 0:
+                animations.append(
+                    UpdateFromFunc(
+                        mobject = self.angleImage,
+                        update_function = self.update_angles_batch(angle_keys)
+                    )
+                )
+            angle_keys = ()
+
+        for angle_key in angle_keys:
             animations.append(
                 UpdateFromFunc(
-                    mobject = angle,
-                    update_function = self.update_for_angle(edge1,edge2,intersection_vertex)
+                    mobject = self.angles[angle_key],
+                    update_function = self.update_for_angle(angle_key)
                 )
             )
 
+        #the labels follow once everything else has moved each frame
+        animations += self.label_animations()
+
         #finally perform the animations to move the vertices
+        self.profile_frames(animations)
         input_scene.play(
             *animations
         )
+        self.finish_motion(indices)
 
     def remove_angles(self, input_scene):
         #Method to remove all angle images from the given scene
         input_scene.remove(self.angleImage)
         self.angleImage = VGroup()
         self.angles = {}
+        self.right_angles = set()
+        self.core.clear_angles()
+        #the readouts of the angles go with them
+        if self.angle_readouts:
+            self.labelImage.remove(*self.angle_readouts.values())
+        self.angle_readouts = {}
+        self.readout_values = {}
 
     @staticmethod
     def generate_angle_arc(edge1, edge2, intersection_vertex):
@@ -248,6 +1478,32 @@ class AngledGraph():
         edge1_angle = angle_of_vector(edge1.get_start() - edge1.get_end())
         edge2_angle = edge2.get_angle()
 
+        return AngledGraph.generate_angle_marker(intersection_point, edge1_angle, edge2_angle)
+
+    def generate_angle(self, angle_key):
+        # Generates the image to show the angle with the given key from the 
+        # positions held by the core, in the same way as generate_angle_arc. 
+        # The value the angle was added with chooses which of the two angles 
+        # between its edges is shown.
+
+        row = self.core.angle_index[angle_key]
+        (edge1_start, _, _, edge2_end, centre) = self.core.positions[
+            self.core.angle_vertex_indices([row])[0]
+        ]
+        return AngledGraph.generate_angle_marker(
+            centre,
+            angle_of_vector(edge1_start - centre),
+            angle_of_vector(edge2_end - centre),
+            self.core.angle_choices[row] == 1
+        )
+
+    @staticmethod
+    def generate_angle_marker(intersection_point, edge1_angle, edge2_angle, reflex=False):
+        # Generates the image to show the angle about the given point between 
+        # edges leaving it at the given angles - a square for right angles and 
+        # an arc otherwise. The non-reflex angle between the edges is shown 
+        # unless reflex is set, in which case the other angle is shown.
+
         #Determine the start angle, end angle and angle magnitude
         start = min(edge1_angle,edge2_angle)
         end = max(edge1_angle,edge2_angle)
@@ -257,8 +1513,12 @@ class AngledGraph():
         if magnitude > PI:
             magnitude = magnitude - 2 * PI 
 
+        #the other angle between the edges goes round the opposite way
+        if reflex:
+            magnitude = magnitude - 2 * PI if magnitude >= 0 else magnitude + 2 * PI
+
         #determine whether it is a right angle or not
-        if PI/2 - 0.01 < magnitude < PI/2 + 0.01 or 0.01 - PI/2 > magnitude > - PI/2 - 0.01:
+        if not reflex and (PI/2 - 0.01 < magnitude < PI/2 + 0.01 or 0.01 - PI/2 > magnitude > - PI/2 - 0.01):
             to_start = np.array([np.cos(edge1_angle),np.sin(edge1_angle),0]) * 0.30
             to_end = np.array([np.cos(edge2_angle),np.sin(edge2_angle),0]) * 0.30
             right_angle = Polygon(
@@ -279,6 +1539,72 @@ class AngledGraph():
                 angle = magnitude
             )
 
+    def mark_all_angles(self, input_scene, vertex=None, kind="interior"):
+        # Method to mark the angles between every pair of consecutive edges 
+        # around the vertex with the given label, or around every vertex if 
+        # none is given. At each vertex the edges are sorted by the direction 
+        # they leave it in, splitting the space around it into sectors. The 
+        # kind chooses what is marked - "interior" marks every sector, 
+        # "exterior" marks the other side of every sector and "reflex" only 
+        # marks the sectors larger than a half turn. Vertices with two edges 
+        # have one sector of each side, so "interior" marks the smaller one 
+        # and "exterior" the larger one. The angles are added alongside those 
+        # already shown.
+
+        if kind not in ("interior", "exterior", "reflex"):
+            raise ValueError("kind must be 'interior', 'exterior' or 'reflex'")
+
+        vertex_labels = self.core.labels if vertex is None else [vertex]
+        positions = self.core.positions
+        angles = {}
+        for vertex_label in vertex_labels:
+            index = self.core.label_index[vertex_label]
+            rows = np.fromiter(self.core.vertex_edges[index], dtype=np.intp)
+            if len(rows) < 2:
+                continue
+
+            #directions of the edges away from the vertex, in sorted order
+            edges = self.core.edge_array[rows]
+            others = np.where(edges[:, 0] == index, edges[:, 1], edges[:, 0])
+            vectors = positions[others] - positions[index]
+            directions = np.arctan2(vectors[:, 1], vectors[:, 0])
+            order = np.argsort(directions)
+            rows = rows[order]
+            directions = directions[order]
+
+            #sweep of each sector from one edge to the next, anticlockwise
+            sweeps = np.diff(directions, append=directions[0] + 2 * PI)
+            if len(rows) == 2:
+                #both sectors are between the same pair of edges - the 
+                #smaller one is shown with a value of 0 and the larger one, 
+                #which is reflex unless the edges are in line, with 1
+                angle_key = (self.core.edge_keys[rows[0]], self.core.edge_keys[rows[1]])
+                if kind == "interior":
+                    angles[angle_key] = 0
+                elif kind == "exterior" or abs(sweeps[0] - PI) > STRAIGHT_ANGLE_TOLERANCE:
+                    angles[angle_key] = 1
+                continue
+
+            for (i, sweep) in enumerate(sweeps):
+                if kind == "reflex" and sweep <= PI + STRAIGHT_ANGLE_TOLERANCE:
+                    continue
+                j = (i + 1) % len(rows)
+                angle_key = (self.core.edge_keys[rows[i]], self.core.edge_keys[rows[j]])
+                #with a value of 0 generate_angle_marker goes anticlockwise 
+                #from the smaller direction if the edges are at most a half 
+                #turn apart and clockwise from it otherwise, which is 
+                #anticlockwise from the first edge of the sector when that 
+                #edge has the smaller direction (every sector but the last) 
+                #exactly when the edges are at most a half turn apart. 
+                #Comparing the same directions here keeps sectors of a half 
+                #turn on their own side
+                apart = abs(directions[j] - directions[i])
+                shows_sector = (directions[i] < directions[j]) == (apart <= PI)
+                angles[angle_key] = int(shows_sector == (kind == "exterior"))
+
+        for (angle_key, value) in angles.items():
+            self.add_angle(input_scene, angle_key, value)
+
     def add_angles(self, input_scene, angles):
         # Method to add all the given angles to the scene. Angles are passed into 
         # this function with a dictionary where the keys represent the pair of 
@@ -286,22 +1612,68 @@ class AngledGraph():
         # angle between the edges is shown (with 0 or 1). The edges are given 
         # with their corresponding pair of vertices. 
 
-        #Remove previous angles so that only the current angles are retained
-        self.remove_angles(input_scene)
+        #Only the current angles are retained - angles which are already 
+        #shown are kept as they are rather than being regenerated
+        self.update_angles(input_scene, angles)
+
+    def update_angles(self, input_scene, angles):
+        # Method to make the angles shown in the scene those in the given 
+        # dictionary, which takes the same form as for add_angles. This is 
+        # done by comparing against the angles already shown so that only 
+        # the angles which are new, removed or have a different value have 
+        # their images created or destroyed.
+
+        for angle_key in [angle_key for angle_key in self.core.angle_keys if angle_key not in angles]:
+            self.remove_angle(input_scene, angle_key)
 
-        # Iterate through the passed in dictionary to consider each angle
         for givenEdges,av in angles.items():
-            #create the actual angle
-            edge1 = self.edges[givenEdges[0]]
-            edge2 = self.edges[givenEdges[1]]
-            intersection_vertex = self.vertices[givenEdges[0][1]]
-            new_angle = AngledGraph.generate_angle_arc(edge1, edge2, intersection_vertex)
-            self.angles[(edge1,edge2,intersection_vertex)] = new_angle
-            self.angleImage += new_angle
-
-        # Finally, add the angles to the scene
-        input_scene.add(self.angleImage)
-    
+            self.add_angle(input_scene, givenEdges, av)
+
+    def add_angle(self, input_scene, angle_key, value=0):
+        # Method to add a single angle to the scene, given by the pair of 
+        # edges it is between and the value choosing which angle between the 
+        # edges is shown as in add_angles. If the angle is already shown with 
+        # the same value nothing is done.
+
+        if angle_key in self.core.angle_index:
+            row = self.core.angle_index[angle_key]
+            if self.core.angle_choices[row] == value and angle_key in self.angles:
+                return
+            self.core.angle_choices[row] = value
+            if angle_key in self.angles:
+                self.regenerate_angle(angle_key)
+            #the readout now measures the other angle between the edges
+            if angle_key in self.angle_readouts:
+                self.place_labels()
+        else:
+            self.core.add_angle(angle_key, value)
+        #create the actual angle, unless culling is on and its centre is out
+        #of view - update_culling creates it once it comes into view
+        if self.cull:
+            (x_min, y_min, x_max, y_max) = self.viewport_box()
+            centre = self.core.positions[self.core.angle_array[self.core.angle_index[angle_key]][2]]
+            if x_min <= centre[0] <= x_max and y_min <= centre[1] <= y_max:
+                self.angle_mobject(angle_key)
+        else:
+            self.angle_mobject(angle_key)
+
+        #the angles are shown as one group, so it only has to be added to the 
+        #scene once
+        if self.angleImage not in input_scene.mobjects:
+            input_scene.add(self.angleImage)
+
+    def remove_angle(self, input_scene, angle_key):
+        # Method to remove a single angle, given by the pair of edges it is 
+        # between, from the scene. The images of the other angles are left as 
+        # they are.
+
+        self.core.remove_angle(angle_key)
+        if angle_key in self.angles:
+            self.angleImage.remove(self.angles.pop(angle_key))
+            self.right_angles.discard(angle_key)
+        if angle_key in self.angle_readouts:
+            self.labelImage.remove(self.angle_readouts.pop(angle_key))
+            del self.readout_values[angle_key]
 
 class AngledGraphTest(Scene):
     def construct(self):
@@ -0,0 +1,358 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+
+import numpy as np
+from manim import *
+
+from angled_graph import AngledGraph
+
+
+def random_angle_graph(angle_count, seed=0):
+    # Generates a graph with the given number of separate angles, each made
+    # up of three vertices joined by two edges, along with the dictionary of
+    # angles to pass to add_angles. Roughly one in ten of the angles is a
+    # right angle so that both kinds of marker are exercised.
+
+    rng = np.random.default_rng(seed)
+    vertices = {}
+    edges = []
+    angles = {}
+    for i in range(angle_count):
+        centre = rng.uniform(-6, 6, 2)
+        edge1_angle, edge2_angle = rng.uniform(-PI, PI, 2)
+        if i % 10 == 0:
+            edge2_angle = edge1_angle + PI / 2
+        a, b, c = "a%d" % i, "b%d" % i, "c%d" % i
+        vertices[a] = centre + [np.cos(edge1_angle), np.sin(edge1_angle)]
+        vertices[b] = centre
+        vertices[c] = centre + [np.cos(edge2_angle), np.sin(edge2_angle)]
+        edges += [(a, b), (b, c)]
+        angles[((a, b), (b, c))] = 0
+    return vertices, edges, angles
+
+
+class RecordingScene():
+    # Stands in for a scene when nothing needs to be rendered, keeping the
+    # animations that would have been played.
+
+    def __init__(self):
+        self.mobjects = []
+        self.animations = []
+
+    def add(self, *mobjects):
+        self.mobjects += [mobject for mobject in mobjects if mobject not in self.mobjects]
+
+    def remove(self, *mobjects):
+        self.mobjects = [mobject for mobject in self.mobjects if mobject not in mobjects]
+
+    def play(self, *animations, **kwargs):
+        self.animations += animations
+
+
+def grid_graph(edge_count, seed=0):
+    # Generates a square grid graph with roughly the given number of edges.
+
+    side = max(2, int(np.sqrt(edge_count / 2)) + 1)
+    vertices = {"%d,%d" % (x, y) : (x, y) for x in range(side) for y in range(side)}
+    edges = []
+    for x in range(side):
+        for y in range(side):
+            if x + 1 < side:
+                edges.append(("%d,%d" % (x, y), "%d,%d" % (x + 1, y)))
+            if y + 1 < side:
+                edges.append(("%d,%d" % (x, y), "%d,%d" % (x, y + 1)))
+    return vertices, edges[:edge_count]
+
+
+def random_planar_graph(edge_count, seed=0):
+    # Generates a random planar graph with roughly the given number of edges 
+    # - a jittered grid where each cell is split by one of its diagonals and 
+    # a random selection of the edges is kept.
+
+    rng = np.random.default_rng(seed)
+    side = max(2, int(np.sqrt(edge_count / 3)) + 1)
+    jitter = rng.uniform(-0.3, 0.3, (side, side, 2))
+    vertices = {
+        "%d,%d" % (x, y) : (x + jitter[x, y, 0], y + jitter[x, y, 1]) 
+        for x in range(side) for y in range(side)
+    }
+    edges = []
+    for x in range(side):
+        for y in range(side):
+            if x + 1 < side:
+                edges.append(("%d,%d" % (x, y), "%d,%d" % (x + 1, y)))
+            if y + 1 < side:
+                edges.append(("%d,%d" % (x, y), "%d,%d" % (x, y + 1)))
+            if x + 1 < side and y + 1 < side:
+                if rng.random() < 0.5:
+                    edges.append(("%d,%d" % (x, y), "%d,%d" % (x + 1, y + 1)))
+                else:
+                    edges.append(("%d,%d" % (x + 1, y), "%d,%d" % (x, y + 1)))
+    keep = np.sort(rng.permutation(len(edges))[:edge_count])
+    return vertices, [edges[i] for i in keep]
+
+
+def star_graph(edge_count, seed=0):
+    # Generates a star - one hub vertex joined to every other vertex.
+
+    angles = np.linspace(0, 2 * PI, edge_count, endpoint=False)
+    vertices = {"hub" : (0, 0)}
+    vertices.update({
+        "v%d" % i : (3 * np.cos(angle), 3 * np.sin(angle)) 
+        for (i, angle) in enumerate(angles)
+    })
+    edges = [("hub", "v%d" % i) for i in range(edge_count)]
+    return vertices, edges
+
+
+GENERATORS = {
+    "grid" : grid_graph,
+    "planar" : random_planar_graph,
+    "star" : star_graph,
+}
+
+#options passed to AngledGraph for each configuration that is benchmarked
+CONFIGURATIONS = {
+    "default" : {},
+    "optimised" : {
+        "track_dependencies" : True,
+        "edge_update" : "inplace",
+        "angle_update" : "batch",
+    },
+}
+
+
+def consecutive_angles(edges, limit):
+    # Returns an angle dictionary, as passed to add_angles, with an angle 
+    # between the first two edges at each vertex, up to the given number of 
+    # angles.
+
+    incident = {}
+    for edge in edges:
+        for vertex_label in edge:
+            incident.setdefault(vertex_label, []).append(edge)
+    angles = {}
+    for vertex_edges in incident.values():
+        if len(vertex_edges) >= 2 and len(angles) < limit:
+            angles[(vertex_edges[0], vertex_edges[1])] = 0
+    return angles
+
+
+def run_frames(animations, frames):
+    # Runs the update functions of the given animations for the given number 
+    # of frames, as the renderer would, without drawing anything.
+
+    for alpha in np.linspace(0, 1, frames):
+        for animation in animations:
+            if isinstance(animation, UpdateFromAlphaFunc):
+                animation.update_function(animation.mobject, animation.rate_func(alpha))
+            else:
+                animation.update_function(animation.mobject)
+
+
+def bench_graph(kind, edge_count, configuration, angle_limit=1000, moved=0.05, frames=10, seed=0):
+    # Times constructing a graph, adding angles to it, setting up a movement 
+    # of a proportion of its vertices and one frame of that movement.
+
+    vertices, edges = GENERATORS[kind](edge_count, seed)
+    angles = consecutive_angles(edges, angle_limit)
+    options = CONFIGURATIONS[configuration]
+    scene = RecordingScene()
+
+    start = time.perf_counter()
+    graph = AngledGraph(vertices, edges, **options)
+    init_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    graph.add_angles(scene, angles)
+    add_angles_time = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed)
+    labels = list(vertices.keys())
+    chosen = rng.permutation(len(labels))[:max(1, int(moved * len(labels)))]
+    movements = {
+        labels[i] : tuple(np.asarray(vertices[labels[i]]) + rng.uniform(-0.5, 0.5, 2)) 
+        for i in chosen
+    }
+
+    start = time.perf_counter()
+    graph.move_vertices(scene, **movements)
+    setup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    run_frames(scene.animations, frames)
+    frame_time = (time.perf_counter() - start) / frames
+
+    return {
+        "graph" : kind,
+        "configuration" : configuration,
+        "vertices" : len(vertices),
+        "edges" : len(edges),
+        "angles" : len(angles),
+        "moved_vertices" : len(movements),
+        "animations" : len(scene.animations),
+        "init_seconds" : init_time,
+        "add_angles_seconds" : add_angles_time,
+        "move_setup_seconds" : setup_time,
+        "frame_seconds" : frame_time,
+    }
+
+
+def environment():
+    # Describes the code and machine the benchmarks were run on, so that 
+    # results from different versions can be told apart.
+
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "revision" : revision,
+        "python" : platform.python_version(),
+        "numpy" : np.__version__,
+        "platform" : platform.platform(),
+        "time" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, previous_path, threshold):
+    # Prints the timings which are slower than in the results saved at the 
+    # given path by more than the given proportion, returning how many there 
+    # were.
+
+    with open(previous_path) as previous_file:
+        previous = json.load(previous_file)
+    previous_results = {
+        (result["graph"], result["configuration"], result["edges"]) : result 
+        for result in previous["results"]
+    }
+    regressions = 0
+    for result in results:
+        old = previous_results.get((result["graph"], result["configuration"], result["edges"]))
+        if old is None:
+            continue
+        for (name, value) in result.items():
+            if name.endswith("_seconds") and old.get(name) and value > old[name] * (1 + threshold):
+                regressions += 1
+                print(
+                    "regression: %s %s %d edges %s %.4fs -> %.4fs" % (
+                        result["graph"], result["configuration"], result["edges"], 
+                        name, old[name], value
+                    )
+                )
+    return regressions
+
+
+def time_call(function, repeats):
+    # Returns the fastest time taken over several calls of the function.
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_angle_update(angle_count, repeats=3, tolerance=1e-3):
+    # Times one frame of updating every angle marker individually with
+    # generate_angle_arc and become(), and together with the batched angle
+    # engine, checking that both give the same markers.
+
+    vertices, edges, angles = random_angle_graph(angle_count)
+    graph = AngledGraph(vertices, edges)
+    graph.add_angles(RecordingScene(), angles)
+    angle_keys = list(graph.angles.keys())
+
+    def update_each():
+        for angle_key in angle_keys:
+            graph.update_for_angle(angle_key)(graph.angles[angle_key])
+
+    scalar_time = time_call(update_each, repeats)
+    expected = [graph.angles[angle_key].copy() for angle_key in angle_keys]
+
+    batch_update = graph.update_angles_batch(angle_keys)
+    batch_time = time_call(lambda : batch_update(graph.angleImage), repeats)
+
+    #compare the markers - arcs point for point and right angles by corners
+    for expected_marker, angle_key in zip(expected, angle_keys):
+        points = graph.angles[angle_key].points
+        if isinstance(expected_marker, Polygon):
+            matches = np.allclose(expected_marker.get_vertices(), points[::8][:4], atol=tolerance)
+        else:
+            matches = np.allclose(expected_marker.points, points, atol=tolerance)
+        if not matches:
+            raise AssertionError("batched marker differs for angle %s" % (angle_key,))
+
+    return {
+        "angles": angle_count,
+        "scalar_seconds": scalar_time,
+        "batch_seconds": batch_time,
+        "speedup": scalar_time / batch_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AngledGraph without rendering.")
+    parser.add_argument("--output", default="bench_output.json", help="file to write the results to")
+    parser.add_argument("--max-edges", type=int, default=100000, help="largest graph to benchmark")
+    parser.add_argument("--graphs", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--configurations", nargs="+", default=list(CONFIGURATIONS), choices=list(CONFIGURATIONS))
+    parser.add_argument("--frames", type=int, default=10, help="frames of each movement to time")
+    parser.add_argument("--compare", help="earlier results to check for regressions against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown counted as a regression")
+    arguments = parser.parse_args()
+
+    results = []
+    for edge_count in (10, 100, 1000, 10000, 100000):
+        if edge_count > arguments.max_edges:
+            break
+        for kind in arguments.graphs:
+            for configuration in arguments.configurations:
+                result = bench_graph(kind, edge_count, configuration, frames=arguments.frames)
+                results.append(result)
+                print(
+                    "%-7s %-10s %7d edges: init %.4fs, add_angles %.4fs, "
+                    "move setup %.4fs, frame %.4fs" % (
+                        kind, configuration, result["edges"], result["init_seconds"], 
+                        result["add_angles_seconds"], result["move_setup_seconds"], 
+                        result["frame_seconds"]
+                    )
+                )
+
+    angle_results = []
+    for angle_count in (1000, 10000):
+        result = bench_angle_update(angle_count)
+        angle_results.append(result)
+        print(
+            "%6d angles: scalar %.4fs, batch %.4fs, speedup %.1fx" % (
+                result["angles"],
+                result["scalar_seconds"],
+                result["batch_seconds"],
+                result["speedup"],
+            )
+        )
+
+    with open(arguments.output, "w") as output_file:
+        json.dump(
+            {
+                "environment" : environment(), 
+                "results" : results, 
+                "angle_update" : angle_results
+            }, 
+            output_file, 
+            indent=2
+        )
+
+    if arguments.compare is not None:
+        if compare(results, arguments.compare, arguments.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import numpy as np
+
+from angle_geometry import CENTRE, EDGE1_START, EDGE2_END, AngleBatch
+
+
+def right_angle_rows(core):
+    # Returns the rows of the angles of the core that are currently shown as
+    # right angles.
+
+    batch = AngleBatch(core.angle_vertex_indices(), core.angle_choices[:core.angle_count()])
+    batch.update(core.positions)
+    return np.flatnonzero(batch.right)
+
+
+def wrap(angles):
+    # Returns the given angles wrapped to between -pi and pi.
+    return np.angle(np.exp(1j * angles))
+
+
+class AngleSolver():
+    def __init__(self, core, pinned, angle_rows=None, regularization=1e-2, damping=1e-3):
+        """ The solver keeps angles of a GraphCore at the size they have
+        when it is made while some vertices are moved. The vertices with the
+        pinned indices are placed by the caller, and the other vertices of
+        the constrained angles are solved for so that the angles (the signed
+        sweep from their first edge to their second) stay as they were.
+        The angles are those in the given rows, or the right angles of the
+        core if no rows are given.
+        Every constraint is solved at once with the Levenberg-Marquardt
+        method. Each iteration solves the damped Gauss-Newton equations with
+        the conjugate gradient method, using the Jacobian (which has one row
+        of six entries per angle) without ever building the matrix. The
+        damping never drops below the given regularization (measured against
+        the typical length of the edges), which keeps each step short, so
+        that the solved vertices move as little as they can to keep the
+        angles. Solving a sequence of frames starts each frame from the
+        solution of the one before, along with the damping it ended with. """
+
+        if angle_rows is None:
+            angle_rows = right_angle_rows(core)
+        angle_vertices = core.angle_vertex_indices(angle_rows)[:, [EDGE1_START, CENTRE, EDGE2_END]]
+        pinned = np.asarray(pinned, dtype=np.intp)
+
+        #the vertices the solver works on, in the order of their indices
+        self.vertex_indices = np.unique(np.concatenate((angle_vertices.ravel(), pinned)))
+        self.base_positions = core.positions[self.vertex_indices].copy()
+        self.positions = self.base_positions[:, :2].copy()
+        self.angle_vertices = np.searchsorted(self.vertex_indices, angle_vertices).reshape(-1, 3)
+        self.pinned = np.searchsorted(self.vertex_indices, pinned)
+        free = np.ones(len(self.vertex_indices), dtype=bool)
+        free[self.pinned] = False
+        self.free = np.flatnonzero(free)
+
+        #the position of each angle's vertices among the solved vertices,
+        #with the vertices that are not solved for sent to an extra slot
+        slots = np.full(len(self.vertex_indices), len(self.free))
+        slots[self.free] = np.arange(len(self.free))
+        self.slots = slots[self.angle_vertices]
+
+        self.targets = self.sweeps(self.positions)[0]
+        lengths = np.hypot(*(self.positions[self.angle_vertices[:, [0, 2]]] -
+            self.positions[self.angle_vertices[:, 1:2]]).reshape(-1, 2).T)
+        scale = np.median(lengths) if len(lengths) else 1.0
+        self.regularization = regularization / max(scale, 1e-12) ** 2
+        self.damping = damping
+        self.iterations = 0
+
+    def sweeps(self, positions):
+        # Returns the sweep of every angle for the given positions of the
+        # solved vertices, along with the derivatives of each sweep with
+        # respect to the positions of its three vertices as an
+        # (angles x 3 x 2) array.
+
+        starts = positions[self.angle_vertices[:, 0]]
+        centres = positions[self.angle_vertices[:, 1]]
+        ends = positions[self.angle_vertices[:, 2]]
+        to_start = starts - centres
+        to_end = ends - centres
+        sweeps = wrap(
+            np.arctan2(to_end[:, 1], to_end[:, 0]) - np.arctan2(to_start[:, 1], to_start[:, 0])
+        )
+
+        #turning an edge about the centre changes the sweep by the turn
+        #divided by the edge's length
+        gradients = np.empty((len(sweeps), 3, 2))
+        gradients[:, 0, 0] = to_start[:, 1]
+        gradients[:, 0, 1] = -to_start[:, 0]
+        gradients[:, 0] /= np.maximum(np.einsum("ij,ij->i", to_start, to_start), 1e-24)[:, None]
+        gradients[:, 2, 0] = -to_end[:, 1]
+        gradients[:, 2, 1] = to_end[:, 0]
+        gradients[:, 2] /= np.maximum(np.einsum("ij,ij->i", to_end, to_end), 1e-24)[:, None]
+        gradients[:, 1] = -(gradients[:, 0] + gradients[:, 2])
+        return sweeps, gradients
+
+    def jacobian_product(self, gradients, steps):
+        # Returns the change in every sweep for the given steps of the
+        # solved vertices.
+
+        steps = np.vstack((steps, np.zeros((1, 2))))
+        return sum(
+            np.einsum("ij,ij->i", gradients[:, column], steps[self.slots[:, column]])
+            for column in range(3)
+        )
+
+    def transpose_product(self, gradients, weights):
+        # Returns the sum over the angles of each angle's derivatives with
+        # respect to each solved vertex, weighted by the given weights.
+
+        result = np.zeros((len(self.free) + 1, 2))
+        for column in range(3):
+            for axis in range(2):
+                result[:, axis] += np.bincount(
+                    self.slots[:, column],
+                    weights=gradients[:, column, axis] * weights,
+                    minlength=len(self.free) + 1
+                )
+        return result[:-1]
+
+    def conjugate_gradient(self, gradients, shift, right_side, iterations, tolerance):
+        # Solves (J^T J + shift) x = right_side for the steps x of the solved
+        # vertices, preconditioned by the diagonal of the matrix.
+
+        diagonal = np.full((len(self.free) + 1, 2), shift)
+        for column in range(3):
+            for axis in range(2):
+                diagonal[:, axis] += np.bincount(
+                    self.slots[:, column],
+                    weights=gradients[:, column, axis] ** 2,
+                    minlength=len(self.free) + 1
+                )
+        diagonal = diagonal[:-1]
+
+        steps = np.zeros_like(right_side)
+        residual = right_side.copy()
+        preconditioned = residual / diagonal
+        direction = preconditioned.copy()
+        product = np.sum(residual * preconditioned)
+        limit = tolerance * tolerance * np.sum(right_side * right_side)
+        for _ in range(iterations):
+            if np.sum(residual * residual) <= limit:
+                break
+            applied = (
+                self.transpose_product(gradients, self.jacobian_product(gradients, direction)) +
+                shift * direction
+            )
+            size = product / np.sum(direction * applied)
+            steps += size * direction
+            residual -= size * applied
+            preconditioned = residual / diagonal
+            next_product = np.sum(residual * preconditioned)
+            direction = preconditioned + (next_product / product) * direction
+            product = next_product
+        return steps
+
+    def solve(self, pinned_positions, iterations=20, tolerance=1e-6, cg_iterations=20):
+        # Places the pinned vertices at the given positions (one row for
+        # each pinned index, in the order given to the solver) and solves
+        # for the other vertices, starting from where they are. Returns the
+        # positions of every vertex the solver works on, in the order of
+        # vertex_indices.
+
+        positions = self.positions
+        positions[self.pinned] = np.asarray(pinned_positions, dtype=float)[:, :2]
+        if len(self.free) == 0 or len(self.angle_vertices) == 0:
+            return positions
+
+        (sweeps, gradients) = self.sweeps(positions)
+        errors = wrap(sweeps - self.targets)
+        current = np.sum(errors * errors)
+        for _ in range(iterations):
+            if np.max(np.abs(errors)) <= tolerance:
+                break
+            self.iterations += 1
+            steps = self.conjugate_gradient(
+                gradients, 
+                self.regularization + self.damping, 
+                -self.transpose_product(gradients, errors), 
+                cg_iterations, 
+                1e-3
+            )
+
+            trial = positions.copy()
+            trial[self.free] += steps
+            (trial_sweeps, trial_gradients) = self.sweeps(trial)
+            trial_errors = wrap(trial_sweeps - self.targets)
+            trial_cost = np.sum(trial_errors * trial_errors)
+            if trial_cost < current:
+                #a good step - trust the Gauss-Newton model more next time
+                positions[:] = trial
+                (gradients, errors, current) = (trial_gradients, trial_errors, trial_cost)
+                self.damping = max(self.damping / 3, 1e-9)
+            else:
+                self.damping *= 10
+        return positions
+
+    def solve_frames(self, pinned_frames, **options):
+        # Solves every frame of a movement of the pinned vertices, given as a
+        # (frames x pinned vertices x 3) array, each starting from the
+        # solution of the frame before. Returns the positions of every
+        # vertex the solver works on in every frame as a
+        # (frames x vertices x 3) array.
+
+        frames = np.repeat(self.base_positions[None], len(pinned_frames), axis=0)
+        for (frame, pinned_positions) in enumerate(pinned_frames):
+            frames[frame, :, :2] = self.solve(pinned_positions, **options)
+        return frames
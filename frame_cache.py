@@ -0,0 +1,341 @@
+import hashlib
+import multiprocessing
+import os
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from angle_geometry import MARKER_POINTS, AngleBatch
+
+
+class BakedMotion():
+    def __init__(self, vertex_indices, vertex_positions, edge_rows, edge_points,
+        angle_rows, angle_points, angle_right):
+        """ A baked motion holds the geometry of every frame of a movement of
+        some vertices of a graph, sampled up front so that the movement can
+        be replayed without recomputing anything. The vertex positions are a
+        (frames x moved vertices x 3) array for the vertices with the given
+        indices. The edge points are a (frames x edges x 4 x 3) array of the
+        points of the straight edges in the given rows, and the angle points
+        and right flags give the markers of the angles in the given rows as
+        computed by an AngleBatch. Only the vertices, edges and angles that
+        the movement changes are held. """
+
+        self.vertex_indices = vertex_indices
+        self.vertex_positions = vertex_positions
+        self.edge_rows = edge_rows
+        self.edge_points = edge_points
+        self.angle_rows = angle_rows
+        self.angle_points = angle_points
+        self.angle_right = angle_right
+
+    def frame_count(self):
+        return len(self.vertex_positions)
+
+    def frame(self, alpha):
+        # Returns the index of the frame closest to the given proportion of
+        # the way through the movement.
+
+        last = self.frame_count() - 1
+        return min(max(int(round(alpha * last)), 0), last)
+
+    def save(self, path):
+        # Writes the baked motion to an uncompressed .npz file.
+
+        np.savez(
+            path,
+            vertex_indices=self.vertex_indices,
+            vertex_positions=self.vertex_positions,
+            edge_rows=self.edge_rows,
+            edge_points=self.edge_points,
+            angle_rows=self.angle_rows,
+            angle_points=self.angle_points,
+            angle_right=self.angle_right,
+        )
+
+    @staticmethod
+    def load(path):
+        # Reads a baked motion written by save.
+
+        with np.load(path) as arrays:
+            return BakedMotion(**{name: arrays[name] for name in arrays.files})
+
+
+def sample_rate(rate_func, frame_count):
+    # Returns the proportion of the movement completed at each of the given
+    # number of evenly spaced frames, as given by the rate function.
+
+    times = np.linspace(0, 1, frame_count)
+    return np.fromiter((rate_func(t) for t in times), dtype=float, count=frame_count)
+
+
+def bake_motion(core, movements, frame_count, rate_func, angle_rows=None, processes=1):
+    # Samples the movement of the vertices in the given label-coordinates
+    # dictionary from their current positions in the core over the given
+    # number of frames, and derives the geometry of the edges and angles that
+    # depend on them for every frame at once. The angles considered can be
+    # restricted to the given rows, otherwise every angle depending on a
+    # moved vertex is baked. The frames are baked by the given number of
+    # processes.
+
+    vertex_labels = list(movements.keys())
+    vertex_indices = core.indices(vertex_labels)
+    starts = core.positions[vertex_indices]
+    targets = starts.copy()
+    for (i, new_coordinates) in enumerate(movements.values()):
+        targets[i, :2] = new_coordinates[:2]
+
+    alphas = sample_rate(rate_func, frame_count)
+    vertex_positions = starts + alphas[:, None, None] * (targets - starts)
+    return bake_positions(core, vertex_indices, vertex_positions, angle_rows, processes)
+
+
+def bake_positions(core, vertex_indices, vertex_positions, angle_rows=None, processes=1):
+    # Derives the geometry of the edges and angles of the core for every
+    # frame of a movement, given the positions of the moved vertices with the
+    # given indices in each frame as a (frames x moved vertices x 3) array.
+    # The other vertices stay where they are in the core. The angles
+    # considered can be restricted to the given rows, otherwise every angle
+    # depending on a moved vertex is baked. With more than one process the
+    # frames are split into chunks baked by a pool of processes (see
+    # bake_frames_parallel), which gives exactly the same result.
+
+    vertex_indices = np.asarray(vertex_indices, dtype=np.intp)
+    (edge_rows, angle_rows, plan) = motion_plan(core, vertex_indices, angle_rows)
+    if processes > 1 and len(vertex_positions) > 1:
+        (edge_points, angle_points, angle_right) = bake_frames_parallel(plan, vertex_positions, processes)
+    else:
+        (edge_points, angle_points, angle_right) = bake_frames(*plan, vertex_positions)
+
+    return BakedMotion(
+        vertex_indices,
+        vertex_positions,
+        edge_rows,
+        edge_points,
+        angle_rows,
+        angle_points,
+        angle_right,
+    )
+
+
+def motion_plan(core, vertex_indices, angle_rows=None):
+    # Works out which edges and angles of the core move with the vertices
+    # with the given indices, restricting the angles to the given rows if
+    # any are given. Returns the rows of the edges and angles along with the
+    # arrays bake_frames needs, which describe them without the core - the
+    # positions of the vertices they use (in the order of their indices),
+    # where the moved vertices are among them, the edges and angles in terms
+    # of those vertices, and the angle choices.
+
+    edge_rows = set()
+    dependent_angles = set()
+    for index in vertex_indices:
+        edge_rows |= core.vertex_edges[index]
+        dependent_angles |= core.vertex_angles[index]
+    if angle_rows is not None:
+        dependent_angles &= set(angle_rows)
+    edge_rows = np.array(sorted(edge_rows), dtype=np.intp)
+    angle_rows = np.array(sorted(dependent_angles), dtype=np.intp)
+
+    angle_vertices = core.angle_vertex_indices(angle_rows)
+    edge_vertices = core.edge_array[edge_rows]
+    local = np.unique(np.concatenate((
+        vertex_indices, edge_vertices.ravel(), angle_vertices.ravel()
+    )))
+    plan = (
+        core.positions[local],
+        np.searchsorted(local, vertex_indices),
+        np.searchsorted(local, edge_vertices).reshape(-1, 2),
+        np.searchsorted(local, angle_vertices).reshape(-1, 5),
+        core.angle_choices[angle_rows],
+    )
+    return edge_rows, angle_rows, plan
+
+
+def bake_frames(base_positions, moved, edge_vertices, angle_vertices, choices, vertex_positions):
+    # Computes the points of the edges and angles described by a plan from
+    # motion_plan for every frame of a movement, given the positions of the
+    # moved vertices in each frame. Returns the edge points, angle points
+    # and right angle flags of every frame. Each frame is computed on its
+    # own, so baking some of the frames gives the same result for them as
+    # baking all of them.
+
+    frame_count = len(vertex_positions)
+    local_positions = np.repeat(base_positions[None], frame_count, axis=0)
+    local_positions[:, moved] = vertex_positions
+
+    #edges are straight lines between their vertices
+    line_alphas = np.linspace(0, 1, 4)[:, None]
+    edge_starts = local_positions[:, edge_vertices[:, 0]][:, :, None]
+    edge_ends = local_positions[:, edge_vertices[:, 1]][:, :, None]
+    edge_points = edge_starts + line_alphas * (edge_ends - edge_starts)
+
+    #every angle in every frame is computed by one batch, with the frames
+    #laid end to end in the position array
+    local_count = len(base_positions)
+    frame_offsets = np.arange(frame_count)[:, None, None] * local_count
+    batch = AngleBatch(
+        (angle_vertices[None] + frame_offsets).reshape(-1, 5),
+        np.tile(choices, frame_count)
+    )
+    batch.update(local_positions.reshape(-1, 3))
+
+    return (
+        edge_points,
+        batch.points.reshape(frame_count, len(angle_vertices), MARKER_POINTS, 3),
+        batch.right.reshape(frame_count, len(angle_vertices)),
+    )
+
+
+def bake_frames_parallel(plan, vertex_positions, processes, chunk_frames=None):
+    # Computes the same result as bake_frames with a pool of the given
+    # number of processes. The plan, the vertex positions and the results
+    # are held in shared memory, and the frames are split into chunks of the
+    # given size (by default enough for four chunks per process) that the
+    # processes bake straight into the shared results. As every frame is
+    # computed on its own by the same code, the result does not depend on
+    # how the frames are split.
+
+    frame_count = len(vertex_positions)
+    edge_count = len(plan[2])
+    angle_count = len(plan[3])
+    inputs = dict(zip(
+        ("base_positions", "moved", "edge_vertices", "angle_vertices", "choices", "vertex_positions"),
+        plan + (np.asarray(vertex_positions, dtype=float),)
+    ))
+    outputs = {
+        "edge_points" : ((frame_count, edge_count, 4, 3), np.dtype(float)),
+        "angle_points" : ((frame_count, angle_count, MARKER_POINTS, 3), np.dtype(float)),
+        "angle_right" : ((frame_count, angle_count), np.dtype(bool)),
+    }
+    if chunk_frames is None:
+        chunk_frames = max(1, -(-frame_count // (4 * processes)))
+
+    blocks = []
+    views = {}
+    specs = {}
+    try:
+        for (name, (shape, dtype)) in list(outputs.items()) + [
+            (name, (array.shape, array.dtype)) for (name, array) in inputs.items()
+        ]:
+            block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+            blocks.append(block)
+            views[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            specs[name] = (block.name, shape, dtype.str)
+        for (name, array) in inputs.items():
+            views[name][...] = array
+
+        with multiprocessing.Pool(processes) as pool:
+            pool.starmap(bake_chunk, [
+                (specs, start, min(start + chunk_frames, frame_count))
+                for start in range(0, frame_count, chunk_frames)
+            ])
+        return tuple(views[name].copy() for name in outputs)
+    finally:
+        #the views have to be let go of before the memory can be closed
+        views.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def bake_chunk(specs, start, stop):
+    # Bakes the frames from start up to stop in a worker process of
+    # bake_frames_parallel, reading the plan and writing the results through
+    # the shared memory described by the given specs.
+
+    blocks = []
+    views = {}
+    try:
+        for (name, (block_name, shape, dtype)) in specs.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            views[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        (edge_points, angle_points, angle_right) = bake_frames(
+            views["base_positions"],
+            views["moved"],
+            views["edge_vertices"],
+            views["angle_vertices"],
+            views["choices"],
+            views["vertex_positions"][start:stop],
+        )
+        views["edge_points"][start:stop] = edge_points
+        views["angle_points"][start:stop] = angle_points
+        views["angle_right"][start:stop] = angle_right
+    finally:
+        views.clear()
+        for block in blocks:
+            block.close()
+
+
+class FrameCache():
+    def __init__(self, max_entries=16, directory=None, processes=1):
+        """ A frame cache keeps baked motions so that replaying the same
+        movement of the same graph does not bake it again. Motions are keyed
+        on a hash of the graph's positions, edges and angles together with
+        the movement, frame count and rate function. The most recently used
+        motions are kept in memory, up to the given number of them, and if a
+        directory is given every motion is also written there so that later
+        renders can load it instead of baking it. Motions that have to be
+        baked are baked by the given number of processes. """
+
+        self.max_entries = max_entries
+        self.processes = processes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(core, movements, frame_count, rate_func, angle_rows=None):
+        # Returns the key a baked motion is stored under. The movement is
+        # keyed on the indices of the moved vertices and their target
+        # coordinates, and the rate function on the proportions it gives at
+        # every frame, so that any two rate functions giving the same frames
+        # share a key and any two that differ do not, whatever they are
+        # called.
+
+        digest = hashlib.sha1()
+        for array in (core.get_positions(), core.get_edges(), core.get_angles(),
+            core.angle_choices[:core.angle_count()]):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        targets = np.array(
+            [tuple(float(c) for c in coordinates[:2]) for coordinates in movements.values()],
+            dtype=float
+        ).reshape(-1, 2)
+        for array in (core.indices(movements.keys()), targets, sample_rate(rate_func, frame_count)):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        digest.update(repr((
+            frame_count,
+            None if angle_rows is None else sorted(int(row) for row in angle_rows),
+        )).encode())
+        return digest.hexdigest()
+
+    def get(self, core, movements, frame_count, rate_func, angle_rows=None):
+        # Returns the baked motion for the given movement, baking it only if
+        # it is not already cached.
+
+        key = FrameCache.key(core, movements, frame_count, rate_func, angle_rows)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        path = None
+        if self.directory is not None:
+            path = os.path.join(self.directory, key + ".npz")
+        if path is not None and os.path.exists(path):
+            self.hits += 1
+            motion = BakedMotion.load(path)
+        else:
+            self.misses += 1
+            motion = bake_motion(core, movements, frame_count, rate_func, angle_rows, self.processes)
+            if path is not None:
+                os.makedirs(self.directory, exist_ok=True)
+                motion.save(path)
+
+        self.entries[key] = motion
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return motion
@@ -0,0 +1,382 @@
+import numpy as np
+
+
+class GraphCore():
+    def __init__(self):
+        """ The core holds the structure and geometry of an angled graph in
+        compact arrays so that it can be built, queried and mutated without
+        any mobjects. Vertex labels are interned to indices into an Nx3
+        array of positions. Edges are rows of an Ex2 array of vertex indices
+        and are keyed by their pair of vertex labels. Angles are rows of an
+        Ax3 array holding the rows of the two edges they are between and the
+        index of the vertex they are centred about, and are keyed by their
+        pair of edge label pairs in the same way as AngledGraph.add_angles.
+        The arrays are allocated with spare capacity and grow by doubling.
+        Removals move the last vertex, edge or angle into the freed row so
+        that the arrays stay packed; the indices and rows of the remaining
+        entries may therefore change, while their labels and keys never do.
+        Each vertex also records the rows of its incident edges and of the
+        angles that depend on it. """
+
+        #vertices
+        self.labels = []
+        self.label_index = {}
+        self.positions = np.zeros((0, 3))
+        self.vertex_edges = []
+        self.vertex_angles = []
+
+        #edges
+        self.edge_keys = []
+        self.edge_index = {}
+        self.edge_array = np.zeros((0, 2), dtype=np.intp)
+
+        #angles, along with the choice of which of the two angles between the
+        #edges is shown
+        self.angle_keys = []
+        self.angle_index = {}
+        self.angle_array = np.zeros((0, 3), dtype=np.intp)
+        self.angle_choices = np.zeros(0, dtype=np.int8)
+
+    @staticmethod
+    def grow(array, count):
+        # Returns the given array with room for at least count rows, doubling
+        # its capacity if it is too small.
+
+        if count <= len(array):
+            return array
+        capacity = max(count, 2 * len(array), 16)
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def vertex_count(self):
+        return len(self.labels)
+
+    def edge_count(self):
+        return len(self.edge_keys)
+
+    def angle_count(self):
+        return len(self.angle_keys)
+
+    def get_positions(self):
+        # Returns a view of the positions of every vertex, in index order.
+        return self.positions[:len(self.labels)]
+
+    def get_edges(self):
+        # Returns a view of the vertex indices of every edge, in row order.
+        return self.edge_array[:len(self.edge_keys)]
+
+    def get_angles(self):
+        # Returns a view of the edge rows and centre vertex of every angle.
+        return self.angle_array[:len(self.angle_keys)]
+
+    def add_vertex(self, label, coordinates):
+        # Adds a vertex with the given label at the given coordinates, which
+        # may have two or three components, and returns its index.
+
+        return self.add_vertices([label], [coordinates])[0]
+
+    def add_vertices(self, labels, coordinates):
+        # Adds several vertices at once from a sequence of labels and an
+        # array-like of coordinates with one row per label. Returns the
+        # range of indices given to the new vertices.
+
+        labels = list(labels)
+        start = len(self.labels)
+        if not labels:
+            return range(start, start)
+        coordinates = np.asarray(coordinates, dtype=float).reshape(len(labels), -1)
+        for label in labels:
+            if label in self.label_index:
+                raise ValueError("vertex %r already exists" % (label,))
+
+        self.positions = GraphCore.grow(self.positions, start + len(labels))
+        self.positions[start:start + len(labels)] = 0
+        self.positions[start:start + len(labels), :coordinates.shape[1]] = coordinates
+        for (i, label) in enumerate(labels, start):
+            self.label_index[label] = i
+            self.labels.append(label)
+            self.vertex_edges.append(set())
+            self.vertex_angles.append(set())
+        return range(start, start + len(labels))
+
+    def adopt_positions(self, positions, labels):
+        # Gives an empty core vertices with the given labels at the given
+        # (N, 3) array of positions, which the core then uses as its own
+        # position array without copying it. This lets a memory mapped array
+        # back the positions of a large graph.
+
+        if self.labels:
+            raise ValueError("positions can only be adopted by an empty core")
+        labels = list(labels)
+        if len(labels) != len(positions):
+            raise ValueError("there must be one label for each position")
+        self.label_index = {label : i for (i, label) in enumerate(labels)}
+        if len(self.label_index) != len(labels):
+            raise ValueError("vertex labels must be unique")
+        self.labels = labels
+        self.positions = positions
+        self.vertex_edges = [set() for _ in labels]
+        self.vertex_angles = [set() for _ in labels]
+
+    def adopt_structure(self, edge_array, angle_array, angle_choices):
+        # Gives a core whose vertices were adopted, and which has no edges,
+        # the edges and angles in the given arrays, laid out as in the core.
+        # As with adopt_positions the arrays are used without being copied,
+        # and only the keys and the per vertex rows are rebuilt from them.
+
+        if self.edge_keys:
+            raise ValueError("edges can only be adopted by a core without any")
+        self.edge_array = edge_array
+        self.edge_keys = [(self.labels[v1], self.labels[v2]) for (v1, v2) in edge_array.tolist()]
+        self.edge_index = {edge_key : row for (row, edge_key) in enumerate(self.edge_keys)}
+        if len(self.edge_index) != len(self.edge_keys):
+            raise ValueError("edges must be unique")
+        for (row, (vertex1, vertex2)) in enumerate(edge_array.tolist()):
+            self.vertex_edges[vertex1].add(row)
+            self.vertex_edges[vertex2].add(row)
+
+        self.angle_array = angle_array
+        self.angle_choices = angle_choices
+        self.angle_keys = [
+            (self.edge_keys[edge1_row], self.edge_keys[edge2_row])
+            for (edge1_row, edge2_row, _) in angle_array.tolist()
+        ]
+        self.angle_index = {angle_key : row for (row, angle_key) in enumerate(self.angle_keys)}
+        for row in range(len(self.angle_keys)):
+            for vertex in self.angle_vertices(row):
+                self.vertex_angles[vertex].add(row)
+
+    def add_edge(self, edge_key):
+        # Adds an edge joining the two vertices whose labels make up the key
+        # and returns its row.
+
+        return self.add_edges([edge_key])[0]
+
+    def add_edges(self, edge_keys):
+        # Adds several edges at once from a sequence of label pairs. Returns
+        # the range of rows given to the new edges.
+
+        edge_keys = [tuple(edge_key) for edge_key in edge_keys]
+        start = len(self.edge_keys)
+        self.edge_array = GraphCore.grow(self.edge_array, start + len(edge_keys))
+        for (row, edge_key) in enumerate(edge_keys, start):
+            if edge_key in self.edge_index:
+                raise ValueError("edge %r already exists" % (edge_key,))
+            vertex1 = self.label_index[edge_key[0]]
+            vertex2 = self.label_index[edge_key[1]]
+            self.edge_array[row] = (vertex1, vertex2)
+            self.edge_index[edge_key] = row
+            self.edge_keys.append(edge_key)
+            self.vertex_edges[vertex1].add(row)
+            self.vertex_edges[vertex2].add(row)
+        return range(start, start + len(edge_keys))
+
+    def add_angle(self, angle_key, choice=0):
+        # Adds the angle between the two edges whose label pairs make up the
+        # key and returns its row. The angle is centred about the vertex the
+        # edges share.
+
+        if angle_key in self.angle_index:
+            raise ValueError("angle %r already exists" % (angle_key,))
+        edge1_row = self.edge_index[angle_key[0]]
+        edge2_row = self.edge_index[angle_key[1]]
+        centre = self.shared_vertex(edge1_row, edge2_row)
+
+        row = len(self.angle_keys)
+        self.angle_array = GraphCore.grow(self.angle_array, row + 1)
+        self.angle_choices = GraphCore.grow(self.angle_choices, row + 1)
+        self.angle_array[row] = (edge1_row, edge2_row, centre)
+        self.angle_choices[row] = choice
+        self.angle_index[angle_key] = row
+        self.angle_keys.append(angle_key)
+        for vertex in self.angle_vertices(row):
+            self.vertex_angles[vertex].add(row)
+        return row
+
+    def shared_vertex(self, edge1_row, edge2_row):
+        # Returns the index of the vertex the two edges meet at. Following
+        # AngledGraph.add_angles this is the end of the first edge when it
+        # lies on the second edge.
+
+        (start1, end1) = self.edge_array[edge1_row]
+        if end1 in self.edge_array[edge2_row]:
+            return end1
+        if start1 in self.edge_array[edge2_row]:
+            return start1
+        raise ValueError(
+            "edges %r and %r do not share a vertex" % (
+                self.edge_keys[edge1_row], self.edge_keys[edge2_row]
+            )
+        )
+
+    def angle_vertices(self, row):
+        # Returns the set of indices of the vertices the angle in the given
+        # row depends on.
+
+        (edge1_row, edge2_row, _) = self.angle_array[row]
+        return set(self.edge_array[edge1_row]) | set(self.edge_array[edge2_row])
+
+    def remove_angle(self, angle_key):
+        # Removes the angle with the given key, moving the last angle into
+        # its row.
+
+        row = self.angle_index.pop(angle_key)
+        for vertex in self.angle_vertices(row):
+            self.vertex_angles[vertex].discard(row)
+
+        last = len(self.angle_keys) - 1
+        if row != last:
+            moved_key = self.angle_keys[last]
+            for vertex in self.angle_vertices(last):
+                self.vertex_angles[vertex].discard(last)
+                self.vertex_angles[vertex].add(row)
+            self.angle_array[row] = self.angle_array[last]
+            self.angle_choices[row] = self.angle_choices[last]
+            self.angle_keys[row] = moved_key
+            self.angle_index[moved_key] = row
+        self.angle_keys.pop()
+
+    def clear_angles(self):
+        # Removes every angle.
+
+        for angle_rows in self.vertex_angles:
+            angle_rows.clear()
+        self.angle_keys = []
+        self.angle_index = {}
+
+    def remove_edge(self, edge_key):
+        # Removes the edge with the given key, moving the last edge into its
+        # row. Edges that angles are defined by cannot be removed.
+
+        row = self.edge_index[edge_key]
+        if self.edge_angles(row):
+            raise ValueError("edge %r has angles defined by it" % (edge_key,))
+        del self.edge_index[edge_key]
+        for vertex in self.edge_array[row]:
+            self.vertex_edges[vertex].discard(row)
+
+        last = len(self.edge_keys) - 1
+        if row != last:
+            moved_key = self.edge_keys[last]
+            for vertex in self.edge_array[last]:
+                self.vertex_edges[vertex].discard(last)
+                self.vertex_edges[vertex].add(row)
+            #angles defined by the moved edge refer to it by its row
+            for angle_row in self.edge_angles(last):
+                angle = self.angle_array[angle_row]
+                angle[:2][angle[:2] == last] = row
+            self.edge_array[row] = self.edge_array[last]
+            self.edge_keys[row] = moved_key
+            self.edge_index[moved_key] = row
+        self.edge_keys.pop()
+
+    def edge_angles(self, row):
+        # Returns the rows of the angles that are defined by the edge in the
+        # given row.
+
+        vertex = self.edge_array[row][0]
+        return [
+            angle_row for angle_row in self.vertex_angles[vertex]
+            if row in self.angle_array[angle_row][:2]
+        ]
+
+    def remove_vertex(self, label):
+        # Removes the vertex with the given label, moving the last vertex
+        # into its index. The vertex must not have any incident edges.
+
+        index = self.label_index[label]
+        if self.vertex_edges[index]:
+            raise ValueError("vertex %r still has edges" % (label,))
+        del self.label_index[label]
+
+        last = len(self.labels) - 1
+        if index != last:
+            moved_label = self.labels[last]
+            #edges and angles refer to the moved vertex by its index
+            for row in self.vertex_edges[last]:
+                edge = self.edge_array[row]
+                edge[edge == last] = index
+            for row in self.vertex_angles[last]:
+                if self.angle_array[row][2] == last:
+                    self.angle_array[row][2] = index
+            self.positions[index] = self.positions[last]
+            self.vertex_edges[index] = self.vertex_edges[last]
+            self.vertex_angles[index] = self.vertex_angles[last]
+            self.labels[index] = moved_label
+            self.label_index[moved_label] = index
+        self.labels.pop()
+        self.vertex_edges.pop()
+        self.vertex_angles.pop()
+
+    def incident_edges(self, labels):
+        # Returns the set of keys of the edges incident to any of the
+        # vertices with the given labels.
+
+        rows = set()
+        for label in labels:
+            rows |= self.vertex_edges[self.label_index[label]]
+        return {self.edge_keys[row] for row in rows}
+
+    def incident_angles(self, labels):
+        # Returns the set of keys of the angles that depend on any of the
+        # vertices with the given labels.
+
+        rows = set()
+        for label in labels:
+            rows |= self.vertex_angles[self.label_index[label]]
+        return {self.angle_keys[row] for row in rows}
+
+    def get_position(self, label):
+        # Returns a copy of the position of the vertex with the given label.
+        return self.positions[self.label_index[label]].copy()
+
+    def set_positions(self, labels, coordinates):
+        # Moves the vertices with the given labels to the given coordinates,
+        # one row per label.
+
+        indices = self.indices(labels)
+        if len(indices) == 0:
+            return
+        coordinates = np.asarray(coordinates, dtype=float).reshape(len(indices), -1)
+        self.positions[indices, :coordinates.shape[1]] = coordinates
+
+    def indices(self, labels):
+        # Returns an array of the indices of the vertices with the given
+        # labels.
+
+        return np.fromiter(
+            (self.label_index[label] for label in labels), dtype=np.intp
+        )
+
+    def get_edge_endpoints(self, edge_key):
+        # Returns the start and end of the edge with the given key as a 2x3
+        # array.
+
+        return self.positions[self.edge_array[self.edge_index[edge_key]]]
+
+    def get_edge_angle(self, edge_key):
+        # Returns the angle of the edge with the given key, from its start to
+        # its end.
+
+        (start, end) = self.get_edge_endpoints(edge_key)
+        return np.arctan2(end[1] - start[1], end[0] - start[0])
+
+    def angle_vertex_indices(self, rows=None):
+        # Returns the vertex indices describing the angles in the given rows
+        # (or every angle) in the column order used by AngleBatch - the start
+        # and end of both edges followed by the centre of the angle. The
+        # edges are oriented so that the first ends at the centre and the
+        # second starts at it, whichever way round they were added.
+
+        angles = self.get_angles() if rows is None else self.angle_array[np.asarray(rows, dtype=np.intp)]
+        edges1 = self.edge_array[angles[:, 0]]
+        edges2 = self.edge_array[angles[:, 1]]
+        centres = angles[:, 2]
+        vertex_indices = np.empty((len(angles), 5), dtype=np.intp)
+        vertex_indices[:, 0] = np.where(edges1[:, 1] == centres, edges1[:, 0], edges1[:, 1])
+        vertex_indices[:, 1] = centres
+        vertex_indices[:, 2] = centres
+        vertex_indices[:, 3] = np.where(edges2[:, 0] == centres, edges2[:, 1], edges2[:, 0])
+        vertex_indices[:, 4] = centres
+        return vertex_indices
@@ -0,0 +1,275 @@
+import csv
+import hashlib
+import json
+import mmap
+import struct
+from itertools import islice
+
+import numpy as np
+
+from graph_core import GraphCore
+
+#number of vertices or edges read before they are added to a core together
+DEFAULT_CHUNK_SIZE = 65536
+
+#snapshots start with a fixed header - the magic bytes, the format version,
+#the number of vertices, edges and angles, the size of the label section and
+#a SHA-256 digest of everything after the header
+SNAPSHOT_MAGIC = b"AGSNAP\r\n"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<8sI4xQQQQ32s")
+#every section of a snapshot starts at a multiple of this many bytes, so that
+#the arrays mapped from it are aligned
+SNAPSHOT_ALIGNMENT = 64
+#offset of the first section, just after the header
+SNAPSHOT_BODY_OFFSET = -(-SNAPSHOT_HEADER.size // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+
+
+def chunks(iterable, chunk_size):
+    # Yields lists of up to the given number of consecutive items from the
+    # iterable.
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_vertices(path):
+    # Yields the label and coordinates of each vertex in a CSV file with one
+    # "label,x,y" row per vertex. A first row that does not have numeric
+    # coordinates is taken to be a header and skipped.
+
+    with open(path, newline="") as vertices_file:
+        for (row_number, row) in enumerate(csv.reader(vertices_file)):
+            if not row:
+                continue
+            try:
+                coordinates = (float(row[1]), float(row[2]))
+            except ValueError:
+                if row_number == 0:
+                    continue
+                raise
+            yield (row[0], coordinates)
+
+
+def read_edges(path, label_type=str, header=None, labels=None):
+    # Yields the pair of vertex labels of each edge in an edge list file,
+    # converting the labels with the given type. CSV files have one
+    # "label1,label2" row per edge, with an optional header row. JSON Lines
+    # files (.jsonl) have one pair per line, either as a list or as an
+    # object with "source" and "target" fields. Both are read a line at a
+    # time. A .json file holding a list of pairs is also accepted, but is
+    # read in one go.
+    # Whether a CSV file starts with a header is given by header, or worked
+    # out from its first row if header is None - the row is a header if its
+    # labels cannot be converted to the label type or, when the labels of
+    # the vertices are given (as a set, dictionary or range), if it joins
+    # labels that are not vertex labels. Without the vertex labels a header
+    # of string labels cannot be told apart from an edge, so header has to
+    # be set.
+
+    if path.endswith(".jsonl"):
+        with open(path) as edges_file:
+            for line in edges_file:
+                if line.strip():
+                    yield edge_from_json(json.loads(line), label_type)
+    elif path.endswith(".json"):
+        with open(path) as edges_file:
+            for edge in json.load(edges_file):
+                yield edge_from_json(edge, label_type)
+    else:
+        with open(path, newline="") as edges_file:
+            first = True
+            for row in csv.reader(edges_file):
+                if not row:
+                    continue
+                if first:
+                    first = False
+                    if header is None:
+                        header = is_edge_header(row, label_type, labels)
+                    if header:
+                        continue
+                yield (label_type(row[0]), label_type(row[1]))
+
+
+def is_edge_header(row, label_type, labels=None):
+    # Returns whether the given first row of a CSV edge list is a header
+    # rather than an edge, as described for read_edges.
+
+    try:
+        edge = (label_type(row[0]), label_type(row[1]))
+    except ValueError:
+        return True
+    return labels is not None and not (edge[0] in labels and edge[1] in labels)
+
+
+def edge_from_json(edge, label_type):
+    # Returns the pair of labels of an edge read from JSON.
+
+    if isinstance(edge, dict):
+        return (label_type(edge["source"]), label_type(edge["target"]))
+    return (label_type(edge[0]), label_type(edge[1]))
+
+
+def load_positions(path):
+    # Memory maps a NumPy .npy file of vertex positions with one row of two
+    # or three coordinates per vertex. The map is copy-on-write, so the file
+    # is never changed when the vertices are moved.
+
+    positions = np.load(path, mmap_mode="c")
+    if positions.ndim != 2 or positions.shape[1] not in (2, 3):
+        raise ValueError("positions must be an array of shape (N, 2) or (N, 3)")
+    return positions
+
+
+def build_core(vertices, edges, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Builds a GraphCore from an iterable of (label, coordinates) vertices
+    # and an iterable of label pair edges, adding them to the core a chunk at
+    # a time so that no other copy of the whole graph is made.
+
+    core = GraphCore()
+    for chunk in chunks(vertices, chunk_size):
+        core.add_vertices(
+            [label for (label, _) in chunk],
+            [coordinates[:2] for (_, coordinates) in chunk]
+        )
+    for chunk in chunks(edges, chunk_size):
+        core.add_edges(chunk)
+    return core
+
+
+def build_core_from_positions(positions, edges, labels=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Builds a GraphCore whose vertices have the given array of positions,
+    # labelled by their index unless labels are given. An (N, 3) float array,
+    # such as one mapped by load_positions, is used by the core as it is
+    # rather than being copied.
+
+    core = GraphCore()
+    if labels is None:
+        labels = range(len(positions))
+    elif not isinstance(labels, range):
+        labels = list(labels)
+    if positions.dtype == np.float64 and positions.shape[1] == 3 and positions.flags.c_contiguous:
+        core.adopt_positions(positions, labels)
+    else:
+        for start in range(0, len(positions), chunk_size):
+            core.add_vertices(
+                labels[start:start + chunk_size],
+                positions[start:start + chunk_size]
+            )
+    for chunk in chunks(edges, chunk_size):
+        core.add_edges(chunk)
+    return core
+
+
+def snapshot_sections(core):
+    # Returns the sections of the snapshot of the given core in the order
+    # they are written - the positions, edges, angles and angle choices as
+    # little endian arrays, followed by the labels encoded as JSON.
+
+    try:
+        labels = json.dumps(core.labels, separators=(",", ":")).encode()
+    except TypeError:
+        raise ValueError("only graphs with string or number labels can be saved")
+    if json.loads(labels) != core.labels:
+        raise ValueError("the vertex labels do not survive being saved as JSON")
+
+    return [
+        np.ascontiguousarray(core.get_positions(), dtype="<f8"),
+        np.ascontiguousarray(core.get_edges(), dtype="<i8"),
+        np.ascontiguousarray(core.get_angles(), dtype="<i8"),
+        np.ascontiguousarray(core.angle_choices[:core.angle_count()], dtype="i1"),
+        np.frombuffer(labels, dtype="u1"),
+    ]
+
+
+def section_offsets(sizes):
+    # Returns the offset of each section of the given sizes (in bytes) from
+    # the end of the header, and the total size of the sections.
+
+    offsets = []
+    end = 0
+    for size in sizes:
+        end = -(-end // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+        offsets.append(end)
+        end += size
+    return offsets, end
+
+
+def save_snapshot(core, path):
+    # Writes the structure and positions of the given core to a versioned
+    # binary snapshot at the given path. The arrays are written as they are
+    # laid out in the core, so load_snapshot can map them straight back.
+
+    sections = snapshot_sections(core)
+    (offsets, size) = section_offsets([section.nbytes for section in sections])
+    body = bytearray(size)
+    for (section, offset) in zip(sections, offsets):
+        body[offset:offset + section.nbytes] = section.tobytes()
+
+    header = SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        core.vertex_count(),
+        core.edge_count(),
+        core.angle_count(),
+        sections[-1].nbytes,
+        hashlib.sha256(body).digest(),
+    )
+    with open(path, "wb") as snapshot_file:
+        snapshot_file.write(header)
+        snapshot_file.write(bytes(SNAPSHOT_BODY_OFFSET - len(header)))
+        snapshot_file.write(body)
+
+
+def load_snapshot(path, verify=True):
+    # Reads a snapshot written by save_snapshot into a new GraphCore. The
+    # file is memory mapped copy-on-write and the core's arrays are views of
+    # the map, so nothing is copied and the file is never changed. Unless
+    # verify is turned off, the digest in the header is checked so that the
+    # loaded graph is bit-for-bit the one that was saved.
+
+    with open(path, "rb") as snapshot_file:
+        mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    if len(mapped) < SNAPSHOT_HEADER.size:
+        raise ValueError("%s is not an angled graph snapshot" % (path,))
+    (magic, version, vertex_count, edge_count, angle_count, labels_size, digest) = (
+        SNAPSHOT_HEADER.unpack_from(mapped)
+    )
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("%s is not an angled graph snapshot" % (path,))
+    if version != SNAPSHOT_VERSION:
+        raise ValueError("unsupported snapshot version %d" % (version,))
+
+    shapes = [
+        ("<f8", (vertex_count, 3)),
+        ("<i8", (edge_count, 2)),
+        ("<i8", (angle_count, 3)),
+        ("i1", (angle_count,)),
+        ("u1", (labels_size,)),
+    ]
+    sizes = [np.dtype(dtype).itemsize * int(np.prod(shape)) for (dtype, shape) in shapes]
+    (offsets, size) = section_offsets(sizes)
+    if len(mapped) != SNAPSHOT_BODY_OFFSET + size:
+        raise ValueError("snapshot %s is truncated or has trailing data" % (path,))
+    if verify and hashlib.sha256(memoryview(mapped)[SNAPSHOT_BODY_OFFSET:]).digest() != digest:
+        raise ValueError("snapshot %s is corrupt - its checksum does not match" % (path,))
+
+    (positions, edges, angles, choices, labels) = [
+        np.frombuffer(mapped, dtype=dtype, count=int(np.prod(shape)), offset=SNAPSHOT_BODY_OFFSET + offset).reshape(shape)
+        for ((dtype, shape), offset) in zip(shapes, offsets)
+    ]
+    #the arrays are only views when they are already in the native layout
+    positions = positions.astype(float, copy=False)
+    edges = edges.astype(np.intp, copy=False)
+    angles = angles.astype(np.intp, copy=False)
+    choices = choices.astype(np.int8, copy=False)
+
+    core = GraphCore()
+    core.adopt_positions(positions, json.loads(labels.tobytes()))
+    core.adopt_structure(edges, angles, choices)
+    return core
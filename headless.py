@@ -0,0 +1,239 @@
+import numpy as np
+
+from angle_geometry import AngleBatch
+from constraints import AngleSolver
+from frame_cache import motion_plan
+from graph_core import GraphCore
+from graph_io import load_snapshot
+from labels import angle_degrees
+from layout import ForceLayout
+from timeline import apply_rate, linear, smooth
+
+#how long movements take and how many frames a second they are sampled at
+#unless given - the defaults of manim
+DEFAULT_RUN_TIME = 1.0
+DEFAULT_FRAME_RATE = 60
+
+
+class GeometryFrame():
+    def __init__(self, index, time, vertex_indices, vertex_positions, edge_rows,
+        edge_endpoints, angle_rows, batch):
+        """ A geometry frame holds everything a movement changes in one of
+        its frames - the positions of the moved vertices with the given
+        indices, the endpoints of the edges in the given rows as an
+        (edges x 2 x 3) array, and for the angles in the given rows the size
+        in degrees of the angle shown, whether it is shown as a right angle
+        and the points of its marker, taken from the given AngleBatch. The
+        arrays are copies, so frames can be kept after later ones have been
+        made. """
+
+        self.index = index
+        self.time = time
+        self.vertex_indices = vertex_indices
+        self.vertex_positions = vertex_positions.copy()
+        self.edge_rows = edge_rows
+        self.edge_endpoints = edge_endpoints
+        self.angle_rows = angle_rows
+        self.angle_degrees = angle_degrees(batch)
+        self.angle_right = batch.right.copy()
+        self.angle_points = batch.points.copy()
+
+
+class HeadlessGraph():
+    def __init__(self, vertices_input, edges_input, frame_rate=DEFAULT_FRAME_RATE):
+        """ A headless graph moves the vertices of a graph and measures its
+        angles in the same way as an AngledGraph, but works on the arrays of
+        a GraphCore alone, without manim or a scene. It is built from the
+        same label-coordinates dictionary and list of label pair edges.
+        Rather than playing animations, each movement returns a generator
+        yielding a GeometryFrame for every frame of the movement, sampled at
+        the given frame rate with the same easing and frame count as the
+        scene would use. The vertices are moved in the core as the frames are
+        generated, so once a generator is exhausted the graph is where the
+        movement leaves it, and stopping early leaves the graph at the last
+        frame generated. Nothing about a movement is read from the graph
+        until its first frame is asked for, so movements made ahead of time
+        start from wherever the movements played before them left the
+        graph. Nothing here imports manim. """
+
+        self.core = GraphCore()
+        self.frame_rate = frame_rate
+        self.core.add_vertices(
+            vertices_input.keys(),
+            [coordinates[:2] for coordinates in vertices_input.values()]
+        )
+        self.core.add_edges(edges_input)
+
+    @classmethod
+    def from_core(cls, core, frame_rate=DEFAULT_FRAME_RATE):
+        # Returns a headless graph working on the given GraphCore, such as
+        # one built by graph_io or held by an AngledGraph, without copying it.
+
+        graph = cls({}, [], frame_rate)
+        graph.core = core
+        return graph
+
+    @classmethod
+    def load(cls, path, verify=True, frame_rate=DEFAULT_FRAME_RATE):
+        # Returns a headless graph of the snapshot at the given path, written
+        # by AngledGraph.save or graph_io.save_snapshot.
+        return cls.from_core(load_snapshot(path, verify), frame_rate)
+
+    def frame_times(self, run_time):
+        # Returns the times of the frames of a movement lasting the given
+        # run time, the first at its start and the last at its end.
+        return np.linspace(0, run_time, int(np.ceil(run_time * self.frame_rate)) + 1)
+
+    @staticmethod
+    def frame_alphas(times, rate_func):
+        # Returns how far through a movement each frame at the given times
+        # is, eased by the given rate function. A movement with a single
+        # frame is finished in it.
+
+        if len(times) == 1:
+            return np.ones(1)
+        return apply_rate(rate_func, times / times[-1])
+
+    def add_angles(self, angles):
+        # Makes the angles of the graph those in the given dictionary, which
+        # takes the same form as for AngledGraph.add_angles - the pair of
+        # edges each angle is between mapped to 0 or 1, choosing which angle
+        # between the edges is shown.
+
+        for angle_key in [angle_key for angle_key in self.core.angle_keys if angle_key not in angles]:
+            self.core.remove_angle(angle_key)
+        for (angle_key, value) in angles.items():
+            self.add_angle(angle_key, value)
+
+    def add_angle(self, angle_key, value=0):
+        # Adds the angle between the given pair of edges, or changes which
+        # angle between them is shown if it is already there.
+
+        if angle_key in self.core.angle_index:
+            self.core.angle_choices[self.core.angle_index[angle_key]] = value
+        else:
+            self.core.add_angle(angle_key, value)
+
+    def remove_angle(self, angle_key):
+        # Removes the angle between the given pair of edges.
+        self.core.remove_angle(angle_key)
+
+    def remove_angles(self):
+        # Removes every angle.
+        self.core.clear_angles()
+
+    def angle_sizes(self, angle_keys=None):
+        # Returns the size in degrees of each of the angles with the given
+        # keys (every angle, in the order of the core's angle keys, if none
+        # are given) as they are currently shown.
+
+        if angle_keys is None:
+            rows = np.arange(self.core.angle_count())
+        else:
+            rows = np.array([self.core.angle_index[angle_key] for angle_key in angle_keys], dtype=np.intp)
+        batch = AngleBatch(self.core.angle_vertex_indices(rows), self.core.angle_choices[rows])
+        batch.update(self.core.positions)
+        return angle_degrees(batch)
+
+    def frames(self, vertex_indices, vertex_positions, times, angle_rows=None):
+        # Yields the GeometryFrame of each frame of a movement of the
+        # vertices with the given indices, given their positions in each
+        # frame as a (frames x moved vertices x 3) array or any iterable of
+        # (moved vertices x 3) arrays, along with the time of each frame. The
+        # frames cover the edges and angles depending on the moved vertices,
+        # restricted to the given angle rows if any are given.
+
+        vertex_indices = np.asarray(vertex_indices, dtype=np.intp)
+        (edge_rows, angle_rows, _) = motion_plan(self.core, vertex_indices, angle_rows)
+        edges = self.core.edge_array[edge_rows]
+        batch = AngleBatch(
+            self.core.angle_vertex_indices(angle_rows),
+            self.core.angle_choices[angle_rows]
+        )
+
+        for (index, (time, positions)) in enumerate(zip(times, vertex_positions)):
+            self.core.positions[vertex_indices] = positions
+            batch.update(self.core.positions)
+            yield GeometryFrame(
+                index,
+                float(time),
+                vertex_indices,
+                positions,
+                edge_rows,
+                self.core.positions[edges],
+                angle_rows,
+                batch
+            )
+
+    def move_vertex(self, vertex_label, new_coordinates, run_time=DEFAULT_RUN_TIME, rate_func=smooth):
+        # Returns the frames of moving the vertex with the given label to the
+        # new coordinates, as for AngledGraph.move_vertex.
+        return self.move_vertices(run_time, rate_func, {vertex_label : new_coordinates})
+
+    def move_vertices(self, run_time=DEFAULT_RUN_TIME, rate_func=smooth, positions=None, **movements):
+        # Returns the frames of moving the vertices given in the
+        # label-coordinates dictionary or as keyword arguments, mapping
+        # vertex labels to coordinates, in straight lines to the given
+        # coordinates over the given run time, eased by the given rate
+        # function - as for AngledGraph.move_vertices.
+
+        movements = dict(positions or {}, **movements)
+        indices = self.core.indices(movements.keys())
+        starts = self.core.positions[indices]
+        targets = starts.copy()
+        for (i, new_coordinates) in enumerate(movements.values()):
+            targets[i, :2] = new_coordinates[:2]
+
+        times = self.frame_times(run_time)
+        alphas = HeadlessGraph.frame_alphas(times, rate_func)
+        yield from self.frames(indices, starts + alphas[:, None, None] * (targets - starts), times)
+
+    def play_timeline(self, timeline, default_easing=smooth):
+        # Returns the frames of playing every keyframe of the given Timeline,
+        # with the vertices without an easing of their own eased by the given
+        # rate function - as for AngledGraph.play_timeline.
+
+        times = self.frame_times(timeline.duration())
+        (vertex_indices, vertex_positions) = timeline.sample(self.core, times, default_easing)
+        yield from self.frames(vertex_indices, vertex_positions, times)
+
+    def move_vertices_preserving(self, angle_keys=None, run_time=DEFAULT_RUN_TIME,
+        rate_func=smooth, positions=None, **movements):
+        # Returns the frames of moving the given vertices to the given
+        # coordinates while keeping the angles with the given keys (or every
+        # right angle) the same size - as for
+        # AngledGraph.move_vertices_preserving. Each frame is solved for by
+        # the AngleSolver as it is generated.
+
+        movements = dict(positions or {}, **movements)
+        indices = self.core.indices(movements.keys())
+        angle_rows = None
+        if angle_keys is not None:
+            angle_rows = [self.core.angle_index[angle_key] for angle_key in angle_keys]
+        solver = AngleSolver(self.core, indices, angle_rows)
+
+        starts = self.core.positions[indices]
+        targets = starts.copy()
+        for (i, new_coordinates) in enumerate(movements.values()):
+            targets[i, :2] = new_coordinates[:2]
+        times = self.frame_times(run_time)
+        alphas = HeadlessGraph.frame_alphas(times, rate_func)
+
+        def solved_positions():
+            positions = solver.base_positions.copy()
+            for alpha in alphas:
+                positions[:, :2] = solver.solve(starts + alpha * (targets - starts))
+                yield positions
+
+        yield from self.frames(solver.vertex_indices, solved_positions(), times)
+
+    def apply_layout(self, kind="force", iterations=100, keyframes=1,
+        run_time=DEFAULT_RUN_TIME, **options):
+        # Returns the frames of laying the graph out with a ForceLayout, as
+        # for AngledGraph.apply_layout.
+
+        layout = ForceLayout(self.core, kind, **options)
+        timeline = layout.timeline(
+            iterations, keyframes, run_time, smooth if keyframes == 1 else linear
+        )
+        yield from self.play_timeline(timeline)
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from angle_geometry import ANGLE_RADIUS, CENTRE
+
+#distance between a label and the vertex, edge or angle marker it labels
+LABEL_BUFFER = 0.25
+#direction vertex labels are placed in from their vertex
+VERTEX_LABEL_DIRECTION = np.array([1.0, 1.0, 0.0]) / np.sqrt(2)
+
+
+def vertex_label_anchors(positions, vertex_indices):
+    # Returns the points the labels of the vertices with the given indices
+    # are centred on - a little way up and to the right of each vertex.
+
+    return positions[vertex_indices] + LABEL_BUFFER * VERTEX_LABEL_DIRECTION
+
+
+def edge_label_anchors(positions, edges):
+    # Returns the points the labels of the given edges (as an array of pairs
+    # of vertex indices) are centred on - a little way to the left of the
+    # middle of each edge, looking from its start to its end.
+
+    starts = positions[edges[:, 0]]
+    ends = positions[edges[:, 1]]
+    directions = ends - starts
+    lengths = np.hypot(directions[:, 0], directions[:, 1])
+    normals = np.zeros_like(directions)
+    normals[:, 0] = -directions[:, 1]
+    normals[:, 1] = directions[:, 0]
+    normals /= np.where(lengths > 0, lengths, 1)[:, None]
+    return (starts + ends) / 2 + LABEL_BUFFER * normals
+
+
+def angle_label_anchors(batch):
+    # Returns the points the readouts of the angles in the given AngleBatch
+    # are centred on - just outside the middle of each angle's marker. The
+    # batch has to have been updated.
+
+    bisectors = batch.starts + batch.magnitudes / 2
+    anchors = batch.endpoints[:, CENTRE].copy()
+    anchors[:, 0] += (ANGLE_RADIUS + LABEL_BUFFER) * np.cos(bisectors)
+    anchors[:, 1] += (ANGLE_RADIUS + LABEL_BUFFER) * np.sin(bisectors)
+    return anchors
+
+
+def angle_degrees(batch):
+    # Returns the size in degrees of the angle shown by each marker of the
+    # given AngleBatch, which has to have been updated.
+    return np.degrees(np.abs(batch.magnitudes))
+
+
+def format_degrees(degrees, decimals=0):
+    # Returns the text of the readout of each of the given angle sizes,
+    # rounded to the given number of decimal places.
+    return ["%.*f°" % (decimals, value) for value in degrees]
+
+
+class GlyphCache():
+    def __init__(self, factory, max_entries=256):
+        """ A glyph cache keeps typeset text so that the same string is only
+        typeset once. The factory is called with a string to typeset it (for
+        example manim's Text or MathTex, which go through a font or LaTeX
+        pipeline), and every request for a string returns a copy of the
+        result, which is far cheaper than typesetting it again. The most
+        recently used strings are kept, up to the given number of them, so
+        that readouts changing while animating reuse the glyphs of the
+        values they pass through without the cache growing without limit. """
+
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.factory = factory
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        # Returns a copy of the given string typeset by the factory, only
+        # typesetting it if it is not already cached.
+
+        glyph = self.entries.get(text)
+        if glyph is not None:
+            self.hits += 1
+            self.entries.move_to_end(text)
+        else:
+            self.misses += 1
+            glyph = self.factory(text)
+            self.entries[text] = glyph
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return glyph.copy()
+
+    def clear(self):
+        # Drops every cached glyph.
+        self.entries.clear()
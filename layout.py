@@ -0,0 +1,225 @@
+import numpy as np
+
+from angle_geometry import CENTRE, EDGE1_START, EDGE2_END
+from timeline import Timeline, linear
+
+#offsets of the cells whose vertices repel the vertices of a cell - the cell
+#itself and half of its neighbours, so that each pair of cells is met once
+NEIGHBOUR_CELLS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+
+
+def near_pairs(positions, cutoff):
+    # Returns the indices (as two arrays) of every pair of the given points
+    # closer together than the cutoff, each pair once. The points are binned
+    # into a grid of cells as wide as the cutoff, so only points in the same
+    # or neighbouring cells are compared.
+
+    cells = np.floor(positions[:, :2] / cutoff).astype(np.int64)
+    cells -= cells.min(axis=0) - 1
+    stride = cells[:, 1].max() + 2
+    keys = cells[:, 0] * stride + cells[:, 1]
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    #where each point is in the sorted order
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order))
+
+    firsts = []
+    seconds = []
+    for (column_offset, row_offset) in NEIGHBOUR_CELLS:
+        targets = keys + column_offset * stride + row_offset
+        ends = np.searchsorted(sorted_keys, targets, side="right")
+        if (column_offset, row_offset) == (0, 0):
+            #points in the same cell are only paired with those after them
+            starts = ranks + 1
+        else:
+            starts = np.searchsorted(sorted_keys, targets, side="left")
+        counts = np.maximum(ends - starts, 0)
+        total = counts.sum()
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        firsts.append(np.repeat(np.arange(len(positions)), counts))
+        seconds.append(order[np.repeat(starts, counts) + offsets])
+
+    firsts = np.concatenate(firsts)
+    seconds = np.concatenate(seconds)
+    differences = positions[firsts, :2] - positions[seconds, :2]
+    close = np.einsum("ij,ij->i", differences, differences) < cutoff * cutoff
+    return firsts[close], seconds[close]
+
+
+def scatter_add(forces, indices, vectors):
+    # Adds each of the given vectors to the force on the vertex with the
+    # corresponding index.
+
+    for axis in range(2):
+        forces[:, axis] += np.bincount(indices, weights=vectors[:, axis], minlength=len(forces))
+
+
+class ForceLayout():
+    def __init__(self, core, kind="force", ideal_length=None, fixed=(), gravity=0.05,
+        angle_weight=1.0, temperature=None, cooling=0.95):
+        """ A force layout moves the vertices of a GraphCore to lay the graph
+        out, working on a copy of its position and edge arrays so that the
+        graph is only changed when the result is applied. Every step works
+        out a force on every vertex with NumPy and moves the vertices along
+        them. The kind of layout is chosen by kind:
+        "force" - the Fruchterman-Reingold layout, where edges pull their
+        vertices together with a force growing with the square of their
+        length and every pair of vertices pushes apart.
+        "spring" - edges are springs with a rest length of the ideal length,
+        and vertices push apart as for "force".
+        "angle" - as for "spring", but the angles of the core also spring
+        back towards the size they had when the layout was made, so the
+        layout keeps the angles being shown.
+        Vertices only push apart from the vertices closer than twice the
+        ideal length (by default the side of the square each vertex would
+        have if the vertices were spread evenly over the extent of the
+        graph), which are found with a grid so that a step takes time
+        proportional to the number of vertices. A weak gravity pulls every
+        vertex towards the middle of the graph so that separate pieces do
+        not drift apart. The vertices with the labels given as fixed do not
+        move. Each step moves a vertex no further than the temperature
+        (by default a tenth of the extent of the graph), which is multiplied
+        by the cooling factor after each step. """
+
+        if kind not in ("force", "spring", "angle"):
+            raise ValueError("kind must be 'force', 'spring' or 'angle'")
+        self.core = core
+        self.kind = kind
+        self.positions = core.get_positions().copy()
+        self.edges = core.get_edges().copy()
+        self.gravity = gravity
+        self.angle_weight = angle_weight
+        self.cooling = cooling
+        self.steps = 0
+
+        extent = 0.0
+        if len(self.positions) > 1:
+            extent = np.ptp(self.positions[:, :2], axis=0).max()
+        if extent == 0:
+            extent = 1.0
+        if ideal_length is None:
+            ideal_length = extent / np.sqrt(max(len(self.positions), 1))
+        self.ideal_length = float(ideal_length)
+        self.temperature = extent / 10 if temperature is None else temperature
+
+        self.movable = np.ones(len(self.positions), dtype=bool)
+        self.movable[core.indices(fixed)] = False
+
+        #the angles are kept at the signed sweep from their first edge to
+        #their second that they have now
+        self.angle_vertices = core.angle_vertex_indices()[:, [EDGE1_START, CENTRE, EDGE2_END]]
+        self.angle_targets = self.angle_sweeps()
+
+    def angle_sweeps(self):
+        # Returns the signed sweep from the first edge of every angle to its
+        # second, between -pi and pi.
+
+        (starts, centres, ends) = (self.positions[self.angle_vertices[:, i], :2] for i in range(3))
+        to_start = starts - centres
+        to_end = ends - centres
+        sweeps = np.arctan2(to_end[:, 1], to_end[:, 0]) - np.arctan2(to_start[:, 1], to_start[:, 0])
+        return np.angle(np.exp(1j * sweeps))
+
+    def forces(self):
+        # Returns the force on every vertex for the current positions.
+
+        positions = self.positions[:, :2]
+        length = self.ideal_length
+        forces = np.zeros_like(positions)
+
+        #repulsion between nearby vertices
+        (firsts, seconds) = near_pairs(self.positions, 2 * length)
+        differences = positions[firsts] - positions[seconds]
+        distances = np.hypot(differences[:, 0], differences[:, 1])
+        #vertices on top of each other are pushed apart along the x axis
+        coincident = distances == 0
+        differences[coincident] = (length * 1e-3, 0)
+        distances[coincident] = length * 1e-3
+        pushes = differences * (length * length / (distances * distances))[:, None]
+        scatter_add(forces, firsts, pushes)
+        scatter_add(forces, seconds, -pushes)
+
+        #attraction along the edges
+        differences = positions[self.edges[:, 1]] - positions[self.edges[:, 0]]
+        distances = np.hypot(differences[:, 0], differences[:, 1])
+        if self.kind == "force":
+            strengths = distances / length
+        else:
+            strengths = (distances - length) / np.where(distances > 0, distances, 1)
+        pulls = differences * strengths[:, None]
+        scatter_add(forces, self.edges[:, 0], pulls)
+        scatter_add(forces, self.edges[:, 1], -pulls)
+
+        #the angles turn back towards their targets, which moves the far
+        #ends of their edges round the centre
+        if self.kind == "angle" and len(self.angle_vertices):
+            errors = np.angle(np.exp(1j * (self.angle_sweeps() - self.angle_targets)))
+            (starts, centres, ends) = (self.angle_vertices[:, i] for i in range(3))
+            to_start = positions[starts] - positions[centres]
+            to_end = positions[ends] - positions[centres]
+            scale = self.angle_weight * length * length * errors
+            turn_start = np.stack((-to_start[:, 1], to_start[:, 0]), axis=1)
+            turn_start *= (scale / np.maximum(np.einsum("ij,ij->i", to_start, to_start), 1e-12))[:, None]
+            turn_end = np.stack((-to_end[:, 1], to_end[:, 0]), axis=1)
+            turn_end *= (-scale / np.maximum(np.einsum("ij,ij->i", to_end, to_end), 1e-12))[:, None]
+            scatter_add(forces, starts, turn_start)
+            scatter_add(forces, ends, turn_end)
+            scatter_add(forces, centres, -(turn_start + turn_end))
+
+        forces -= self.gravity * (positions - positions.mean(axis=0))
+        return forces
+
+    def step(self):
+        # Moves every vertex that is not fixed along the force on it, by no
+        # more than the temperature, and cools the layout. Returns the
+        # furthest any vertex moved.
+
+        forces = self.forces()
+        forces[~self.movable] = 0
+        sizes = np.hypot(forces[:, 0], forces[:, 1])
+        limits = np.minimum(sizes, self.temperature) / np.where(sizes > 0, sizes, 1)
+        self.positions[:, :2] += forces * limits[:, None]
+        self.temperature *= self.cooling
+        self.steps += 1
+        return float(np.max(sizes * limits, initial=0.0))
+
+    def run(self, iterations=100, tolerance=0.0):
+        # Takes up to the given number of steps, stopping early once no
+        # vertex moves further than the tolerance. Returns the positions.
+
+        for _ in range(iterations):
+            if self.step() <= tolerance:
+                break
+        return self.positions
+
+    def movements(self):
+        # Returns a label-coordinates dictionary of where the vertices that
+        # are not fixed are laid out, as taken by move_vertices and by
+        # Timeline keyframes.
+
+        return {
+            self.core.labels[index] : tuple(self.positions[index, :2])
+            for index in np.flatnonzero(self.movable)
+        }
+
+    def timeline(self, iterations=100, keyframes=10, duration=2.0, easing=linear):
+        # Runs the given number of steps and returns a Timeline moving the
+        # vertices through the layout over the given duration, with a
+        # keyframe after each of the given number of evenly spaced groups of
+        # steps. The movement between keyframes is eased by the given rate
+        # function.
+
+        timeline = Timeline(default_easing=easing)
+        done = 0
+        for keyframe in range(1, keyframes + 1):
+            target = round(iterations * keyframe / keyframes)
+            for _ in range(target - done):
+                self.step()
+            done = target
+            timeline.add_keyframe(duration * keyframe / keyframes, self.movements())
+        return timeline
+
+    def apply(self):
+        # Moves the vertices of the core to where they are laid out.
+        self.core.positions[:len(self.positions)] = self.positions
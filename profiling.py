@@ -0,0 +1,99 @@
+import time
+
+
+class UpdateStats():
+    def __init__(self, callback=None):
+        """ The stats record how much work the updaters of an AngledGraph do
+        while animating. Each kind of work (for example edge updates, angle
+        regenerations or mobject allocations) is identified by a name and
+        has a count and a time spent on it, both for the current frame and
+        accumulated over every frame so far. At the end of each frame the
+        optional callback is called with the frame number and a dictionary
+        mapping each name to the (count, seconds) recorded during the frame.
+        Work done outside the frames the scene renders, such as the
+        interpolations manim makes as animations begin and finish, is kept
+        apart so that it does not count as a frame.
+        The stats are only consulted when the animations are set up, so an
+        AngledGraph without stats pays nothing for them. """
+
+        self.callback = callback
+        self.frames = 0
+        self.counts = {}
+        self.seconds = {}
+        self.frame_counts = {}
+        self.frame_seconds = {}
+        self.setup_counts = {}
+        self.setup_seconds = {}
+
+    def count(self, name, count=1, seconds=0.0):
+        # Records the given amount of work under the given name.
+
+        self.frame_counts[name] = self.frame_counts.get(name, 0) + count
+        self.frame_seconds[name] = self.frame_seconds.get(name, 0.0) + seconds
+
+    def timed(self, name, function, count=1, allocations=0):
+        # Returns the given update function wrapped so that every call is
+        # counted and timed under the given name, along with the given number
+        # of mobject allocations made by each call.
+
+        def timed_function(*args):
+            start = time.perf_counter()
+            result = function(*args)
+            self.count(name, count, time.perf_counter() - start)
+            if allocations:
+                self.count("allocations", allocations)
+            return result
+
+        return timed_function
+
+    def end_frame(self, rendered=True):
+        # Adds the work recorded during the frame to the totals and reports
+        # the frame to the callback. If the frame was not rendered the work
+        # is added to the setup totals instead and nothing is reported.
+
+        if not rendered:
+            for (name, count) in self.frame_counts.items():
+                self.setup_counts[name] = self.setup_counts.get(name, 0) + count
+                self.setup_seconds[name] = self.setup_seconds.get(name, 0.0) + self.frame_seconds[name]
+            self.frame_counts = {}
+            self.frame_seconds = {}
+            return
+
+        for (name, count) in self.frame_counts.items():
+            self.counts[name] = self.counts.get(name, 0) + count
+            self.seconds[name] = self.seconds.get(name, 0.0) + self.frame_seconds[name]
+        if self.callback is not None:
+            self.callback(self.frames, {
+                name : (count, self.frame_seconds[name])
+                for (name, count) in self.frame_counts.items()
+            })
+        self.frames += 1
+        self.frame_counts = {}
+        self.frame_seconds = {}
+
+    def summary(self):
+        # Returns the totals over every rendered frame as a dictionary
+        # mapping each name to its count, seconds and average seconds per
+        # frame, along with the count and seconds recorded outside them.
+
+        return {
+            name : {
+                "count" : self.counts.get(name, 0),
+                "seconds" : self.seconds.get(name, 0.0),
+                "seconds_per_frame" : self.seconds.get(name, 0.0) / max(self.frames, 1),
+                "setup_count" : self.setup_counts.get(name, 0),
+                "setup_seconds" : self.setup_seconds.get(name, 0.0),
+            }
+            for name in list(self.counts) + [name for name in self.setup_counts if name not in self.counts]
+        }
+
+    def reset(self):
+        # Forgets everything recorded so far.
+
+        self.frames = 0
+        self.counts = {}
+        self.seconds = {}
+        self.frame_counts = {}
+        self.frame_seconds = {}
+        self.setup_counts = {}
+        self.setup_seconds = {}
@@ -0,0 +1,355 @@
+import numpy as np
+
+from graph_core import GraphCore
+
+#edges whose bounding box spans more than this many cells across are kept in
+#a list of their own rather than in every cell they cover
+LONG_EDGE_CELLS = 16
+
+
+def segments_in_box(starts, ends, x_min, y_min, x_max, y_max):
+    # Returns a mask of which of the line segments between the given arrays
+    # of start and end points touch the given box. The segments are clipped
+    # to the box one axis at a time (as in the Liang-Barsky algorithm) and
+    # those with any of their length left touch it.
+
+    directions = ends[:, :2] - starts[:, :2]
+    entering = np.zeros(len(starts))
+    leaving = np.ones(len(starts))
+    for (axis, low, high) in ((0, x_min, x_max), (1, y_min, y_max)):
+        step = directions[:, axis]
+        start = starts[:, axis]
+        parallel = step == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            to_low = (low - start) / step
+            to_high = (high - start) / step
+        #segments parallel to the sides either always or never lie between them
+        between = (start >= low) & (start <= high)
+        entering = np.maximum(entering, np.where(
+            parallel, np.where(between, -np.inf, np.inf), np.minimum(to_low, to_high)
+        ))
+        leaving = np.minimum(leaving, np.where(
+            parallel, np.where(between, np.inf, -np.inf), np.maximum(to_low, to_high)
+        ))
+    return entering <= leaving
+
+
+def orientations(starts, ends, points):
+    # Returns the sign of the turn from each segment to each point - positive
+    # for anticlockwise, negative for clockwise and zero for in line.
+
+    return np.sign(
+        (ends[:, 0] - starts[:, 0]) * (points[:, 1] - starts[:, 1]) -
+        (ends[:, 1] - starts[:, 1]) * (points[:, 0] - starts[:, 0])
+    )
+
+
+def segments_intersect(starts1, ends1, starts2, ends2):
+    # Returns a mask of which pairs of segments (the first segments given by
+    # one pair of arrays of points and the second by the other) intersect,
+    # including segments that only touch or that overlap in line.
+
+    turns1 = orientations(starts1, ends1, starts2)
+    turns2 = orientations(starts1, ends1, ends2)
+    turns3 = orientations(starts2, ends2, starts1)
+    turns4 = orientations(starts2, ends2, ends1)
+    crossing = (turns1 * turns2 <= 0) & (turns3 * turns4 <= 0)
+
+    #segments in line with each other only meet if their extents overlap
+    in_line = (turns1 == 0) & (turns2 == 0)
+    overlapping = np.all(
+        (np.minimum(starts1[:, :2], ends1[:, :2]) <= np.maximum(starts2[:, :2], ends2[:, :2])) &
+        (np.minimum(starts2[:, :2], ends2[:, :2]) <= np.maximum(starts1[:, :2], ends1[:, :2])),
+        axis=1
+    )
+    return np.where(in_line, overlapping, crossing)
+
+
+class SpatialGrid():
+    def __init__(self, core, cell_size=None):
+        """ The grid indexes the vertices and edges of a GraphCore by where
+        they are, so that the ones in a region can be found without looking
+        at the rest of the graph. The plane is split into square cells of the
+        given size (by default about one vertex per cell over the extent of
+        the graph). Each cell holds the indices of the vertices in it and the
+        rows of the edges whose bounding box covers it, except for edges
+        covering too many cells, which are kept in a list of their own. When
+        vertices move only the cells of those vertices and their incident
+        edges are updated, and vertices and edges added to or removed from
+        the core are added to or removed from the grid in the same way,
+        following the core in moving the last one into a freed row. Queries
+        only look at the cells around the region asked about, so they take
+        time proportional to what is found there rather than to the size of
+        the graph. """
+
+        self.core = core
+        if cell_size is None:
+            positions = core.get_positions()
+            cell_size = 1.0
+            if len(positions) > 1:
+                extent = np.ptp(positions[:, :2], axis=0).max()
+                if extent > 0:
+                    cell_size = extent / np.sqrt(len(positions))
+        self.cell_size = float(cell_size)
+        self.rebuild()
+
+    def rebuild(self):
+        # Indexes every vertex and edge of the core from scratch.
+
+        positions = self.core.get_positions()
+        self.vertex_cells = self.cells_of(positions)
+        self.vertex_buckets = {}
+        for (cell, index) in zip(map(tuple, self.vertex_cells.tolist()), range(len(positions))):
+            self.vertex_buckets.setdefault(cell, set()).add(index)
+
+        self.edge_ranges = self.edge_ranges_of(np.arange(self.core.edge_count()))
+        self.edge_buckets = {}
+        self.long_edges = set()
+        for (row, cell_range) in enumerate(self.edge_ranges.tolist()):
+            self.add_edge_cells(row, cell_range)
+
+    def cells_of(self, points):
+        # Returns the (column, row) of the cell each of the given points is
+        # in.
+
+        return np.floor(points[:, :2] / self.cell_size).astype(np.int64)
+
+    def edge_ranges_of(self, rows):
+        # Returns the first and last column and row of the cells covered by
+        # the bounding box of each of the edges in the given rows.
+
+        positions = self.core.positions
+        edges = self.core.edge_array[rows]
+        starts = self.cells_of(positions[edges[:, 0]])
+        ends = self.cells_of(positions[edges[:, 1]])
+        return np.concatenate((np.minimum(starts, ends), np.maximum(starts, ends)), axis=1)
+
+    def add_edge_cells(self, row, cell_range):
+        # Adds the edge in the given row to the cells in the given range.
+
+        (column1, row1, column2, row2) = cell_range
+        if max(column2 - column1, row2 - row1) >= LONG_EDGE_CELLS:
+            self.long_edges.add(row)
+            return
+        for column in range(column1, column2 + 1):
+            for cell_row in range(row1, row2 + 1):
+                self.edge_buckets.setdefault((column, cell_row), set()).add(row)
+
+    def remove_edge_cells(self, row, cell_range):
+        # Removes the edge in the given row from the cells in the given range.
+
+        (column1, row1, column2, row2) = cell_range
+        if max(column2 - column1, row2 - row1) >= LONG_EDGE_CELLS:
+            self.long_edges.discard(row)
+            return
+        for column in range(column1, column2 + 1):
+            for cell_row in range(row1, row2 + 1):
+                SpatialGrid.discard(self.edge_buckets, (column, cell_row), row)
+
+    @staticmethod
+    def discard(buckets, cell, item):
+        # Removes the item from the given cell, forgetting the cell once it
+        # is empty.
+
+        bucket = buckets.get(cell)
+        if bucket is not None:
+            bucket.discard(item)
+            if not bucket:
+                del buckets[cell]
+
+    def add_vertex(self, index):
+        # Adds the vertex with the given index, which has just been added to
+        # the core.
+
+        self.vertex_cells = GraphCore.grow(self.vertex_cells, index + 1)
+        cell = self.cells_of(self.core.positions[index:index + 1])[0]
+        self.vertex_cells[index] = cell
+        self.vertex_buckets.setdefault(tuple(cell.tolist()), set()).add(index)
+
+    def remove_vertex(self, index, last):
+        # Removes the vertex with the given index, which has just been
+        # removed from the core by moving the vertex with the last index into
+        # its place.
+
+        SpatialGrid.discard(self.vertex_buckets, tuple(self.vertex_cells[index].tolist()), index)
+        if index != last:
+            cell = tuple(self.vertex_cells[last].tolist())
+            SpatialGrid.discard(self.vertex_buckets, cell, last)
+            self.vertex_buckets.setdefault(cell, set()).add(index)
+            self.vertex_cells[index] = self.vertex_cells[last]
+
+    def add_edge(self, row):
+        # Adds the edge in the given row, which has just been added to the
+        # core.
+
+        self.edge_ranges = GraphCore.grow(self.edge_ranges, row + 1)
+        self.edge_ranges[row] = self.edge_ranges_of([row])[0]
+        self.add_edge_cells(row, self.edge_ranges[row].tolist())
+
+    def remove_edge(self, row, last):
+        # Removes the edge in the given row, which has just been removed from
+        # the core by moving the edge in the last row into its place.
+
+        self.remove_edge_cells(row, self.edge_ranges[row].tolist())
+        if row != last:
+            cell_range = self.edge_ranges[last].tolist()
+            self.remove_edge_cells(last, cell_range)
+            self.add_edge_cells(row, cell_range)
+            self.edge_ranges[row] = self.edge_ranges[last]
+
+    def move_vertices(self, indices):
+        # Updates the cells of the vertices with the given indices, and of
+        # the edges incident to them, after they have been moved in the core.
+
+        indices = np.asarray(indices, dtype=np.intp)
+        new_cells = self.cells_of(self.core.positions[indices])
+        changed = np.any(new_cells != self.vertex_cells[indices], axis=1)
+        for (index, old_cell, new_cell) in zip(
+            indices[changed].tolist(),
+            self.vertex_cells[indices[changed]].tolist(),
+            new_cells[changed].tolist()
+        ):
+            SpatialGrid.discard(self.vertex_buckets, tuple(old_cell), index)
+            self.vertex_buckets.setdefault(tuple(new_cell), set()).add(index)
+        self.vertex_cells[indices] = new_cells
+
+        rows = set()
+        for index in indices:
+            rows |= self.core.vertex_edges[index]
+        self.update_edges(rows)
+
+    def update_edges(self, rows):
+        # Updates the cells of the edges in the given rows after their
+        # vertices have moved.
+
+        rows = np.fromiter(rows, dtype=np.intp, count=len(rows))
+        new_ranges = self.edge_ranges_of(rows)
+        changed = np.any(new_ranges != self.edge_ranges[rows], axis=1)
+        for (row, old_range, new_range) in zip(
+            rows[changed].tolist(),
+            self.edge_ranges[rows[changed]].tolist(),
+            new_ranges[changed].tolist()
+        ):
+            self.remove_edge_cells(row, old_range)
+            self.add_edge_cells(row, new_range)
+        self.edge_ranges[rows] = new_ranges
+
+    def buckets_in_box(self, buckets, x_min, y_min, x_max, y_max):
+        # Yields the contents of the cells of the given buckets that overlap
+        # the given box. When the box covers more cells than are occupied the
+        # occupied cells are checked instead, so a box over the whole graph
+        # costs no more than the number of occupied cells.
+
+        ((column1, row1), (column2, row2)) = self.cells_of(
+            np.array([[x_min, y_min], [x_max, y_max]], dtype=float)
+        ).tolist()
+        if (column2 - column1 + 1) * (row2 - row1 + 1) <= len(buckets):
+            for column in range(column1, column2 + 1):
+                for cell_row in range(row1, row2 + 1):
+                    bucket = buckets.get((column, cell_row))
+                    if bucket:
+                        yield bucket
+        else:
+            for ((column, cell_row), bucket) in buckets.items():
+                if column1 <= column <= column2 and row1 <= cell_row <= row2:
+                    yield bucket
+
+    def vertices_in_box(self, x_min, y_min, x_max, y_max):
+        # Returns the indices of the vertices inside the given box, in
+        # ascending order.
+
+        candidates = set()
+        for bucket in self.buckets_in_box(self.vertex_buckets, x_min, y_min, x_max, y_max):
+            candidates |= bucket
+        candidates = np.array(sorted(candidates), dtype=np.intp)
+        points = self.core.positions[candidates]
+        inside = (
+            (points[:, 0] >= x_min) & (points[:, 0] <= x_max) &
+            (points[:, 1] >= y_min) & (points[:, 1] <= y_max)
+        )
+        return candidates[inside]
+
+    def edges_in_box(self, x_min, y_min, x_max, y_max):
+        # Returns the rows of the edges that cross or lie inside the given
+        # box, in ascending order.
+
+        candidates = set(self.long_edges)
+        for bucket in self.buckets_in_box(self.edge_buckets, x_min, y_min, x_max, y_max):
+            candidates |= bucket
+        candidates = np.array(sorted(candidates), dtype=np.intp)
+        edges = self.core.edge_array[candidates]
+        positions = self.core.positions
+        touching = segments_in_box(
+            positions[edges[:, 0]], positions[edges[:, 1]], x_min, y_min, x_max, y_max
+        )
+        return candidates[touching]
+
+    def nearest_vertex(self, x, y):
+        # Returns the index of the vertex nearest to the given point, or None
+        # if there are no vertices. The rings of cells around the point's
+        # cell are searched outwards until no vertex in a further ring could
+        # be nearer than the nearest one found.
+
+        point = np.array([x, y], dtype=float)
+        (column, cell_row) = self.cells_of(point[None])[0].tolist()
+        positions = self.core.positions
+        nearest = None
+        nearest_distance = np.inf
+        ring = 0
+        while True:
+            #once a ring has more cells than are occupied it is cheaper to 
+            #look at every vertex
+            if (2 * ring + 1) ** 2 > len(self.vertex_buckets):
+                if self.core.vertex_count() == 0:
+                    return None
+                distances = np.hypot(*(self.core.get_positions()[:, :2] - point).T)
+                return int(np.argmin(distances))
+
+            candidates = []
+            for ring_column in range(column - ring, column + ring + 1):
+                #the columns at the sides of the ring are covered by it, the 
+                #others only have a cell at its top and bottom
+                step = 1 if abs(ring_column - column) == ring else 2 * ring
+                for ring_row in range(cell_row - ring, cell_row + ring + 1, step):
+                    candidates.extend(self.vertex_buckets.get((ring_column, ring_row), ()))
+            if candidates:
+                candidates = np.array(candidates, dtype=np.intp)
+                distances = np.hypot(*(positions[candidates, :2] - point).T)
+                closest = np.argmin(distances)
+                if distances[closest] < nearest_distance:
+                    nearest = int(candidates[closest])
+                    nearest_distance = distances[closest]
+
+            #every vertex in the next ring is at least this far away
+            if nearest_distance <= ring * self.cell_size:
+                return nearest
+            ring += 1
+
+    def edges_crossing(self, row):
+        # Returns the rows of the edges that intersect the edge in the given
+        # row, in ascending order. Edges sharing a vertex with it always meet
+        # it there and are left out.
+
+        (column1, row1, column2, row2) = self.edge_ranges[row].tolist()
+        if max(column2 - column1, row2 - row1) >= LONG_EDGE_CELLS:
+            #long edges would cover too many cells to look through, so they
+            #are checked against every edge
+            candidates = set(range(self.core.edge_count()))
+        else:
+            candidates = set(self.long_edges)
+            for column in range(column1, column2 + 1):
+                for cell_row in range(row1, row2 + 1):
+                    candidates |= self.edge_buckets.get((column, cell_row), set())
+        edge = self.core.edge_array[row]
+        candidates = np.array(sorted(candidates), dtype=np.intp)
+        candidates = candidates[~np.isin(self.core.edge_array[candidates], edge).any(axis=1)]
+        edges = self.core.edge_array[candidates]
+
+        positions = self.core.positions
+        crossing = segments_intersect(
+            np.repeat(positions[edge[:1]], len(candidates), axis=0),
+            np.repeat(positions[edge[1:]], len(candidates), axis=0),
+            positions[edges[:, 0]],
+            positions[edges[:, 1]]
+        )
+        return candidates[crossing]
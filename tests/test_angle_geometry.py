@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from angle_geometry import ANGLE_RADIUS, MARKER_POINTS, AngleBatch
+
+
+def batch_of(directions, choices):
+    # Returns an updated batch of angles centred on (1, 2), each between
+    # edges leaving the centre in the given pair of directions, along with
+    # the centre.
+
+    centre = np.array([1.0, 2.0, 0.0])
+    positions = [centre]
+    rows = []
+    for (edge1_angle, edge2_angle) in directions:
+        positions.append(centre + [np.cos(edge1_angle), np.sin(edge1_angle), 0])
+        positions.append(centre + [np.cos(edge2_angle), np.sin(edge2_angle), 0])
+        rows.append((len(positions) - 2, 0, 0, len(positions) - 1, 0))
+    batch = AngleBatch(rows, choices)
+    batch.update(np.array(positions))
+    return (batch, centre)
+
+
+DIRECTIONS = [
+    (0.0, 1.0),
+    (1.0, 0.0),
+    (-2.5, 2.5),
+    (0.3, -2.9),
+    (0.0, np.pi / 2),
+    (np.pi, np.pi / 2),
+    (-np.pi / 2, np.pi),
+    (0.2, 0.2 + np.pi / 2 + 0.005),
+    (0.0, np.pi),
+    (-3.0, 3.0),
+]
+
+
+@pytest.mark.parametrize("reflex", [False, True])
+def test_batch_matches_generate_angle_marker(reflex):
+    manim = pytest.importorskip("manim")
+    from angled_graph import AngledGraph
+
+    (batch, centre) = batch_of(DIRECTIONS, [reflex] * len(DIRECTIONS))
+    assert batch.points.shape == (len(DIRECTIONS), MARKER_POINTS, 3)
+
+    for (i, (edge1_angle, edge2_angle)) in enumerate(DIRECTIONS):
+        marker = AngledGraph.generate_angle_marker(centre, edge1_angle, edge2_angle, reflex)
+        assert batch.right[i] == isinstance(marker, manim.Polygon)
+        if batch.right[i]:
+            #the batch splits each side of the square in two
+            assert np.allclose(marker.get_vertices(), batch.points[i][::8][:4])
+        else:
+            assert np.allclose(marker.points, batch.points[i])
+
+
+def test_right_angles_are_only_marked_when_not_reflex():
+    directions = [(0.0, np.pi / 2), (np.pi / 2, 0.0)]
+    (batch, _) = batch_of(directions, [0, 1])
+    assert batch.right.tolist() == [True, False]
+    assert np.allclose(np.abs(batch.magnitudes), [np.pi / 2, 3 * np.pi / 2])
+
+
+def test_markers_lie_on_their_circle():
+    (batch, centre) = batch_of(DIRECTIONS, [0, 1] * (len(DIRECTIONS) // 2))
+    arcs = batch.points[~batch.right][:, ::4]
+    assert np.allclose(np.linalg.norm(arcs - centre, axis=2), ANGLE_RADIUS)
@@ -0,0 +1,218 @@
+import numpy as np
+import pytest
+
+manim = pytest.importorskip("manim")
+from angled_graph import AngledGraph
+
+CORNER = {"A" : (0, 0, 0), "B" : (1, 0, 0), "C" : (0, 1, 0)}
+CORNER_ANGLE = (("A", "B"), ("A", "C"))
+
+
+def shown(vertices, edges, **options):
+    graph = AngledGraph(vertices, edges, **options)
+    scene = manim.Scene()
+    graph.add(scene)
+    return (graph, scene)
+
+
+def test_right_angles_are_tracked_through_become():
+    (graph, scene) = shown(CORNER, [("A", "B"), ("A", "C")])
+    graph.add_angles(scene, {CORNER_ANGLE : 0})
+    assert CORNER_ANGLE in graph.right_angles
+
+    #opening the angle out regenerates the square as an arc, which keeps
+    #the class of the square
+    graph.core.set_positions(["C"], [(-1, 1)])
+    graph.update_for_angle(CORNER_ANGLE)(graph.angles[CORNER_ANGLE])
+    assert CORNER_ANGLE not in graph.right_angles
+    assert isinstance(graph.angles[CORNER_ANGLE], manim.Polygon)
+
+    #closing it again through the batched updater restyles it as a square
+    graph.core.set_positions(["C"], [(0, 1)])
+    graph.update_angles_batch([CORNER_ANGLE])
+    assert CORNER_ANGLE in graph.right_angles
+    assert graph.angles[CORNER_ANGLE].z_index == -1
+
+
+def test_removed_angles_are_not_tracked():
+    (graph, scene) = shown(CORNER, [("A", "B"), ("A", "C")])
+    graph.add_angles(scene, {CORNER_ANGLE : 0})
+    graph.remove_angle(scene, CORNER_ANGLE)
+    assert graph.right_angles == set()
+    graph.add_angles(scene, {CORNER_ANGLE : 1})
+    assert graph.right_angles == set()
+
+
+def marker_offset(graph, angle_key):
+    # Returns how far round from the first edge of the angle with the given
+    # key the middle of its marker is, anticlockwise, along with how far
+    # round the second edge is.
+
+    row = graph.core.angle_index[angle_key]
+    (edge1_start, _, _, edge2_end, centre) = graph.core.positions[
+        graph.core.angle_vertex_indices([row])[0]
+    ]
+    middle = graph.angles[angle_key].points.mean(axis=0)
+    (first, second, marker) = [
+        np.arctan2(point[1] - centre[1], point[0] - centre[0])
+        for point in (edge1_start, edge2_end, middle)
+    ]
+    return ((marker - first) % (2 * np.pi), (second - first) % (2 * np.pi))
+
+
+def assert_markers_in_sectors(graph, angle_keys, inside=True):
+    for angle_key in angle_keys:
+        (offset, sweep) = marker_offset(graph, angle_key)
+        assert (0 < offset < sweep) == inside, angle_key
+
+
+T_JUNCTION = {"C" : (0, 0, 0), "U" : (0, 1, 0), "D" : (0, -1, 0), "R" : (1, 0, 0)}
+T_EDGES = [("C", "U"), ("C", "D"), ("C", "R")]
+LINE_AND_UP = {"C" : (0, 0, 0), "L" : (-1, 0, 0), "R" : (1, 0, 0), "U" : (0, 1, 0)}
+LINE_AND_UP_EDGES = [("C", "L"), ("C", "R"), ("C", "U")]
+
+
+@pytest.mark.parametrize("vertices, edges", [
+    (T_JUNCTION, T_EDGES), (LINE_AND_UP, LINE_AND_UP_EDGES)
+])
+def test_half_turn_sectors_are_marked_on_their_own_side(vertices, edges):
+    (graph, scene) = shown(vertices, edges)
+    graph.mark_all_angles(scene, "C")
+    assert len(graph.angles) == 3
+    assert_markers_in_sectors(graph, graph.angles)
+
+    (graph, scene) = shown(vertices, edges)
+    graph.mark_all_angles(scene, "C", kind="exterior")
+    assert_markers_in_sectors(graph, graph.angles, inside=False)
+
+    #a half turn is not a reflex angle
+    (graph, scene) = shown(vertices, edges)
+    graph.mark_all_angles(scene, "C", kind="reflex")
+    assert graph.angles == {}
+
+
+def test_straight_line_marks_opposite_sides():
+    vertices = {"C" : (0, 0, 0), "L" : (-1, 0, 0), "R" : (1, 0, 0)}
+    edges = [("C", "L"), ("C", "R")]
+    middles = []
+    for kind in ("interior", "exterior"):
+        (graph, scene) = shown(vertices, edges)
+        graph.mark_all_angles(scene, "C", kind=kind)
+        (marker,) = graph.angles.values()
+        middles.append(marker.points.mean(axis=0)[1])
+    assert middles[0] * middles[1] < 0
+
+    (graph, scene) = shown(vertices, edges)
+    graph.mark_all_angles(scene, "C", kind="reflex")
+    assert graph.angles == {}
+
+
+def test_grid_markers_lie_in_their_sectors():
+    vertices = {(x, y) : (x, y, 0) for x in range(3) for y in range(3)}
+    edges = [((x, y), (x + 1, y)) for x in range(2) for y in range(3)]
+    edges += [((x, y), (x, y + 1)) for x in range(3) for y in range(2)]
+    (graph, scene) = shown(vertices, edges)
+    graph.mark_all_angles(scene)
+
+    #the corners have two edges, so only their right angle is marked
+    corners = {(0, 0), (0, 2), (2, 0), (2, 2)}
+    angle_keys = [
+        angle_key for angle_key in graph.angles
+        if graph.core.labels[graph.core.angle_array[graph.core.angle_index[angle_key]][2]] not in corners
+    ]
+    assert len(graph.angles) == 4 + 4 * 3 + 4
+    assert_markers_in_sectors(graph, angle_keys)
+
+
+@pytest.mark.parametrize("options", [{}, {"bake" : True}, {"angle_update" : "batch"}])
+def test_profiling_counts_rendered_frames(options):
+    with manim.tempconfig({"dry_run" : True, "frame_rate" : 15}):
+        (graph, scene) = shown(CORNER, [("A", "B"), ("A", "C")], **options)
+        graph.add_angles(scene, {CORNER_ANGLE : 0})
+        reported = []
+        stats = graph.enable_profiling(lambda frame, work : reported.append(frame))
+        graph.move_vertices(scene, C=(0, 2))
+
+    #a second at 15 frames a second, without the updates made as the
+    #animations begin and finish
+    assert stats.frames == 15
+    assert reported == list(range(15))
+    assert stats.summary()["vertex_updates" if not options.get("bake") else "baked_frames"]["setup_count"] == 2
+
+
+def test_graphs_loaded_from_npy_files_can_be_moved(tmp_path):
+    np.save(tmp_path / "positions.npy", np.array([(0, 0, 0), (1, 0, 0), (0, 1, 0)], dtype=float))
+    (tmp_path / "edges.csv").write_text("0,1\n0,2\n")
+    graph = AngledGraph.from_file(
+        str(tmp_path / "edges.csv"), positions_path=str(tmp_path / "positions.npy"), materialize=True
+    )
+
+    with manim.tempconfig({"dry_run" : True}):
+        scene = manim.Scene()
+        graph.add(scene)
+        graph.add_angles(scene, {((0, 1), (0, 2)) : 0})
+        graph.move_vertices(scene, {1 : (2, 0)})
+        assert graph.core.get_position(1).tolist() == [2, 0, 0]
+        graph.move_vertices_preserving(scene, positions={1 : (2, 2)})
+    assert np.allclose(graph.core.get_position(1)[:2], (2, 2), atol=1e-2)
+    assert ((0, 1), (0, 2)) in graph.right_angles
+
+
+def check_culled(graph):
+    # Checks that the graph has MObjects for exactly the vertices, edges and
+    # angles (by their centre) that a look at the whole core finds in view.
+
+    from spatial_index import segments_in_box
+
+    (x_min, y_min, x_max, y_max) = box = graph.viewport_box()
+    core = graph.core
+    points = core.get_positions()
+    inside = (
+        (points[:, 0] >= x_min) & (points[:, 0] <= x_max) &
+        (points[:, 1] >= y_min) & (points[:, 1] <= y_max)
+    )
+    edges = core.get_edges()
+    touching = segments_in_box(core.positions[edges[:, 0]], core.positions[edges[:, 1]], *box)
+    assert set(graph.vertices) == {core.labels[index] for index in np.flatnonzero(inside)}
+    assert set(graph.edges) == {core.edge_keys[row] for row in np.flatnonzero(touching)}
+    assert set(graph.angles) == {
+        angle_key for (angle_key, (_, _, centre)) in zip(core.angle_keys, core.get_angles()) if inside[centre]
+    }
+    assert len(graph.image) == len(graph.vertices) + len(graph.edges)
+    assert len(graph.angleImage) == len(graph.angles)
+
+
+def test_culling_matches_brute_force_after_moves_and_mutation():
+    vertices = {(x, y) : (x - 6, y - 6, 0) for x in range(13) for y in range(13)}
+    edges = [((x, y), (x + 1, y)) for x in range(12) for y in range(13)]
+    edges += [((x, y), (x, y + 1)) for x in range(13) for y in range(12)]
+    with manim.tempconfig({"dry_run" : True}):
+        (graph, scene) = shown(vertices, edges, cull=True)
+        graph.set_viewport((0, 0, 0), 4, 3)
+        check_culled(graph)
+        graph.mark_all_angles(scene)
+        check_culled(graph)
+        assert 0 < len(graph.angles) < graph.core.angle_count()
+
+        #vertices moved into view, out of it and across it
+        graph.move_vertices(scene, {(0, 0) : (0.5, 0.5), (6, 6) : (5, 5), (5, 6) : (-5, 0)})
+        check_culled(graph)
+
+        graph.set_viewport((3, -2, 0), 3, 3)
+        check_culled(graph)
+
+        graph.add_vertex("in", (3.2, -2.1))
+        graph.add_vertex("out", (-5.5, 5.5))
+        graph.add_edge(("in", (9, 4)))
+        graph.add_edge(("out", (0, 12)))
+        graph.add_edge(("in", "out"))
+        check_culled(graph)
+
+        graph.add_angle(scene, (("in", (9, 4)), ("in", "out")))
+        graph.add_angle(scene, (("out", (0, 12)), ("in", "out")))
+        check_culled(graph)
+
+        graph.remove_angle(scene, (("in", (9, 4)), ("in", "out")))
+        graph.remove_edge(("in", (9, 4)))
+        graph.move_vertices(scene, {"in" : (-3, 3), "out" : (3, -2)})
+        check_culled(graph)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from frame_cache import bake_frames, bake_frames_parallel, bake_positions, motion_plan
+from graph_core import GraphCore
+
+
+def grid_core(size=6):
+    # Returns a core of a square grid of vertices with an angle at every
+    # corner of every square's bottom left vertex.
+
+    core = GraphCore()
+    labels = [(x, y) for x in range(size) for y in range(size)]
+    core.add_vertices(labels, [label for label in labels])
+    edges = [((x, y), (x + 1, y)) for x in range(size - 1) for y in range(size)]
+    edges += [((x, y), (x, y + 1)) for x in range(size) for y in range(size - 1)]
+    core.add_edges(edges)
+    for x in range(size - 1):
+        for y in range(size - 1):
+            core.add_angle((((x, y), (x + 1, y)), ((x, y), (x, y + 1))), (x + y) % 2)
+    return core
+
+
+def movement(core, frame_count=23, seed=0):
+    # Returns the indices of some vertices of the core and random positions
+    # for them over the given number of frames.
+
+    rng = np.random.default_rng(seed)
+    vertex_indices = np.arange(0, core.vertex_count(), 3)
+    positions = core.positions[vertex_indices][None] + rng.normal(
+        scale=0.4, size=(frame_count, len(vertex_indices), 3)
+    )
+    positions[..., 2] = 0
+    return vertex_indices, positions
+
+
+@pytest.mark.parametrize("processes", [2, 3])
+@pytest.mark.parametrize("chunk_frames", [None, 1, 5, 100])
+def test_parallel_baking_matches_serial(processes, chunk_frames):
+    core = grid_core()
+    (vertex_indices, positions) = movement(core)
+    (_, _, plan) = motion_plan(core, vertex_indices)
+    serial = bake_frames(*plan, positions)
+    parallel = bake_frames_parallel(plan, positions, processes, chunk_frames)
+    for (expected, actual) in zip(serial, parallel):
+        assert expected.dtype == actual.dtype
+        assert np.array_equal(expected, actual)
+
+
+def test_bake_positions_is_the_same_with_a_pool():
+    core = grid_core()
+    (vertex_indices, positions) = movement(core, frame_count=9, seed=1)
+    serial = bake_positions(core, vertex_indices, positions)
+    parallel = bake_positions(core, vertex_indices, positions, processes=2)
+    for name in ("edge_rows", "edge_points", "angle_rows", "angle_points", "angle_right"):
+        assert np.array_equal(getattr(serial, name), getattr(parallel, name))
@@ -0,0 +1,166 @@
+import random
+
+import numpy as np
+import pytest
+
+from graph_core import GraphCore
+
+
+class Model():
+    def __init__(self):
+        """ The model holds the same graph as a core in plain dictionaries
+        and sets, keyed by labels, so the rows the core moves around can be
+        checked against it. """
+
+        self.positions = {}
+        self.edges = set()
+        self.angles = {}
+
+    def centre(self, angle_key):
+        #the end of the first edge when it lies on the second, as in the core
+        (edge1, edge2) = angle_key
+        return edge1[1] if edge1[1] in edge2 else edge1[0]
+
+
+def check(core, model):
+    # Checks that every index, row and incidence set of the core agrees with
+    # the model.
+
+    assert sorted(core.labels) == sorted(model.positions)
+    assert len(core.label_index) == core.vertex_count()
+    assert len(core.positions) >= core.vertex_count()
+    for (index, label) in enumerate(core.labels):
+        assert core.label_index[label] == index
+        assert np.array_equal(core.positions[index, :2], model.positions[label])
+
+    assert sorted(core.edge_keys) == sorted(model.edges)
+    assert len(core.edge_index) == core.edge_count()
+    assert len(core.edge_array) >= core.edge_count()
+    for (row, edge_key) in enumerate(core.edge_keys):
+        assert core.edge_index[edge_key] == row
+        assert core.edge_array[row].tolist() == [core.label_index[label] for label in edge_key]
+
+    assert sorted(core.angle_keys) == sorted(model.angles)
+    assert len(core.angle_index) == core.angle_count()
+    for (row, angle_key) in enumerate(core.angle_keys):
+        assert core.angle_index[angle_key] == row
+        (edge1_row, edge2_row, centre) = core.angle_array[row]
+        assert core.edge_keys[edge1_row] == angle_key[0]
+        assert core.edge_keys[edge2_row] == angle_key[1]
+        assert core.labels[centre] == model.centre(angle_key)
+        assert core.angle_choices[row] == model.angles[angle_key]
+
+    for (index, label) in enumerate(core.labels):
+        assert {core.edge_keys[row] for row in core.vertex_edges[index]} == {
+            edge_key for edge_key in model.edges if label in edge_key
+        }
+        assert {core.angle_keys[row] for row in core.vertex_angles[index]} == {
+            angle_key for angle_key in model.angles
+            if label in set(angle_key[0]) | set(angle_key[1])
+        }
+    assert len(core.vertex_edges) == len(core.vertex_angles) == core.vertex_count()
+
+
+def step(core, model, rng, next_label):
+    # Makes one random change to both the core and the model, returning the
+    # next unused vertex label.
+
+    action = rng.random()
+    labels = list(model.positions)
+
+    if action < 0.25 or len(labels) < 3:
+        coordinates = np.array([rng.uniform(-5, 5), rng.uniform(-5, 5)])
+        core.add_vertex(next_label, coordinates)
+        model.positions[next_label] = coordinates
+        return next_label + 1
+
+    if action < 0.5:
+        (label1, label2) = rng.sample(labels, 2)
+        if (label1, label2) not in model.edges and (label2, label1) not in model.edges:
+            core.add_edge((label1, label2))
+            model.edges.add((label1, label2))
+
+    elif action < 0.65:
+        #an angle between two edges meeting at a random vertex
+        label = rng.choice(labels)
+        incident = sorted(edge_key for edge_key in model.edges if label in edge_key)
+        if len(incident) >= 2:
+            angle_key = tuple(rng.sample(incident, 2))
+            if angle_key not in model.angles:
+                choice = rng.randrange(2)
+                core.add_angle(angle_key, choice)
+                model.angles[angle_key] = choice
+
+    elif action < 0.75:
+        if model.angles:
+            angle_key = rng.choice(sorted(model.angles))
+            core.remove_angle(angle_key)
+            del model.angles[angle_key]
+
+    elif action < 0.9:
+        if model.edges:
+            edge_key = rng.choice(sorted(model.edges))
+            if any(edge_key in angle_key for angle_key in model.angles):
+                with pytest.raises(ValueError):
+                    core.remove_edge(edge_key)
+            else:
+                core.remove_edge(edge_key)
+                model.edges.remove(edge_key)
+
+    else:
+        label = rng.choice(labels)
+        if any(label in edge_key for edge_key in model.edges):
+            with pytest.raises(ValueError):
+                core.remove_vertex(label)
+        else:
+            core.remove_vertex(label)
+            del model.positions[label]
+
+    return next_label
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_random_churn_matches_model(seed):
+    rng = random.Random(seed)
+    core = GraphCore()
+    model = Model()
+    next_label = 0
+    for _ in range(400):
+        next_label = step(core, model, rng, next_label)
+        check(core, model)
+
+
+def test_removals_move_the_last_row():
+    core = GraphCore()
+    core.add_vertices("abcd", [(0, 0), (1, 0), (0, 1), (1, 1)])
+    core.add_edges([("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")])
+    core.add_angle((("a", "b"), ("a", "c")))
+    core.add_angle((("b", "d"), ("c", "d")), 1)
+
+    core.remove_angle((("a", "b"), ("a", "c")))
+    assert core.angle_keys == [(("b", "d"), ("c", "d"))]
+    assert core.angle_choices[0] == 1
+
+    core.remove_edge(("a", "b"))
+    assert core.edge_keys[0] == ("c", "d")
+    assert core.angle_array[0][:2].tolist() == [2, 0]
+
+    core.remove_edge(("a", "c"))
+    core.remove_vertex("a")
+    assert core.labels == ["d", "b", "c"]
+    assert core.get_position("d").tolist() == [1, 1, 0]
+    assert core.labels[core.angle_array[0][2]] == "d"
+
+
+def test_growth_doubles_capacity():
+    core = GraphCore()
+    reallocations = 0
+    for i in range(1000):
+        positions = core.positions
+        core.add_vertex(i, (i, 0))
+        reallocations += core.positions is not positions
+        assert len(core.positions) >= core.vertex_count()
+    #16 rows to start with, then doubling up to 1024
+    assert len(core.positions) == 1024
+    assert reallocations == 7
+    assert np.array_equal(core.get_positions()[:, 0], np.arange(1000))
@@ -0,0 +1,45 @@
+import pytest
+
+from graph_io import build_core, read_edges, read_vertices
+
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_string_header_is_skipped_when_vertex_labels_are_given(tmp_path):
+    edges_path = write(tmp_path / "edges.csv", "source,target\na,b\nb,c\n")
+    labels = {"a", "b", "c"}
+    assert list(read_edges(edges_path, labels=labels)) == [("a", "b"), ("b", "c")]
+
+
+def test_header_can_be_given_explicitly(tmp_path):
+    edges_path = write(tmp_path / "edges.csv", "source,target\na,b\n")
+    assert list(read_edges(edges_path, header=True)) == [("a", "b")]
+    assert list(read_edges(edges_path, header=False)) == [("source", "target"), ("a", "b")]
+
+
+def test_numeric_header_is_detected_without_vertex_labels(tmp_path):
+    edges_path = write(tmp_path / "edges.csv", "u,v\n0,1\n1,2\n")
+    assert list(read_edges(edges_path, label_type=int)) == [(0, 1), (1, 2)]
+
+
+def test_first_edge_is_kept_without_a_header(tmp_path):
+    edges_path = write(tmp_path / "edges.csv", "a,b\nb,c\n")
+    assert list(read_edges(edges_path, labels={"a", "b", "c"})) == [("a", "b"), ("b", "c")]
+
+
+def test_bad_row_after_the_first_is_an_error(tmp_path):
+    edges_path = write(tmp_path / "edges.csv", "0,1\nx,2\n")
+    with pytest.raises(ValueError):
+        list(read_edges(edges_path, label_type=int))
+
+
+def test_core_built_from_files_with_headers(tmp_path):
+    vertices_path = write(tmp_path / "vertices.csv", "label,x,y\na,0,0\nb,1,0\nc,1,1\n")
+    edges_path = write(tmp_path / "edges.csv", "source,target\na,b\nb,c\n")
+    vertices = list(read_vertices(vertices_path))
+    labels = {label for (label, _) in vertices}
+    core = build_core(vertices, read_edges(edges_path, labels=labels))
+    assert core.edge_keys == [("a", "b"), ("b", "c")]
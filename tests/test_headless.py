@@ -0,0 +1,151 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from frame_cache import bake_motion
+from headless import DEFAULT_FRAME_RATE, HeadlessGraph
+from timeline import Timeline, linear, smooth
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VERTICES = {"A" : (0, 0), "B" : (2, 0), "C" : (0, 2), "D" : (2, 2)}
+EDGES = [("A", "B"), ("A", "C"), ("B", "D"), ("C", "D")]
+ANGLES = {
+    (("A", "B"), ("A", "C")) : 0,
+    (("A", "B"), ("B", "D")) : 0,
+    (("C", "D"), ("B", "D")) : 1,
+}
+
+
+def square():
+    graph = HeadlessGraph(VERTICES, EDGES)
+    graph.add_angles(ANGLES)
+    return graph
+
+
+def test_importing_does_not_import_manim():
+    #checked in a fresh interpreter, as other tests may have imported manim
+    check = "import sys, headless; sys.exit('manim' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", check], cwd=ROOT).returncode == 0
+
+
+def test_angle_sizes():
+    graph = square()
+    assert np.allclose(graph.angle_sizes(), [90, 90, 270])
+    assert np.allclose(graph.angle_sizes([(("A", "B"), ("B", "D"))]), [90])
+
+
+@pytest.mark.parametrize("run_time, frame_count", [(1.0, 61), (0.5, 31), (0.01, 2), (0, 1)])
+def test_frame_counts(run_time, frame_count):
+    graph = square()
+    frames = list(graph.move_vertices(run_time=run_time, D=(3, 1)))
+    assert len(frames) == frame_count
+    assert [frame.index for frame in frames] == list(range(frame_count))
+    assert frames[-1].time == pytest.approx(run_time)
+    #the movement always finishes at its target
+    assert np.allclose(graph.core.get_position("D"), (3, 1, 0))
+
+
+def test_frame_rate():
+    graph = HeadlessGraph(VERTICES, EDGES, frame_rate=24)
+    assert len(list(graph.move_vertex("A", (1, 1), run_time=2.0))) == 49
+    assert DEFAULT_FRAME_RATE == 60
+
+
+def test_angle_sizes_along_a_movement():
+    graph = square()
+    frames = list(graph.move_vertices(D=(3, 1)))
+    assert np.allclose(frames[0].angle_degrees, [90, 270])
+    assert np.allclose(frames[-1].angle_degrees, [135, 360 - 63.43494882])
+    assert np.allclose(frames[-1].angle_degrees, graph.angle_sizes(
+        [graph.core.angle_keys[row] for row in frames[-1].angle_rows]
+    ))
+
+
+@pytest.mark.parametrize("rate_func", [smooth, linear, lambda t: t * t])
+def test_frames_match_bake_motion(rate_func):
+    graph = square()
+    motion = bake_motion(graph.core, {"B" : (3, 1), "C" : (-1, 2)}, 61, rate_func)
+    frames = list(graph.move_vertices(rate_func=rate_func, B=(3, 1), C=(-1, 2)))
+
+    assert np.array_equal(frames[0].edge_rows, motion.edge_rows)
+    assert np.array_equal(frames[0].angle_rows, motion.angle_rows)
+    assert np.allclose([frame.vertex_positions for frame in frames], motion.vertex_positions)
+    assert np.allclose([frame.angle_points for frame in frames], motion.angle_points)
+    assert np.array_equal([frame.angle_right for frame in frames], motion.angle_right)
+    assert np.allclose(
+        [frame.edge_endpoints for frame in frames], motion.edge_points[:, :, [0, -1]]
+    )
+
+
+def test_stopping_early_leaves_the_last_frame():
+    graph = square()
+    frames = graph.move_vertex("A", (1, 1), rate_func=linear)
+    for _ in range(31):
+        frame = next(frames)
+    assert np.allclose(graph.core.get_position("A"), (0.5, 0.5, 0))
+    assert np.allclose(frame.vertex_positions, [(0.5, 0.5, 0)])
+
+
+def test_timeline():
+    graph = square()
+    timeline = Timeline().add_keyframe(0.5, A=(1, 1)).add_keyframe(1.0, A=(0, 0))
+    frames = list(graph.play_timeline(timeline))
+    assert len(frames) == 61
+    assert np.allclose(frames[30].vertex_positions, [(1, 1, 0)])
+    assert np.allclose(graph.core.get_position("A"), (0, 0, 0))
+
+
+def test_preserving_keeps_right_angles():
+    graph = square()
+    frames = list(graph.move_vertices_preserving(B=(2.5, 0.5)))
+    right_rows = [graph.core.angle_index[(("A", "B"), ("A", "C"))], graph.core.angle_index[(("A", "B"), ("B", "D"))]]
+    for frame in frames:
+        sizes = dict(zip(frame.angle_rows.tolist(), frame.angle_degrees))
+        assert all(sizes[row] == pytest.approx(90, abs=1e-3) for row in right_rows if row in sizes)
+    assert np.allclose(graph.core.get_position("B"), (2.5, 0.5, 0))
+
+
+def test_vertices_with_labels_that_are_not_strings_can_be_moved():
+    graph = HeadlessGraph({0 : (0, 0), 1 : (1, 0), 2 : (0, 1)}, [(0, 1), (0, 2)])
+    graph.add_angles({((0, 1), (0, 2)) : 0})
+
+    for frame in graph.move_vertices(0.1, positions={1 : (2, 0)}):
+        pass
+    assert graph.core.get_position(1).tolist() == [2, 0, 0]
+    for frame in graph.move_vertex(2, (0, 3), 0.1):
+        pass
+    assert graph.core.get_position(2).tolist() == [0, 3, 0]
+
+    for frame in graph.move_vertices_preserving(run_time=0.1, positions={1 : (2, 2)}):
+        pass
+    assert np.allclose(graph.angle_sizes(), [90])
+
+
+def test_movements_made_ahead_of_time_start_where_the_last_one_ended():
+    graph = square()
+    movements = [
+        graph.move_vertex("D", (3, 3), 0.2),
+        graph.move_vertices(0.2, D=(4, 2)),
+        graph.play_timeline(Timeline().add_keyframe(0.2, D=(2, 4))),
+        graph.move_vertices_preserving([(("A", "B"), ("B", "D"))], 0.2, D=(2, 5)),
+    ]
+    index = graph.core.label_index["D"]
+    end = graph.core.get_position("D")
+    for frames in movements:
+        frames = list(frames)
+        #each movement starts from where the one before it left the vertex
+        assert np.allclose(frames[0].vertex_positions[frames[0].vertex_indices == index][0], end)
+        end = graph.core.get_position("D")
+        assert np.allclose(frames[-1].vertex_positions[frames[-1].vertex_indices == index][0], end)
+    assert np.allclose(end[:2], (2, 5), atol=1e-2)
+
+
+def test_nothing_is_read_until_the_first_frame():
+    graph = square()
+    frames = graph.move_vertices(0.1, D=(3, 3))
+    graph.core.set_positions(["D"], [(5, 5)])
+    first = next(frames)
+    assert np.allclose(first.vertex_positions[0], (5, 5, 0))
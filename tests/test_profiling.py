@@ -0,0 +1,44 @@
+from profiling import UpdateStats
+
+
+def test_frames_are_totalled_and_reported():
+    frames = []
+    stats = UpdateStats(lambda frame, work : frames.append((frame, work)))
+    stats.count("edge_updates", 4, 0.5)
+    stats.end_frame()
+    stats.count("edge_updates", 2, 0.25)
+    stats.count("arcs")
+    stats.end_frame()
+
+    assert stats.frames == 2
+    assert frames == [(0, {"edge_updates" : (4, 0.5)}), (1, {"edge_updates" : (2, 0.25), "arcs" : (1, 0.0)})]
+    assert stats.summary()["edge_updates"]["count"] == 6
+    assert stats.summary()["edge_updates"]["seconds_per_frame"] == 0.375
+
+
+def test_unrendered_work_is_kept_apart_from_frames():
+    frames = []
+    stats = UpdateStats(lambda frame, work : frames.append(work))
+    stats.count("edge_updates", 2, 0.5)
+    stats.end_frame(rendered=False)
+    stats.count("edge_updates", 3, 1.0)
+    stats.end_frame()
+    stats.count("edge_updates", 1, 0.5)
+    stats.count("allocations", 5)
+    stats.end_frame(rendered=False)
+
+    assert stats.frames == 1
+    assert frames == [{"edge_updates" : (3, 1.0)}]
+    summary = stats.summary()
+    assert summary["edge_updates"] == {
+        "count" : 3,
+        "seconds" : 1.0,
+        "seconds_per_frame" : 1.0,
+        "setup_count" : 3,
+        "setup_seconds" : 1.0,
+    }
+    assert summary["allocations"]["count"] == 0
+    assert summary["allocations"]["setup_count"] == 5
+
+    stats.reset()
+    assert stats.summary() == {}
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from graph_core import GraphCore
+from graph_io import SNAPSHOT_BODY_OFFSET, load_snapshot, save_snapshot
+
+
+def sample_core():
+    core = GraphCore()
+    core.add_vertices(["a", "b", "c", "d", 5], [(0, 0), (1.5, 0), (0, 2.25), (1, 1), (-3, 0.125)])
+    core.add_edges([("a", "b"), ("a", "c"), ("b", "d"), ("c", "d"), ("d", 5)])
+    core.add_angle((("a", "b"), ("a", "c")))
+    core.add_angle((("c", "d"), ("b", "d")), 1)
+    #removals leave the arrays in the order the core keeps them in
+    core.remove_angle((("a", "b"), ("a", "c")))
+    return core
+
+
+def test_save_load_save_is_byte_identical(tmp_path):
+    first = tmp_path / "first.agsnap"
+    second = tmp_path / "second.agsnap"
+    core = sample_core()
+    save_snapshot(core, str(first))
+    loaded = load_snapshot(str(first))
+    save_snapshot(loaded, str(second))
+    assert first.read_bytes() == second.read_bytes()
+
+    assert loaded.labels == core.labels
+    assert loaded.edge_keys == core.edge_keys
+    assert loaded.angle_keys == core.angle_keys
+    assert np.array_equal(loaded.get_positions(), core.get_positions())
+    assert np.array_equal(loaded.get_edges(), core.get_edges())
+    assert np.array_equal(loaded.get_angles(), core.get_angles())
+
+
+@pytest.mark.parametrize("offset", [0, 8, SNAPSHOT_BODY_OFFSET, -1])
+def test_corrupt_snapshot_is_rejected(tmp_path, offset):
+    path = tmp_path / "graph.agsnap"
+    save_snapshot(sample_core(), str(path))
+    data = bytearray(path.read_bytes())
+    data[offset] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        load_snapshot(str(path))
+
+
+def test_truncated_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "graph.agsnap"
+    save_snapshot(sample_core(), str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        load_snapshot(str(path), verify=False)
+
+
+def test_changing_a_loaded_graph_leaves_the_file_unchanged(tmp_path):
+    path = tmp_path / "graph.agsnap"
+    save_snapshot(sample_core(), str(path))
+    saved = path.read_bytes()
+
+    loaded = load_snapshot(str(path))
+    loaded.positions[:loaded.vertex_count()] += 10
+    loaded.add_vertex("e", (7, 7))
+    loaded.add_edge(("e", "b"))
+    loaded.remove_edge(("d", 5))
+    assert path.read_bytes() == saved
+    assert np.array_equal(load_snapshot(str(path)).get_positions(), sample_core().get_positions())
@@ -0,0 +1,156 @@
+import random
+
+import numpy as np
+import pytest
+
+from graph_core import GraphCore
+from spatial_index import LONG_EDGE_CELLS, SpatialGrid, segments_in_box, segments_intersect
+
+
+def random_graph(rng, vertex_count=400, edge_count=600):
+    # Returns a core of vertices scattered over a 20x20 square, joined by
+    # short edges and by a few edges right across it, which the grid keeps
+    # as long edges.
+
+    core = GraphCore()
+    core.add_vertices(range(vertex_count), [
+        (rng.uniform(-10, 10), rng.uniform(-10, 10)) for _ in range(vertex_count)
+    ])
+    #the corners make sure the long edges span the square
+    core.add_vertices(["sw", "ne", "nw", "se"], [(-10, -10), (10, 10), (-10, 10), (10, -10)])
+    edges = set()
+    while len(edges) < edge_count:
+        (label1, label2) = rng.sample(range(vertex_count), 2)
+        if (label2, label1) not in edges and np.linalg.norm(
+            core.get_position(label1) - core.get_position(label2)
+        ) < 4:
+            edges.add((label1, label2))
+    core.add_edges(sorted(edges))
+    core.add_edges([("sw", "ne"), ("nw", "se")])
+    core.add_edges([(rng.randrange(vertex_count), corner) for corner in ("sw", "ne", "nw", "se")])
+    return core
+
+
+def random_box(rng):
+    (x1, x2) = sorted(rng.uniform(-12, 12) for _ in range(2))
+    (y1, y2) = sorted(rng.uniform(-12, 12) for _ in range(2))
+    return (x1, y1, x2, y2)
+
+
+def all_vertices_in_box(core, x_min, y_min, x_max, y_max):
+    points = core.get_positions()
+    return np.flatnonzero(
+        (points[:, 0] >= x_min) & (points[:, 0] <= x_max) &
+        (points[:, 1] >= y_min) & (points[:, 1] <= y_max)
+    )
+
+
+def all_edges_in_box(core, box):
+    edges = core.get_edges()
+    return np.flatnonzero(segments_in_box(core.positions[edges[:, 0]], core.positions[edges[:, 1]], *box))
+
+
+def all_edges_crossing(core, row):
+    edges = core.get_edges()
+    edge = edges[row]
+    crossing = segments_intersect(
+        np.repeat(core.positions[edge[:1]], len(edges), axis=0),
+        np.repeat(core.positions[edge[1:]], len(edges), axis=0),
+        core.positions[edges[:, 0]],
+        core.positions[edges[:, 1]]
+    )
+    #edges sharing a vertex with it are left out
+    crossing &= ~np.isin(edges, edge).any(axis=1)
+    return np.flatnonzero(crossing)
+
+
+def check_queries(core, grid, rng, queries=20):
+    # Checks every kind of query of the grid against looking at the whole
+    # core.
+
+    for _ in range(queries):
+        box = random_box(rng)
+        assert grid.vertices_in_box(*box).tolist() == all_vertices_in_box(core, *box).tolist()
+        assert grid.edges_in_box(*box).tolist() == all_edges_in_box(core, box).tolist()
+
+        (x, y) = (rng.uniform(-15, 15), rng.uniform(-15, 15))
+        distances = np.hypot(*(core.get_positions()[:, :2] - (x, y)).T)
+        nearest = grid.nearest_vertex(x, y)
+        assert distances[nearest] == distances.min()
+
+    for row in rng.sample(range(core.edge_count()), min(20, core.edge_count())):
+        assert grid.edges_crossing(row).tolist() == all_edges_crossing(core, row).tolist()
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_queries_match_brute_force(seed):
+    rng = random.Random(seed)
+    core = random_graph(rng)
+    grid = SpatialGrid(core)
+    assert grid.long_edges
+    assert max(np.ptp(core.get_positions()[:, :2], axis=0)) / grid.cell_size > LONG_EDGE_CELLS
+    check_queries(core, grid, rng)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_queries_match_brute_force_after_moves_and_mutation(seed):
+    rng = random.Random(seed)
+    core = random_graph(rng)
+    grid = SpatialGrid(core)
+    next_label = core.vertex_count()
+
+    for _ in range(30):
+        #move some vertices, some of them a long way
+        indices = np.array(rng.sample(range(core.vertex_count()), 10), dtype=np.intp)
+        core.positions[indices, :2] += np.array([
+            (rng.gauss(0, 1), rng.gauss(0, 1)) if i % 3 else (rng.uniform(-20, 20), rng.uniform(-20, 20))
+            for i in range(len(indices))
+        ])
+        grid.move_vertices(indices)
+
+        #add a vertex joined to another, and remove an edge and a vertex
+        index = core.add_vertex(next_label, (rng.uniform(-10, 10), rng.uniform(-10, 10)))
+        grid.add_vertex(index)
+        grid.add_edge(core.add_edge((next_label, core.labels[rng.randrange(index)])))
+        next_label += 1
+
+        edge_key = rng.choice(core.edge_keys)
+        (row, last) = (core.edge_index[edge_key], core.edge_count() - 1)
+        core.remove_edge(edge_key)
+        grid.remove_edge(row, last)
+
+        isolated = [label for label in core.labels if not core.vertex_edges[core.label_index[label]]]
+        if isolated:
+            (index, last) = (core.label_index[isolated[0]], core.vertex_count() - 1)
+            core.remove_vertex(isolated[0])
+            grid.remove_vertex(index, last)
+
+        check_queries(core, grid, rng, queries=5)
+
+    #the grid kept up to date gives the same answers as one built afresh
+    rebuilt = SpatialGrid(core, grid.cell_size)
+    for _ in range(20):
+        box = random_box(rng)
+        assert grid.edges_in_box(*box).tolist() == rebuilt.edges_in_box(*box).tolist()
+        assert grid.vertices_in_box(*box).tolist() == rebuilt.vertices_in_box(*box).tolist()
+
+
+def test_segments_in_box_agrees_with_points_along_them():
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(-3, 3, (500, 3))
+    ends = rng.uniform(-3, 3, (500, 3))
+    #some segments parallel to the sides of the box
+    ends[:50, 0] = starts[:50, 0]
+    ends[50:100, 1] = starts[50:100, 1]
+    box = (-1, -0.5, 1.5, 1)
+    touching = segments_in_box(starts, ends, *box)
+
+    alphas = np.linspace(0, 1, 2001)[:, None, None]
+    points = starts + alphas * (ends - starts)
+    sampled = (
+        (points[..., 0] >= box[0]) & (points[..., 0] <= box[2]) &
+        (points[..., 1] >= box[1]) & (points[..., 1] <= box[3])
+    ).any(axis=0)
+    #sampling can only miss segments that barely touch the box
+    assert np.all(touching[sampled])
+    assert np.count_nonzero(touching & ~sampled) <= 2
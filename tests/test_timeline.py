@@ -0,0 +1,95 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from graph_core import GraphCore
+from timeline import Timeline, apply_rate, linear, smooth
+
+
+def sample_one_at_a_time(timeline, core, times, default_easing=None):
+    # Samples the timeline a vertex at a time, following the track of each
+    # vertex through its own keyframes - what Timeline.sample does for every
+    # vertex at once.
+
+    times = np.asarray(times, dtype=float)
+    vertex_labels = timeline.vertex_labels()
+    vertex_indices = core.indices(vertex_labels)
+    positions = np.repeat(core.positions[vertex_indices][None], len(times), axis=0)
+    default_easing = timeline.default_easing or default_easing or linear
+
+    for (i, vertex_label) in enumerate(vertex_labels):
+        (track_times, track_coordinates) = timeline.track(vertex_label)
+        if track_times[0] > 0:
+            track_times = np.concatenate(([0.0], track_times))
+            track_coordinates = np.concatenate((positions[0, i:i + 1, :2], track_coordinates))
+        segments = np.clip(np.searchsorted(track_times, times, side="right") - 1, 0, len(track_times) - 1)
+        following = np.minimum(segments + 1, len(track_times) - 1)
+        lengths = track_times[following] - track_times[segments]
+        alphas = np.where(
+            lengths > 0,
+            (times - track_times[segments]) / np.where(lengths > 0, lengths, 1),
+            1.0
+        )
+        alphas = apply_rate(timeline.easings.get(vertex_label, default_easing), np.clip(alphas, 0, 1))
+        starts = track_coordinates[segments]
+        ends = track_coordinates[following]
+        positions[:, i, :2] = starts + alphas[:, None] * (ends - starts)
+
+    return vertex_indices, positions
+
+
+def random_timeline(rng, core, keyframe_count, start_at_zero):
+    timeline = Timeline()
+    keyframe_times = sorted(rng.uniform(0.1, 3) for _ in range(keyframe_count))
+    if start_at_zero:
+        keyframe_times[0] = 0.0
+    for time in keyframe_times:
+        moved = rng.sample(core.labels, rng.randrange(1, core.vertex_count()))
+        timeline.add_keyframe(time, {
+            vertex_label : (rng.uniform(-5, 5), rng.uniform(-5, 5), 0) for vertex_label in moved
+        })
+    return timeline
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_sample_matches_sampling_one_vertex_at_a_time(seed):
+    rng = random.Random(seed)
+    core = GraphCore()
+    core.add_vertices(range(40), [(rng.uniform(-5, 5), rng.uniform(-5, 5)) for _ in range(40)])
+    timeline = random_timeline(rng, core, rng.randrange(1, 8), seed % 2 == 0)
+
+    #a mix of easings, including one that only takes a number at a time
+    for vertex_label in rng.sample(core.labels, 10):
+        timeline.set_easing(vertex_label, rng.choice([
+            smooth, linear, lambda t : math.sin(t * math.pi / 2)
+        ]))
+
+    times = np.concatenate(([-0.5, 0.0], np.linspace(0, timeline.duration(), 97), [timeline.duration() + 1]))
+    for default_easing in (None, smooth):
+        (indices, positions) = timeline.sample(core, times, default_easing)
+        (expected_indices, expected_positions) = sample_one_at_a_time(timeline, core, times, default_easing)
+        assert np.array_equal(indices, expected_indices)
+        assert np.array_equal(positions, expected_positions)
+
+
+def test_sample_with_a_default_easing_of_its_own():
+    core = GraphCore()
+    core.add_vertices(["a", "b"], [(0, 0), (1, 1)])
+    timeline = Timeline(default_easing=smooth).add_keyframe(1, a=(1, 0)).add_keyframe(2, b=(3, 1))
+    timeline.set_easing("b", linear)
+    times = np.linspace(0, 2, 9)
+    (indices, positions) = timeline.sample(core, times, linear)
+    assert indices.tolist() == [0, 1]
+    assert np.array_equal(positions, sample_one_at_a_time(timeline, core, times, linear)[1])
+    assert np.allclose(positions[:, 0, 0], np.minimum(smooth(np.minimum(times, 1)), 1))
+    assert np.allclose(positions[:, 1, 0], 1 + times)
+
+
+def test_empty_timeline_samples_nothing():
+    core = GraphCore()
+    core.add_vertices(["a"], [(0, 0)])
+    (indices, positions) = Timeline().sample(core, [0, 0.5])
+    assert len(indices) == 0
+    assert positions.shape == (2, 0, 3)
@@ -0,0 +1,164 @@
+import numpy as np
+
+
+def linear(t):
+    return t
+
+
+def smooth(t, inflection=10.0):
+    # The smooth rate function of manim, written with NumPy so that it can
+    # be used without importing manim and applied to arrays of proportions.
+
+    error = 1 / (1 + np.exp(inflection / 2))
+    return np.clip((1 / (1 + np.exp(-inflection * (t - 0.5))) - error) / (1 - 2 * error), 0, 1)
+
+
+def apply_rate(rate_func, alphas):
+    # Applies the rate function to an array of proportions, all at once if
+    # the function accepts arrays and one at a time otherwise.
+
+    try:
+        eased = np.asarray(rate_func(alphas), dtype=float)
+        if eased.shape == alphas.shape:
+            return eased
+    except (TypeError, ValueError):
+        pass
+    return np.fromiter((rate_func(alpha) for alpha in alphas), dtype=float, count=len(alphas))
+
+
+class Timeline():
+    def __init__(self, default_easing=None):
+        """ A timeline chains many movements of the vertices of a graph into
+        one sequence that can be played as a single animation. It is built
+        from keyframes, each giving the time (in seconds from the start of
+        the timeline) at which some vertices should arrive at some
+        coordinates. A vertex starts from wherever it is when the timeline is
+        played, moves between the keyframes it appears in and stays at its
+        last one. The movement between keyframes is eased by the rate
+        function set for the vertex, or by the default easing (linear unless
+        given) for vertices without one. """
+
+        self.default_easing = default_easing
+        self.keyframes = {}
+        self.easings = {}
+
+    def add_keyframe(self, time, positions=None, **movements):
+        # Adds a keyframe at the given time, moving the vertices in the given
+        # label-coordinates dictionary or keyword arguments to the given
+        # coordinates. Returns the timeline so that calls can be chained.
+
+        if time < 0:
+            raise ValueError("keyframe times cannot be negative")
+        keyframe = self.keyframes.setdefault(float(time), {})
+        keyframe.update(positions or {})
+        keyframe.update(movements)
+        return self
+
+    def set_easing(self, vertex_label, rate_func):
+        # Sets the rate function easing the movements of the vertex with the
+        # given label. Returns the timeline so that calls can be chained.
+
+        self.easings[vertex_label] = rate_func
+        return self
+
+    def duration(self):
+        # Returns the time of the last keyframe.
+        return max(self.keyframes, default=0.0)
+
+    def vertex_labels(self):
+        # Returns the labels of every vertex moved by the timeline, in the
+        # order they first appear.
+
+        labels = {}
+        for time in sorted(self.keyframes):
+            for vertex_label in self.keyframes[time]:
+                labels[vertex_label] = None
+        return list(labels)
+
+    def track(self, vertex_label):
+        # Returns the times and coordinates of the keyframes the vertex with
+        # the given label appears in, in time order.
+
+        times = []
+        coordinates = []
+        for time in sorted(self.keyframes):
+            if vertex_label in self.keyframes[time]:
+                times.append(time)
+                coordinates.append(tuple(self.keyframes[time][vertex_label][:2]))
+        return np.array(times), np.array(coordinates, dtype=float).reshape(-1, 2)
+
+    def sample(self, core, times, default_easing=None):
+        # Samples the positions of every vertex moved by the timeline at the
+        # given times, starting from their current positions in the core.
+        # Returns the indices of the moved vertices in the core along with
+        # their positions as a (times x moved vertices x 3) array. The
+        # default easing given here is used for vertices without one when the
+        # timeline does not have a default of its own. Every vertex is
+        # sampled at once - the keyframes are stacked into arrays with a row
+        # for each keyframe time and a column for each vertex, so the times
+        # are only looked up among the keyframe times once and each easing
+        # is applied once to all the vertices it eases.
+
+        times = np.asarray(times, dtype=float)
+        vertex_labels = self.vertex_labels()
+        vertex_indices = core.indices(vertex_labels)
+        positions = np.repeat(core.positions[vertex_indices][None], len(times), axis=0)
+        if not vertex_labels:
+            return vertex_indices, positions
+        default_easing = self.default_easing or default_easing or linear
+
+        #every vertex starts from where it is at the start of the timeline, 
+        #so the first row is at time 0 and has every vertex in it
+        key_times = np.array(sorted(set(self.keyframes) | {0.0}))
+        columns = {vertex_label : i for (i, vertex_label) in enumerate(vertex_labels)}
+        present = np.zeros((len(key_times), len(vertex_labels)), dtype=bool)
+        coordinates = np.zeros((len(key_times), len(vertex_labels), 2))
+        present[0] = True
+        coordinates[0] = positions[0, :, :2]
+        for (row, time) in enumerate(key_times):
+            keyframe = self.keyframes.get(time)
+            if keyframe:
+                keyframe_columns = np.fromiter(
+                    (columns[vertex_label] for vertex_label in keyframe), dtype=np.intp, count=len(keyframe)
+                )
+                present[row, keyframe_columns] = True
+                coordinates[row, keyframe_columns] = [tuple(value[:2]) for value in keyframe.values()]
+
+        #for each row and vertex, the last row the vertex is in at or before 
+        #it and the next row it is in after it (or the row itself if there 
+        #are none)
+        rows = np.arange(len(key_times))[:, None]
+        last_rows = np.maximum.accumulate(np.where(present, rows, 0), axis=0)
+        next_rows = np.minimum.accumulate(np.where(present, rows, len(key_times))[::-1], axis=0)[::-1]
+        next_rows = np.concatenate((next_rows[1:], np.full((1, len(vertex_labels)), len(key_times))))
+        next_rows = np.where(next_rows < len(key_times), next_rows, rows)
+
+        #find which pair of keyframes each time falls between for each 
+        #vertex, and how far between them it is
+        vertex_columns = np.arange(len(vertex_labels))
+        time_rows = np.clip(np.searchsorted(key_times, times, side="right") - 1, 0, len(key_times) - 1)
+        segments = last_rows[time_rows]
+        following = next_rows[segments, vertex_columns]
+        lengths = key_times[following] - key_times[segments]
+        alphas = np.where(
+            lengths > 0,
+            (times[:, None] - key_times[segments]) / np.where(lengths > 0, lengths, 1),
+            1.0
+        )
+        alphas = np.clip(alphas, 0, 1)
+
+        easings = {}
+        for (i, vertex_label) in enumerate(vertex_labels):
+            easings.setdefault(self.easings.get(vertex_label, default_easing), []).append(i)
+        for (rate_func, easing_columns) in easings.items():
+            if len(easing_columns) == len(vertex_labels):
+                alphas = apply_rate(rate_func, alphas.ravel()).reshape(alphas.shape)
+            else:
+                alphas[:, easing_columns] = apply_rate(
+                    rate_func, alphas[:, easing_columns].ravel()
+                ).reshape(len(times), len(easing_columns))
+
+        starts = coordinates[segments, vertex_columns]
+        ends = coordinates[following, vertex_columns]
+        positions[:, :, :2] = starts + alphas[..., None] * (ends - starts)
+        return vertex_indices, positions